@@ -2,9 +2,8 @@
 
 .. include:: ./../README.md
 """
-from .bibindex import PyLeiheNet
-from .localgroup import LocalGroup
-from .bibliography import Bibliography, MediaType
+import importlib
+import sys
 
 __author__ = "TheMEO"
 __copyright__ = "Copyright 2019"
@@ -13,3 +12,29 @@ __license__ = "GNU AGPLv3"
 __version__ = "0.0.2"
 __maintainer__ = "TheMEO"
 __status__ = "Development"
+
+# public classes and their modules, imported on the first access (PEP 562)
+_EXPORTS = {"PyLeiheNet": "bibindex",
+            "LocalGroup": "localgroup",
+            "Bibliography": "bibliography",
+            "MediaType": "bibliography"}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module("." + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # no module `__getattr__` before Python 3.7
+    from .bibindex import PyLeiheNet  # noqa: E402,F401
+    from .localgroup import LocalGroup  # noqa: E402,F401
+    from .bibliography import Bibliography, MediaType  # noqa: E402,F401
@@ -13,7 +13,17 @@ import argparse
 import logging
 import logging.handlers
 from . import PyLeiheNet, MediaType  # pylint: disable=unused-import
-from .simple_functions import makejson, search_print
+from .simple_functions import makejson, search_print, search_batch_print, read_search_file, \
+    city_print
+from . import htmlparser
+from .cache import SearchCache
+from .httpcache import HTTPCache
+from .scheduler import HostLimits
+from .adaptive import AdaptiveLimiter
+from .retry import RetryPolicy
+from .hedge import Hedger
+from .health import CircuitBreaker, healthPath
+from .basic import PyLeiheWeb
 
 
 def run_console(cmd):
@@ -40,6 +50,28 @@ def run_console(cmd):
     return pdoc.returncode
 
 
+def duration(text):
+    """
+    Converts a duration like `10`, `10s`, `500ms`, `2m` or `1h` to seconds.
+
+    Raises:
+        argparse.ArgumentTypeError: for an invalid duration
+    """
+    value = text.strip().lower()
+    factor = 1
+    for unit, unit_factor in (("ms", 0.001), ("s", 1), ("m", 60), ("h", 3600)):
+        if value.endswith(unit):
+            value, factor = value[:-len(unit)], unit_factor
+            break
+    try:
+        seconds = float(value) * factor
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid duration: {}".format(text)) from None
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError("duration must be positive: {}".format(text))
+    return seconds
+
+
 def parseargs(args):
     """
     Defines and parses the arguments.
@@ -55,9 +87,40 @@ def parseargs(args):
     parser.add_argument('--makejson', help='group and correct and finally saves the data to a json file', action='store_true')  # noqa: E501
     parser.add_argument('-j', '--jsonfile', help="Path to the jsonfile", default="")  # noqa: E501
     parser.add_argument('-s', '--search', help="Search for keywords in all bibs")  # noqa: E501
+    parser.add_argument('--search-file', help="Search all keywords of a text file (one per line) in one pass")  # noqa: E501
+    parser.add_argument('--city', help="Show the libraries serving a city (trailing * for all cities with the prefix)")  # noqa: E501
+    parser.add_argument('--state', help="Search only the libraries of one federal state (e.g. Bayern)")  # noqa: E501
     parser.add_argument('-c', '--category', help="Media category", type=MediaType.__getitem__, choices=list(MediaType), default=MediaType.alleMedien)  # noqa: E501
     parser.add_argument('-t', '--top', help="Number of print results", type=int, default=-1)  # noqa: E501
-    parser.add_argument('--threads', help="Number of used parallel threads", type=int, default=4)  # noqa: E501
+    parser.add_argument('--threads', help="Number of used parallel threads (search and --makejson)", type=int, default=4)  # noqa: E501
+    parser.add_argument('--adaptive', help="Adapt the number of threads to the push back of the servers (starting with --threads)", action='store_true')  # noqa: E501
+    parser.add_argument('--max-threads', help="Maximum number of threads with --adaptive", type=int, default=AdaptiveLimiter.MAXIMUM)  # noqa: E501
+    parser.add_argument('--engine', help="Search engine: thread pool or asyncio (requires aiohttp)", choices=['threads', 'async'], default='threads')  # noqa: E501
+    parser.add_argument('--concurrency', help="Maximum number of searches in flight with the async engine", type=int, default=100)  # noqa: E501
+    parser.add_argument('--host-rate', help="Maximum number of searches per second per host", type=float)  # noqa: E501
+    parser.add_argument('--host-concurrency', help="Maximum number of searches in flight per host", type=int)  # noqa: E501
+    parser.add_argument('--retries', help="Number of retries of a failed request (closed connection, timeout, HTTP 429/5xx)", type=int, default=RetryPolicy.RETRIES)  # noqa: E501
+    parser.add_argument('--retry-budget', help="Maximum number of retries of the whole run", type=int)  # noqa: E501
+    parser.add_argument('--retry-host-budget', help="Maximum number of retries per host", type=int)  # noqa: E501
+    parser.add_argument('--hedge', help="Send a second search request if a library answers slower than usual (engine threads)", action='store_true')  # noqa: E501
+    parser.add_argument('--hedge-percentile', help="Latency percentile of the host after which the second request is sent (0-1)", type=float, default=Hedger.PERCENTILE)  # noqa: E501
+    parser.add_argument('--hedge-budget', help="Maximum share of duplicated search requests (0-1)", type=float, default=Hedger.BUDGET)  # noqa: E501
+    parser.add_argument('--health', help="Skip libraries which failed repeatedly (state stored next to the jsonfile), reported with -7", action='store_true')  # noqa: E501
+    parser.add_argument('--health-threshold', help="Number of failed searches in a row after which a library is skipped", type=int, default=CircuitBreaker.THRESHOLD)  # noqa: E501
+    parser.add_argument('--health-cooldown', help="Duration a failed library is skipped before it is probed again (e.g. 30m)", type=duration, default=CircuitBreaker.COOLDOWN)  # noqa: E501
+    parser.add_argument('--deadline', help="Maximum duration of the search (e.g. 10s), unfinished libraries are reported with -6", type=duration)  # noqa: E501
+    parser.add_argument('--connect-timeout', help="Connect timeout of a request (e.g. 5s)", type=duration)  # noqa: E501
+    parser.add_argument('--read-timeout', help="Read timeout of a request (e.g. 20s)", type=duration)  # noqa: E501
+    parser.add_argument('--stream', help="Read the result pages only until the number of hits is known", action='store_true')  # noqa: E501
+    parser.add_argument('--full-page', help="Request full result pages (100 media) instead of the smallest page for counting", action='store_true')  # noqa: E501
+    parser.add_argument('--cache', help="Use the persistent cache for search results", action='store_true')  # noqa: E501
+    parser.add_argument('--cache-only', help="Answer only from the search result cache (no requests)", action='store_true')  # noqa: E501
+    parser.add_argument('--cache-file', help="Path to the cache database (default in the user cache directory)")  # noqa: E501
+    parser.add_argument('--cache-ttl', help="Lifetime of cached results with hits in seconds", type=float, default=SearchCache.TTL)  # noqa: E501
+    parser.add_argument('--cache-negative-ttl', help="Lifetime of cached zero-hit and error results in seconds", type=float, default=SearchCache.NEGATIVE_TTL)  # noqa: E501
+    parser.add_argument('--http-cache', help="Cache the loaded web pages and revalidate them (ETag/Last-Modified)", action='store_true')  # noqa: E501
+    parser.add_argument('--http-cache-dir', help="Directory of the web page cache (default in the user cache directory)")  # noqa: E501
+    parser.add_argument('--parser', help="Backend to parse the html pages (fallback: html.parser)", choices=list(htmlparser.PARSERS), default=htmlparser.DEFAULT_PARSER)  # noqa: E501
     parser.add_argument('--csv', help="stores result in csv", action='store_true')  # noqa: E501
     parser.add_argument('--make', help="[only for Developer] do some build tasks", action='store_true')  # noqa: E501
     parser.add_argument('--test', help="[only for Developer] do some test tasks", action='store_true')  # noqa: E501
@@ -90,7 +153,7 @@ def main(args):
         args: arguments from the program call with the options
 
     Return:
-        int if no error has occurred 0
+        int if no error has occurred 0, 1 if `--makejson` did not save the catalog
 
     Raises:
         NotImplementedError: if option test is selected
@@ -113,22 +176,106 @@ def main(args):
                                 logging.handlers.RotatingFileHandler(
                                     "{0}/{1}.log".format(logPath, fileName), backupCount=3)]
                             )
+    htmlparser.setParser(parsed_args.parser)
+    PyLeiheWeb.Retry = RetryPolicy(retries=parsed_args.retries,
+                                   budget=parsed_args.retry_budget,
+                                   host_budget=parsed_args.retry_host_budget)
+    if parsed_args.connect_timeout or parsed_args.read_timeout:
+        PyLeiheWeb.TIMEOUT = (parsed_args.connect_timeout or PyLeiheWeb.TIMEOUT[0],
+                              parsed_args.read_timeout or PyLeiheWeb.TIMEOUT[1])
+    if parsed_args.http_cache:
+        PyLeiheWeb.ResponseCache = HTTPCache(parsed_args.http_cache_dir)
+    status = 0
     if parsed_args.makejson:
-        makejson(parsed_args.loadonline, parsed_args.jsonfile)
-    if parsed_args.search is not None:
-        search_print(top=parsed_args.top,
-                     search=parsed_args.search,
-                     category=parsed_args.category,
-                     use_json=not parsed_args.loadonline,
-                     jsonfile=parsed_args.jsonfile,
-                     threads=parsed_args.threads)
+        if makejson(parsed_args.loadonline, parsed_args.jsonfile,
+                    threads=parsed_args.threads) is None:
+            status = 1
+    if parsed_args.city:
+        city_print(parsed_args.city, use_json=not parsed_args.loadonline,
+                   jsonfile=parsed_args.jsonfile)
+    if parsed_args.search is not None or parsed_args.search_file:
+        cache = None
+        if parsed_args.cache or parsed_args.cache_only:
+            cache = SearchCache(parsed_args.cache_file,
+                                ttl=parsed_args.cache_ttl,
+                                negative_ttl=parsed_args.cache_negative_ttl)
+        limits = None
+        if parsed_args.host_rate or parsed_args.host_concurrency:
+            limits = HostLimits(rate=parsed_args.host_rate,
+                                concurrency=parsed_args.host_concurrency)
+        adaptive = None
+        if parsed_args.adaptive:
+            if parsed_args.engine == "threads":
+                adaptive = AdaptiveLimiter(initial=parsed_args.threads,
+                                           maximum=parsed_args.max_threads)
+            else:
+                logging.warning("The adaptive concurrency is only available with the "
+                                "engine 'threads'")
+        options = dict(category=parsed_args.category,
+                       use_json=not parsed_args.loadonline,
+                       jsonfile=parsed_args.jsonfile,
+                       threads=parsed_args.threads,
+                       engine=parsed_args.engine,
+                       concurrency=parsed_args.concurrency,
+                       stream=parsed_args.stream,
+                       full_page=parsed_args.full_page,
+                       cache=cache,
+                       cache_only=parsed_args.cache_only,
+                       limits=limits,
+                       adaptive=adaptive,
+                       deadline=parsed_args.deadline)
+        if parsed_args.state:
+            options["state"] = parsed_args.state
+        health = None
+        if parsed_args.health:
+            health = CircuitBreaker(healthPath(parsed_args.jsonfile),
+                                    threshold=parsed_args.health_threshold,
+                                    cooldown=parsed_args.health_cooldown)
+            options["health"] = health
+        hedger = None
+        if parsed_args.hedge:
+            if parsed_args.engine == "threads":
+                hedger = Hedger(percentile=parsed_args.hedge_percentile,
+                                budget=parsed_args.hedge_budget,
+                                workers=adaptive.maximum if adaptive is not None
+                                else parsed_args.threads)
+                options["hedger"] = hedger
+            else:
+                logging.warning("Hedging is only available with the engine 'threads'")
+        if parsed_args.search_file:
+            searches = read_search_file(parsed_args.search_file)
+            if parsed_args.search is not None:
+                searches.insert(0, parsed_args.search)
+            search_batch_print(top=parsed_args.top, searches=searches, **options)
+        else:
+            search_print(top=parsed_args.top, search=parsed_args.search, **options)
+        if adaptive is not None:
+            print("Parallelitaet: {limit} (maximal {peak}, im Mittel {average:.1f}, "
+                  "{decreases}x reduziert)".format(**adaptive.stats()))
+        if hedger is not None:
+            print("Hedging: {fired} von {requests} Suchen dupliziert, "
+                  "{won} gewonnen".format(**hedger.stats()))
+            hedger.close()
+        if health is not None:
+            print("Gesundheit: {open} Bibliotheken gesperrt, {skipped} Suchen "
+                  "uebersprungen".format(**health.stats()))
+            health.save()
+        if cache is not None:
+            logging.debug("Search cache: %r", cache)
+            cache.close()
+    logging.info("Retries: %r", PyLeiheWeb.Retry)
+    if PyLeiheWeb.ResponseCache is not None:
+        print("HTTP-Cache: {:.0%} der Seiten aus dem Cache ({} von {})".format(
+            PyLeiheWeb.ResponseCache.hitRate(), PyLeiheWeb.ResponseCache.hits,
+            PyLeiheWeb.ResponseCache.hits + PyLeiheWeb.ResponseCache.misses))
+        PyLeiheWeb.ResponseCache = None
     if parsed_args.make:
         dev_make()
     if parsed_args.test:
         raise NotImplementedError("run the test in the project directory with `pytest`")
     if parsed_args.csv:
         raise NotImplementedError("CSV export not yet available")
-    return 0
+    return status
 
 
 def init():
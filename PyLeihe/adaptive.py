@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the `AdaptiveLimiter`, which adapts the number of concurrent searches
+during a run (AIMD: additive increase, multiplicative decrease).
+
+* every successful search increases the limit by `1 / limit`
+  (one more concurrent search per round of `limit` searches)
+* a push back of the servers halves the limit (at most once per round):
+    - HTTP `429 Too Many Requests` or `5xx` (`requests.HTTPError`)
+    - a connection error (search result `-4`)
+    - a rising latency: the recent latency (moving average) is more than
+      `LATENCY_FACTOR` times the baseline (the lowest recent latency,
+      which slowly follows the recent latency upwards)
+      (only searches sent to the servers count, not results from a cache
+      or skipped searches, see the argument `sample` of `AdaptiveLimiter.wrap`)
+
+The libraries answer with very different latencies, so a single slow search
+is no push back; only the moving average over several searches is compared.
+"""
+import logging
+import threading
+import time
+
+
+def isPushback(exc):
+    """
+    Returns whether the exception is a push back of the server (HTTP 429 or 5xx).
+    """
+    import requests  # pylint: disable=import-outside-toplevel
+    response = getattr(exc, "response", None)
+    if not isinstance(exc, requests.HTTPError) or response is None:
+        return False
+    return response.status_code == 429 or response.status_code >= 500
+
+
+class AdaptiveLimiter:
+    """
+    Thread-safe concurrency limit which follows the push back of the servers.
+
+    `acquire` blocks while `limit` searches are in flight,
+    `release` reports the outcome of a search and adapts the limit.
+    """
+    INITIAL = 4
+    MINIMUM = 1
+    MAXIMUM = 32
+    DECREASE = 0.5
+    LATENCY_FACTOR = 3.0
+    # weight of a new latency in the recent latency (moving average)
+    RECENT_WEIGHT = 0.1
+    # weight with which the baseline follows a higher recent latency
+    BASELINE_WEIGHT = 0.002
+    # lower bound of the baseline latency (e.g. for results from a cache)
+    MIN_LATENCY = 0.05
+
+    def __init__(self, initial=None, minimum=None, maximum=None):
+        """
+        Arguments:
+            initial (int): _optional_ concurrency at the start
+            minimum (int): _optional_ lowest concurrency
+            maximum (int): _optional_ highest concurrency (number of threads)
+        """
+        self.minimum = minimum or self.MINIMUM
+        self.maximum = max(maximum or self.MAXIMUM, self.minimum)
+        self.limit = float(min(max(initial or self.INITIAL, self.minimum), self.maximum))
+        self.peak = int(self.limit)
+        self.increases = 0
+        self.decreases = 0
+        self.completed = 0
+        self._level_sum = 0
+        self._last_decrease = float("-inf")
+        self._recent = None
+        self._baseline = None
+        self._inflight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Waits until less than `limit` searches are in flight and reserves a slot.
+        """
+        with self._cond:
+            while self._inflight >= int(self.limit):
+                self._cond.wait()
+            self._inflight += 1
+
+    def _slow(self, latency):
+        if self._recent is None:
+            self._recent = self._baseline = latency
+        self._recent += self.RECENT_WEIGHT * (latency - self._recent)
+        if self._recent < self._baseline:
+            self._baseline = self._recent
+        else:
+            self._baseline += self.BASELINE_WEIGHT * (self._recent - self._baseline)
+        return self._recent > self.LATENCY_FACTOR * max(self._baseline, self.MIN_LATENCY)
+
+    def _increase(self):
+        before = int(self.limit)
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        if int(self.limit) > before:
+            self.increases += 1
+            self.peak = max(self.peak, int(self.limit))
+
+    def _decrease(self):
+        # only one decrease per round, the searches of the round share the cause
+        if self.completed - self._last_decrease < self.limit:
+            return
+        self.limit = max(self.minimum, self.limit * self.DECREASE)
+        self._last_decrease = self.completed
+        self.decreases += 1
+        logging.info("Push back of the servers, concurrency reduced to %i", int(self.limit))
+
+    def release(self, latency=None, pushback=False):
+        """
+        Releases the slot of a finished search and adapts the limit.
+
+        Arguments:
+            latency (float): _optional_ duration of the successful search in seconds,
+                `None` leaves the limit unchanged (unless `pushback`)
+            pushback (bool): whether the servers pushed back
+        """
+        with self._cond:
+            self._inflight -= 1
+            self.completed += 1
+            self._level_sum += int(self.limit)
+            if pushback or (latency is not None and self._slow(latency)):
+                self._decrease()
+            elif latency is not None:
+                self._increase()
+            self._cond.notify_all()
+
+    def wrap(self, func, error=None, fallback=None, retries=1, sample=None):
+        """
+        Wraps a function for a thread pool so that it runs within the limit.
+
+        Arguments:
+            func: function for one work item
+            error: _optional_ function which returns whether a result
+                reports a connection error (push back)
+            fallback: _optional_ function which returns the result for a work item
+                whose requests were still pushed back after `retries` retries,
+                without it the `requests.HTTPError` is raised
+            retries (int): number of retries after a push back (HTTP 429 or 5xx)
+            sample: _optional_ function which returns whether the latency of a
+                result is a sample of the servers (e.g. not for a cached result),
+                other results leave the limit unchanged
+
+        Returns:
+            function `run(item)`
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        def run(item):
+            for attempt in range(retries + 1):
+                self.acquire()
+                start = time.monotonic()
+                try:
+                    result = func(item)
+                except requests.HTTPError as exc:
+                    pushback = isPushback(exc)
+                    self.release(pushback=pushback)
+                    if not pushback or attempt == retries:
+                        if pushback and fallback is not None:
+                            return fallback(item)
+                        raise
+                    continue
+                except BaseException:
+                    self.release()
+                    raise
+                failed = error is not None and error(result)
+                measured = not failed and (sample is None or sample(result))
+                self.release(time.monotonic() - start if measured else None, pushback=failed)
+                return result
+            return None  # pragma: no cover
+        return run
+
+    def average(self):
+        """
+        Returns:
+            float: mean concurrency limit over all finished searches
+        """
+        return self._level_sum / self.completed if self.completed else float(int(self.limit))
+
+    def stats(self):
+        """
+        Returns:
+            dict with the current `limit`, the `peak`, the `average`
+            and the number of `increases` and `decreases`
+        """
+        return {"limit": int(self.limit), "peak": self.peak, "average": self.average(),
+                "increases": self.increases, "decreases": self.decreases}
+
+    def __repr__(self):
+        return "{}(limit={}, peak={}, average={:.1f}, decreases={})".format(
+            self.__class__.__name__, int(self.limit), self.peak, self.average(), self.decreases)
@@ -1,12 +1,39 @@
 """
 Basic Class to provide similar interfaces
 and basic methods to all child classes
+
+`requests` and `bs4` are imported on the first request or parse call,
+so importing the package (e.g. for `python3 -m PyLeihe --help`) stays fast.
 """
+import functools
+import importlib
 import json
 import urllib.parse as up
 import logging
-import requests
-from bs4 import BeautifulSoup
+from . import htmlparser
+from .retry import RetryPolicy, classify
+from .sessions import SessionPool
+
+_DOCUMENT_ATTR = "_pyleihe_document"
+
+
+@functools.lru_cache(maxsize=None)
+def optionalModule(name):
+    """
+    Imports an optional package (e.g. `orjson` or `aiohttp`) on the first call.
+
+    Returns:
+        the module or `None` if it is not installed
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def _newSession():
+    import requests  # pylint: disable=import-outside-toplevel
+    return requests.Session()
 
 
 class PyLeiheWeb:
@@ -17,13 +44,36 @@ class PyLeiheWeb:
     DOMAIN = "onleihe.net"
     SCHEME = "HTTPS"
 
-    Session = None
+    # `PyLeihe.httpcache.HTTPCache` for GET requests, disabled if `None`
+    ResponseCache = None
+    # `PyLeihe.retry.RetryPolicy` of `simpleSession`
+    Retry = RetryPolicy()
+    # (connect, read) timeout of the requests in seconds
+    TIMEOUT = (5, 20)
 
     def __init__(self, sess=None):
-        if sess is not None:
-            self.Session = sess
-        if self.Session is None or sess is True:
-            self.Session = requests.Session()
+        """
+        Arguments:
+            sess: _optional_ the session for the http requests
+                * `None` a new `requests.Session` is created on the first use
+                * `True` forces a new `requests.Session`
+                * `requests.Session` or `PyLeihe.sessions.SessionPool` is used
+                    (and can be shared with other instances)
+        """
+        self._session = _newSession() if sess is True else sess
+
+    @property
+    def Session(self):
+        """
+        The session for the http requests, created on the first use if none was given.
+        """
+        if self._session is None:
+            self._session = _newSession()
+        return self._session
+
+    @Session.setter
+    def Session(self, sess):
+        self._session = sess
 
     @classmethod
     def reprJSON(cls):
@@ -68,13 +118,18 @@ class PyLeiheWeb:
     def _loadJSONFile(cls, filename=""):
         """
         Private method to load a JSON file and
-        automatically convert it to python types.
+        automatically convert it to python types
+        (with the faster `orjson` if installed).
 
         Returns:
             the json data as python types (dict or list)
         """
         if filename == "":
             filename = cls.__name__
+        orjson = optionalModule("orjson")
+        if orjson is not None:
+            with open('{}.json'.format(filename), 'rb') as f:
+                return orjson.loads(f.read())
         with open('{}.json'.format(filename), 'r') as f:
             data = json.load(f)
         return data
@@ -102,6 +157,37 @@ class PyLeiheWeb:
         """
         raise NotImplementedError()
 
+    @staticmethod
+    def parseHTML(content):
+        """
+        Parses html content into a document tree.
+
+        The backend is selected with `PyLeihe.htmlparser.setParser`.
+        If `content` is a response, the parsed document is memoized on it,
+        so every further call with the same response (and unchanged
+        `content` and backend) returns the same document without parsing it again.
+
+        Arguments:
+            content: html content as `str` or `bytes`,
+                `requests.Response` with the html page in `requests.Response.content`
+                or an already parsed document
+
+        Returns:
+            parsed document, see `PyLeihe.htmlparser.parse`
+        """
+        if htmlparser.isDocument(content):
+            return content
+        if isinstance(content, (str, bytes)):
+            return htmlparser.parse(content)
+        raw = content.content
+        parser = htmlparser.getParser()
+        cached = vars(content).get(_DOCUMENT_ATTR)
+        if cached is not None and cached[0] is raw and cached[1] == parser:
+            return cached[2]
+        document = htmlparser.parse(raw, parser)
+        setattr(content, _DOCUMENT_ATTR, (raw, parser, document))
+        return document
+
     @classmethod
     def searchNodeMultipleContain(cls, content, Node, NodeAttr, ContNode=None, ContNodeData=None):
         """
@@ -112,7 +198,7 @@ class PyLeiheWeb:
         with certain properties `ContNodeData`.
 
         Arguments:
-            content (str):  html content
+            content:  html content, response or parsed document, see `parseHTML`
             Node (str): name of the node
             NodeAttr (dict[str: str]): with the attributes of the nodes
             ContNode (str):  optional addition node wich must be inside of `Node`
@@ -122,7 +208,7 @@ class PyLeiheWeb:
             First node that meets the conditions
         """
         ContNodeData = ContNodeData or {}
-        soup = BeautifulSoup(content, features="html.parser")
+        soup = cls.parseHTML(content)
         forms = soup.find_all(Node, attrs=NodeAttr)
         found_forms = len(forms)
         if found_forms == 0:
@@ -131,7 +217,8 @@ class PyLeiheWeb:
                 and (ContNodeData == "" or not ContNodeData)):
             return forms[0]
         try:
-            return next(f for f in forms if f.find(ContNode, ContNodeData))
+            # an empty node name matches any node
+            return next(f for f in forms if f.find(ContNode or None, ContNodeData))
         except StopIteration:
             return None
 
@@ -144,7 +231,7 @@ class PyLeiheWeb:
         a specific `ContNode`.
 
         Arguments:
-            content (str): html content
+            content: html content, response or parsed document, see `parseHTML`
             curr_url: _optional_ address of the form,
                 if available this is combined with the target address
             ContNode (str): optional node wich must be inside of the form
@@ -195,15 +282,44 @@ class PyLeiheWeb:
             pass
         return title
 
-    def simpleSession(self, url, method="POST", retry=1, **kwargs):
+    def _useResponseCache(self, response_cache, url, mp, retry, **kwargs):
+        """
+        Answers a `304 Not Modified` from the `response_cache` or stores a new page.
+        """
+        if mp.status_code == 304:
+            cached = response_cache.load(url, mp)
+            if cached is not None:
+                response_cache.count(hit=True)
+                return cached
+            # cache entry is gone: load the page again without condition
+            kwargs["headers"] = {k: v for k, v in kwargs["headers"].items()
+                                 if k not in ("If-None-Match", "If-Modified-Since")}
+            return self.simpleSession(url, method="GET", retry=retry, cache=False, **kwargs)
+        response_cache.count(hit=False)
+        response_cache.store(url, mp)
+        return mp
+
+    def simpleSession(self, url, method="POST", retry=None, cache=True, idempotent=None,
+                      **kwargs):
         """
         Simple function to load one URL with GET or POST.
 
+        Failed requests are repeated according to the `Retry` policy
+        (see `PyLeihe.retry.RetryPolicy`).
+
         Arguments:
             url (str or up.ParseResult): with the destination adress
             method (str): http method to acces the url,
                           currently supported: `GET` and `POST`
-            **kwargs: additional configuration for `request.Session.get` or `post`
+            retry (int): number of retries after a closed connection, a timeout
+                or HTTP `429`/`5xx`, default `Retry.retries`; negative for no request
+            cache (bool): use the `ResponseCache` (if set) for this GET request:
+                cached pages are revalidated with a conditional request
+                and a `304 Not Modified` is answered from the cache
+            idempotent (bool): whether the request may be repeated,
+                default only for `GET`, `HEAD` and `OPTIONS`
+            **kwargs: additional configuration for `request.Session.get` or `post`,
+                default `timeout` is `TIMEOUT`
 
         Returns:
             * `None` if the data could not be loaded
@@ -216,34 +332,55 @@ class PyLeiheWeb:
                 - [Errno 11004] getaddrinfo failed
                 - [Errno -2] Name or service not known
                 - [Errno 8] nodename nor servname
+                - closed connections and timeouts
 
         """
-        mp = None
-        # prevent recursive crash
+        policy = self.Retry
+        if retry is None:
+            retry = policy.retries
+        # prevent requests without attempt
         if retry < 0:
             return None
         method = method.upper()
         # unparse url if necessary
         if isinstance(url, up.ParseResult):
             url = up.urlunparse(url)
-        # try requests and capture ConnectionError's
-        try:
-            mp = self.Session.request(method, url, **kwargs)
-            mp.raise_for_status()
-        except requests.ConnectionError as exc:
-            message = str(exc)
-            # reset mp return value
-            mp = None
-            if 'Remote end closed connection without response' in message:
-                logging.warning("[%s] Remote end closed connection: %s", self._get_title(), url)
-                if retry > 0:
-                    logging.info("Try it again (retry %i)", retry)
-                    mp = self.simpleSession(url, method=method, retry=retry - 1, **kwargs)
-            elif ("[Errno 11004] getaddrinfo failed" in message
-                  or "[Errno -2] Name or service not known" in message
-                  or "[Errno 8] nodename nor servname " in message):
-                logging.warning("[%s] Hostname can't be resolved: %s",
-                                str(self), url, exc_info=False)
-            else:
-                raise
-        return mp
+        response_cache = self.ResponseCache if cache and method == "GET" else None
+        if response_cache is not None:
+            kwargs["headers"] = dict(kwargs.get("headers") or {},
+                                     **response_cache.conditionalHeaders(url))
+        kwargs.setdefault("timeout", self.TIMEOUT)
+        repeatable = policy.isIdempotent(method, idempotent)
+        import requests  # pylint: disable=import-outside-toplevel
+        attempt = 0
+        while True:
+            policy.count()
+            # try requests and capture ConnectionError's
+            try:
+                mp = self.Session.request(method, url, **kwargs)
+                mp.raise_for_status()
+                if response_cache is not None:
+                    mp = self._useResponseCache(response_cache, url, mp, retry, **kwargs)
+                return mp
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as exc:
+                reason = classify(exc)
+                if reason == "dns":
+                    logging.warning("[%s] Hostname can't be resolved: %s",
+                                    str(self), url, exc_info=False)
+                    return None
+                if reason is None:
+                    raise
+                if reason == "closed":
+                    logging.warning("[%s] Remote end closed connection: %s",
+                                    self._get_title(), url)
+                else:
+                    logging.warning("[%s] Request failed (%s): %s", self._get_title(), exc, url)
+                if attempt >= retry or not repeatable or \
+                        not policy.allow(SessionPool.hostKey(url), reason):
+                    if reason == "status":
+                        raise
+                    return None
+                delay = policy.delay(attempt, getattr(exc, "response", None))
+                attempt += 1
+                logging.info("Try it again (retry %i) in %.2f s", attempt, delay)
+                policy.sleep(delay)
@@ -2,11 +2,21 @@
 """
 Contains container objects to group the libraries and bibliographies logically
 """
-from bs4 import BeautifulSoup
-
-
+import concurrent.futures
+import logging
+import os
+import time
 from .basic import PyLeiheWeb
-from .localgroup import LocalGroup
+from .localgroup import LocalGroup, discoverSearchURLs
+from .sessions import SessionPool
+from .indexedlist import IndexedList
+from .cityindex import CityIndex
+from .bibliography import Bibliography
+from . import snapshot
+from . import shards
+
+# number of states loaded at the same time by `PyLeiheNet.loadallBundesLaender`
+STATE_THREADS = 16
 
 
 class PyLeiheNet(PyLeiheWeb):
@@ -14,10 +24,37 @@ class PyLeiheNet(PyLeiheWeb):
     Group Object for multiple `LocalGroup` instances.
     """
     URL_Deutschland = "fuer-leser-hoerer-zuschauer/ihre-onleihe-finden/onleihen-in-deutschland.html"
+    # indexes of `Laender`, see `PyLeihe.indexedlist.IndexedList`
+    INDEXES = {"lid": lambda land: land.lid,
+               "name": lambda land: land.name.lower()}
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, sess=None):
+        """
+        Arguments:
+            sess: _optional_ session shared with all contained `LocalGroup`
+                and `PyLeihe.bibliography.Bibliography` instances,
+                by default a new `PyLeihe.sessions.SessionPool`
+        """
+        super().__init__(sess if sess is not None
+                         else SessionPool(pool_maxsize=STATE_THREADS))
         self.Laender = []
+        self.Cities = None
+        # seconds per state name and exceptions of the failed states
+        # of the last `loadallBundesLaender`
+        self.LoadTimes = {}
+        self.LoadErrors = {}
+
+    @property
+    def Laender(self):
+        """
+        `PyLeihe.indexedlist.IndexedList` of the contained `LocalGroup` instances
+        (indexed by id and name).
+        """
+        return self._laender
+
+    @Laender.setter
+    def Laender(self, laender):
+        self._laender = IndexedList(laender, keys=self.INDEXES)
 
     def __getitem__(self, key):
         """
@@ -29,15 +66,15 @@ class PyLeiheNet(PyLeiheWeb):
                 * `str` the name of the requested `LocalGroup`
                     _case insensitive_
         """
-        for x in self.Laender:
-            if x.lid == key or (isinstance(key, str) and x.name.lower() == key.lower()):
-                return x
-        return None
+        if isinstance(key, str):
+            return self.Laender.lookup("name", key.lower())
+        return self.Laender.lookup("lid", key)
 
     def getBib(self, name):
         """
         Searches in all `LocalGroup` instances for the `PyLeihe.bibliography.Bibliography`
-        with the name and returns the first one.
+        with the name and returns the first one (one index lookup per `LocalGroup`,
+        a `LocalGroup` of the shards is only loaded if the manifest lists the title).
 
         Arguments:
             name (str): name of the bib to search for
@@ -52,6 +89,43 @@ class PyLeiheNet(PyLeiheWeb):
                 return b
         return None
 
+    def buildCityIndex(self):
+        """
+        Builds the `PyLeihe.cityindex.CityIndex` of all libraries in `Cities`
+        (called by the first `findCity`, again after changes of the libraries).
+
+        Returns:
+            PyLeihe.cityindex.CityIndex
+        """
+        self.Cities = CityIndex([b for l in self.Laender for b in l.Bibliotheken])
+        return self.Cities
+
+    def findCity(self, city, prefix=False):
+        """
+        Finds the libraries serving a city (case insensitive, umlauts may be
+        written as `ae`, `oe`, `ue` and `ss`).
+
+        Arguments:
+            city (str): name of the city
+            prefix (bool): find all cities starting with `city`
+
+        Returns:
+            list with tuples of the city name and the `PyLeihe.bibliography.Bibliography`
+        """
+        if self.Cities is None:
+            self.buildCityIndex()
+        if prefix:
+            return self.Cities.findPrefix(city)
+        return self.Cities.find(city)
+
+    def getBibsByHost(self, host):
+        """
+        Returns a list with the `PyLeihe.bibliography.Bibliography` instances of all
+        `LocalGroup` instances whose `search_url` points to the `host`,
+        see `LocalGroup.getBibsByHost`.
+        """
+        return [b for l in self.Laender for b in l.getBibsByHost(host)]
+
     def reprJSON(self):
         """
         function returns a representation of the instance from JSON compliant data types
@@ -63,7 +137,7 @@ class PyLeiheNet(PyLeiheWeb):
         return {l.name: l.reprJSON() for l in self.Laender}
 
     @classmethod
-    def loadFromJSON(cls, data=None, filename=""):
+    def loadFromJSON(cls, data=None, filename="", sess=None):
         """
         Converts a typical json representation consisting of lists and dicts into an instance.
 
@@ -75,31 +149,177 @@ class PyLeiheNet(PyLeiheWeb):
         Arguments:
             data (dict): _optional_ the representation as dict and lists
             filename (str): _optional_ the path to the json file containing the data
+            sess: _optional_ session shared by all instances, see `PyLeiheNet.__init__`
         """
-        pln = PyLeiheNet()
+        pln = PyLeiheNet(sess=sess)
         if data is None:
             data = cls._loadJSONFile(filename)
         pln.Laender = [LocalGroup.loadFromJSON(
-            ldata) for ldata in data.values()]
+            ldata, sess=pln.Session) for ldata in data.values()]
         return pln
 
-    def loadallBundesLaender(self, groupbytitle=True, loadsearchURLs=False):
+    def toSnapshotFile(self, filename=""):
+        """
+        Stores the catalog as binary snapshot next to the JSON file
+        (see `PyLeihe.snapshot` and `PyLeihe.snapshot.snapshotPath`).
+
+        Arguments:
+            filename (str): _optional_ path of the JSON catalog without extension
+        """
+        snapshot.writeSnapshot(self, snapshot.snapshotPath(filename))
+
+    @classmethod
+    def loadFromSnapshot(cls, filename="", sess=None):
+        """
+        Loads the catalog from the binary snapshot of the JSON file `filename`
+        (fast path without JSON parser, see `PyLeihe.snapshot`).
+
+        Arguments:
+            filename (str): _optional_ path of the JSON catalog without extension
+            sess: _optional_ session shared by all instances, see `PyLeiheNet.__init__`
+
+        Raises:
+            PyLeihe.snapshot.SnapshotError: if the file is no valid snapshot
+            OSError: if the file can't be read
+        """
+        pln = PyLeiheNet(sess=sess)
+        with snapshot.pausedGC():
+            states, entries = snapshot.readSnapshot(snapshot.snapshotPath(filename))
+            laender = []
+            allbibs = []
+            for lid, name, bibs in states:
+                land = LocalGroup(lid, name, sess=pln.Session)
+                land.Bibliotheken = [Bibliography.fromSnapshot(*bib, session=pln.Session)
+                                     for bib in bibs]
+                allbibs.extend(land.Bibliotheken)
+                laender.append(land)
+            pln.Laender = laender
+            pln.Cities = CityIndex(allbibs, entries)
+        return pln
+
+    def toShards(self, filename=""):
+        """
+        Stores the catalog as one JSON file per `LocalGroup` with a manifest
+        (see `PyLeihe.shards` and `PyLeihe.shards.shardPath`).
+
+        Arguments:
+            filename (str): _optional_ path of the JSON catalog without extension
+        """
+        shards.writeShards(self, shards.shardPath(filename))
+
+    @classmethod
+    def loadFromShards(cls, filename="", sess=None):
+        """
+        Loads the catalog from the shards of the JSON file `filename`.
+        Only the manifest is read, every `LocalGroup` loads its libraries on the
+        first access (see `LocalGroup.fromShard`), so a lookup of one state or
+        a `getBib` reads only the file of that state.
+
+        Arguments:
+            filename (str): _optional_ path of the JSON catalog without extension
+            sess: _optional_ session shared by all instances, see `PyLeiheNet.__init__`
+
+        Raises:
+            ValueError: if the manifest is broken
+            OSError: if the manifest can't be read
+        """
+        pln = PyLeiheNet(sess=sess)
+        directory = shards.shardPath(filename)
+        pln.Laender = [LocalGroup.fromShard(
+            state["id"], state["name"],
+            os.path.join(directory, os.path.splitext(state["file"])[0]),
+            titles=state.get("titles"), sess=pln.Session)
+            for state in shards.readManifest(directory)]
+        return pln
+
+    def loadsearchURLs(self, newtitle=False, force=False, threads=1, progress=None):
+        """
+        Loads the search urls of the libraries of all `LocalGroup` instances
+        together, so up to `threads` libraries of all states are loaded at the
+        same time (see `PyLeihe.localgroup.discoverSearchURLs`).
+        The result is the same as `LocalGroup.loadsearchURLs` for every state.
+
+        Arguments:
+            newtitle (bool): _optional_ generate new titles, see `LocalGroup.updateTitles`
+            force (bool): _optional_ loads the search urls also for libraries
+                which already have one
+            threads (int): _optional_ number of libraries loaded at the same time
+            progress: _optional_ function called with the number of finished and of all
+                libraries
+        """
+        discoverSearchURLs([bib for land in self.Laender
+                            for bib in land.pendingSearchURLs(force)], threads, progress)
+        for land in self.Laender:
+            land.updateTitles(newtitle)
+        # the city index is built again on the next `findCity`
+        self.Cities = None
+
+    def groupbytitle(self):
+        """
+        Merges the libraries with the same title in every `LocalGroup`
+        (see `LocalGroup.groupbytitle`), the city index is built again on the
+        next `findCity`.
+        """
+        for land in self.Laender:
+            land.groupbytitle()
+        self.Cities = None
+
+    def loadallBundesLaender(self, groupbytitle=True, loadsearchURLs=False, threads=None):
         """
         Loads the federal states and the addresses of the corresponding libraries from the Internet.
 
+        The pages of the states are loaded and parsed concurrently by up to `threads`
+        threads. A failed state is logged and keeps its libraries, the other
+        states are loaded anyway. The duration per state is stored in `LoadTimes`,
+        the exception per failed state in `LoadErrors`.
+
         Arguments:
             groupbytitle (bool): if true calls `LocalGroup.groupbytitle()`
             loadsearchURLs (bool): if true calls `LocalGroup.loadsearchURLs()`
+            threads (int): _optional_ number of states loaded at the same time,
+                by default `STATE_THREADS`
         """
         if not self.Laender:
             self.getBundesLaender()
 
-        for land in self.Laender:
-            land.loadBibURLs()
+        laender = list(self.Laender)
+        results = []
+        if laender:
+            workers = min(threads or STATE_THREADS, len(laender))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                       thread_name_prefix="State") as executor:
+                results = list(executor.map(self._loadBundesLand, laender))
+        self.LoadTimes = {land.name: elapsed for land, (elapsed, _exc) in zip(laender, results)}
+        self.LoadErrors = {land.name: exc for land, (_elapsed, exc) in zip(laender, results)
+                           if exc is not None}
+        for land in laender:
+            if land.name in self.LoadErrors:
+                continue
             if loadsearchURLs:
                 land.loadsearchURLs()
             if groupbytitle:
                 land.groupbytitle()
+        # the city index is built again on the next `findCity`
+        self.Cities = None
+
+    @staticmethod
+    def _loadBundesLand(land):
+        """
+        Loads the libraries of one state for `loadallBundesLaender`.
+
+        Returns:
+            tuple with the duration in seconds and the exception or `None`
+        """
+        start = time.perf_counter()
+        try:
+            land.loadBibURLs()
+        except Exception as exc:  # pylint: disable=broad-except
+            elapsed = time.perf_counter() - start
+            logging.error("The state '%s' could not be loaded: %s", land.name, exc)
+            return elapsed, exc
+        elapsed = time.perf_counter() - start
+        logging.debug("State '%s' loaded in %.3f s", land.name, elapsed)
+        return elapsed, None
 
     def getBundesLaender(self):
         """
@@ -109,7 +329,7 @@ class PyLeiheNet(PyLeiheWeb):
         germany = self.getURL(self.URL_Deutschland)
         r = self.simpleGET(germany)
         # analyze html
-        soup = BeautifulSoup(r.content, features="html.parser")
+        soup = self.parseHTML(r)
         areas = soup.find_all('area', attrs={'alt': 'Zum Wunschformular'})
         unique_urls = {a['href'] for a in areas}
-        self.Laender = [LocalGroup.from_url(a) for a in unique_urls]
+        self.Laender = [LocalGroup.from_url(a, sess=self.Session) for a in unique_urls]
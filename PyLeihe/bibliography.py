@@ -4,11 +4,13 @@ Contains the `Bibliography` class definition to abstract one library.
 Also contains the enumeration for the diferent mediatypes.
 """
 from enum import Enum
+import codecs
 import re
 import logging
 import urllib.parse as up
 
-from .basic import PyLeiheWeb
+from .basic import PyLeiheWeb, optionalModule
+from .indexedlist import keyChanged
 
 
 class MediaType(Enum):
@@ -30,10 +32,108 @@ class MediaType(Enum):
         return self.name
 
 
+RESULT_MARKER = "Suchergebnis"
+RESULT_PATTERN = re.compile(r"Suchergebnis .* ([\d.]+|keine)[^0-9.]*[Tt]reffer.*")
+
+
+def _countMatch(m):
+    """
+    Converts a match of `RESULT_PATTERN` into the number of results.
+    """
+    if m.group(1) == "keine":
+        return 0
+    return int(m.group(1).replace(".", ""))
+
+
+class ResultCounter:
+    """
+    Incremental search for the number of results in a result page
+    which is received in chunks.
+
+    Only complete lines are searched, so a number is not taken from a line
+    that is still being received.
+    The text before the first `RESULT_MARKER` is discarded.
+    """
+
+    def __init__(self, encoding=None, max_bytes=1024 * 1024):
+        """
+        Arguments:
+            encoding (str): _optional_ encoding of the page (default `utf-8`)
+            max_bytes (int): _optional_ limit for the received bytes, see `exceeded`
+        """
+        try:
+            decoder = codecs.getincrementaldecoder(encoding or "utf-8")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")
+        self._decoder = decoder(errors="replace")
+        self._text = ""
+        self._found = False
+        self.received = 0
+        self.max_bytes = max_bytes
+
+    @property
+    def exceeded(self):
+        """
+        `True` if at least `max_bytes` bytes were received.
+        """
+        return self.received >= self.max_bytes
+
+    def feed(self, chunk):
+        """
+        Adds the next chunk of the page.
+
+        Arguments:
+            chunk (bytes): next part of the page
+
+        Returns:
+            * `None` if the number of results is not yet known
+            * int: number of results
+        """
+        self.received += len(chunk)
+        self._text += self._decoder.decode(chunk)
+        if not self._found:
+            start = self._text.find(RESULT_MARKER)
+            if start < 0:
+                self._text = self._text[-len(RESULT_MARKER):]
+                return None
+            self._text = self._text[start:]
+            self._found = True
+        end = self._text.rfind("\n")
+        if end <= 0:
+            return None
+        m = RESULT_PATTERN.search(self._text, 0, end)
+        return None if m is None else _countMatch(m)
+
+    def finish(self):
+        """
+        Searches the remaining text at the end of the page.
+
+        Returns:
+            * -1 if regex failed
+            * int: number of results
+        """
+        self._text += self._decoder.decode(b"", final=True)
+        if not self._found:
+            return -1
+        m = RESULT_PATTERN.search(self._text)
+        return -1 if m is None else _countMatch(m)
+
+
 class Bibliography(PyLeiheWeb):
     """
     Abstraction of one or more libraries and their bibliographie
+
+    The instances are compact (`__slots__`) for large catalogs:
+    the session, the parsed `url` and the `title` are created on the first use.
     """
+    __slots__ = ("_session", "url_up", "_url", "cities", "_search_url", "LastSearch",
+                 "SuchVersion", "_title")
+    MAX_RESULT_BYTES = 1024 * 1024
+    STREAM_CHUNK_SIZE = 8192
+    # media entries per result page: smallest page size offered by the onleihe
+    # frontend for counting and the maximum for the full result list
+    PAGE_LIMIT_COUNT = 10
+    PAGE_LIMIT_FULL = 100
 
     def __init__(self, url, cities=None, session=None):
         """
@@ -42,7 +142,8 @@ class Bibliography(PyLeiheWeb):
             cities (list[str]): list of city names that are included in the
                 library association
             session (requests.session): set some session settings for
-                customized search
+                customized search or share the connections with other
+                instances (e.g. `PyLeihe.sessions.SessionPool`)
         """
         super().__init__(session)
         if not url:
@@ -51,15 +152,55 @@ class Bibliography(PyLeiheWeb):
             logging.info("removed wrong 'http//' from '%s'", url)
             url = url.replace("http//", "")
         self.url_up = url
-        self.url = up.urlparse(url)
+        self._url = None
         self.cities = cities or []
 
-        self.search_url = None
+        self._search_url = None
         self.LastSearch = -255
         self.SuchVersion = None
 
-        self.title = ""
-        self.generateTitle()
+        self._title = None
+
+    @property
+    def url(self):
+        """
+        `urllib.parse.ParseResult` of `url_up`, parsed on the first use.
+        """
+        if self._url is None:
+            self._url = up.urlparse(self.url_up)
+        return self._url
+
+    @url.setter
+    def url(self, url):
+        self._url = url
+
+    @property
+    def search_url(self):
+        """
+        url of the search form or `None` if it is not known (see `grepSearchURL`),
+        a change drops the indexes of the lists (see `PyLeihe.indexedlist.keyChanged`).
+        """
+        return self._search_url
+
+    @search_url.setter
+    def search_url(self, search_url):
+        if search_url != self._search_url:
+            self._search_url = search_url
+            keyChanged()
+
+    @property
+    def title(self):
+        """
+        Name of the library, generated from the `url` on the first use
+        (see `generateTitle`) if it was not set.
+        """
+        if self._title is None:
+            self._generateTitleByUrl(self.url)
+        return self._title
+
+    @title.setter
+    def title(self, title):
+        self._title = title
 
     def _generateTitleByUrl(self, url):
         """
@@ -121,7 +262,7 @@ class Bibliography(PyLeiheWeb):
         return jdict
 
     @classmethod
-    def loadFromJSON(cls, data=None, filename=None):
+    def loadFromJSON(cls, data=None, filename=None, session=None):
         """
         Generates a new instance based on JSON data.
 
@@ -130,14 +271,44 @@ class Bibliography(PyLeiheWeb):
                 python objects
                 *if None* `_loadJSONFile` is called and data is loaded from disk
             filename (str): _optional_ the path to the json file containing the data
+            session: _optional_ session for the new instance
 
         Returns:
             new instance
         """
         if data is None:
             data = cls._loadJSONFile(filename)
-        bib = Bibliography(data["url"], cities=data["cities"])
+        bib = Bibliography(data["url"], cities=data["cities"], session=session)
         bib.search_url = data["search_url"]
+        if data.get("name"):
+            bib.title = data["name"]
+        return bib
+
+    @classmethod
+    def fromSnapshot(cls, url, title, search_url, cities, session=None):
+        """
+        Creates an instance from the stored fields without further processing
+        (fast path of `PyLeihe.bibindex.PyLeiheNet.loadFromSnapshot`).
+
+        Arguments:
+            url (str): the already corrected `url_up`
+            title (str): stored title or `None` to generate it
+            search_url (str): stored search url or `None`
+            cities (list[str]): member towns
+            session: _optional_ session for the new instance
+
+        Returns:
+            new instance
+        """
+        bib = cls.__new__(cls)
+        bib._session = session
+        bib.url_up = url
+        bib._url = None
+        bib.cities = cities
+        bib._search_url = search_url
+        bib.LastSearch = -255
+        bib.SuchVersion = None
+        bib._title = title or None
         return bib
 
     @classmethod
@@ -152,7 +323,7 @@ class Bibliography(PyLeiheWeb):
             str: with the destination url of the form
         """
         return cls.getPostFormURL(
-            mp.content,
+            mp,
             curr_url=mp.url,
             ContNode="input", ContNodeData={"id": "searchtext"})
 
@@ -168,7 +339,7 @@ class Bibliography(PyLeiheWeb):
             else `str` with the result url
         """
         a_search = self.searchNodeMultipleContain(
-            mp.content, "a", {'title': 'Erweiterte Suche'})
+            mp, "a", {'title': 'Erweiterte Suche'})
         if a_search is not None:
             logging.debug("extendedSearch hit")
             return a_search.get('href')
@@ -191,7 +362,7 @@ class Bibliography(PyLeiheWeb):
             * else `str` with the result url
         """
         url = None
-        a_search = self.searchNodeMultipleContain(mp.content, "a", mp.url)
+        a_search = self.searchNodeMultipleContain(mp, "a", mp.url)
         if a_search is not None:
             logging.debug("secondSearch hit")
             try_second_search = a_search.get('href')
@@ -214,7 +385,7 @@ class Bibliography(PyLeiheWeb):
         """
         url = None
         a_search = self.searchNodeMultipleContain(
-            mp.content, "a", {"href": re.compile(r'.*onleihe[^\/]*\.de.*')})
+            mp, "a", {"href": re.compile(r'.*onleihe[^\/]*\.de.*')})
         if a_search is not None:
             try_second_search = a_search.get('href')
             mp = self.simpleGET(try_second_search)
@@ -241,6 +412,7 @@ class Bibliography(PyLeiheWeb):
 
         1. Loads the content of the website
         2. trys different methods to extract the post target
+           (all methods share the document parsed once from the page)
             1. [LVL0] searches input field with id for simple search
             2. [LVL1] searches for a link to `onleihe.de`
             3. [LVL2] searches for advanced search
@@ -286,7 +458,7 @@ class Bibliography(PyLeiheWeb):
         """
         if search_result_page is not None:
             set_results_url = self.getPostFormURL(
-                search_result_page.content,
+                search_result_page,
                 curr_url=search_result_page.url,
                 ContNode="select", ContNodeData={"id": "elementsPerPage"})
         set_page = self.Session.post(set_results_url, data={
@@ -294,8 +466,8 @@ class Bibliography(PyLeiheWeb):
         set_page.raise_for_status()
         return set_page
 
-    @staticmethod
-    def parse_results(SearchRequest):
+    @classmethod
+    def parse_results(cls, SearchRequest):
         """
         Extracts the number of search results from the result page
 
@@ -306,17 +478,82 @@ class Bibliography(PyLeiheWeb):
                 * -1 if regex failed
                 * int: number of results
         """
-        m = re.search(
-            r"Suchergebnis .* ([\d.]+|keine)[^0-9.]*[Tt]reffer.*", SearchRequest.text)
+        return cls.parse_results_text(SearchRequest.text)
+
+    @staticmethod
+    def parse_results_text(text):
+        """
+        Extracts the number of search results from the html text of a result page.
+
+        Arguments:
+            text (str): content of the result page
+
+        Returns:
+                * -1 if regex failed
+                * int: number of results
+        """
+        m = RESULT_PATTERN.search(text)
         Treffer = -1
         if m is not None:
-            if m.group(1) == "keine":
-                Treffer = 0
-            else:
-                Treffer = int(m.group(1).replace(".", ""))
+            Treffer = _countMatch(m)
         return Treffer
 
-    def _postSearchParse(self, cmd_id, text: str, kategorie: MediaType, savefile=False):
+    @classmethod
+    def parse_results_stream(cls, SearchRequest, max_bytes=None):
+        """
+        Extracts the number of search results from a streamed result page.
+
+        The page is read in chunks only until the number of results is known
+        (or `max_bytes` were read), then the connection is closed.
+
+        Arguments:
+            SearchRequest: `requests.Response` requested with `stream=True`
+            max_bytes (int): _optional_ limit of the bytes to read,
+                default `MAX_RESULT_BYTES`
+
+        Returns:
+                * -1 if regex failed or the limit was reached
+                * int: number of results
+        """
+        counter = ResultCounter(SearchRequest.encoding, max_bytes or cls.MAX_RESULT_BYTES)
+        try:
+            for chunk in SearchRequest.iter_content(cls.STREAM_CHUNK_SIZE):
+                Treffer = counter.feed(chunk)
+                if Treffer is not None:
+                    return Treffer
+                if counter.exceeded:
+                    logging.info("Result page is larger than %i bytes: %s",
+                                 counter.max_bytes, SearchRequest.url)
+                    return -1
+            return counter.finish()
+        finally:
+            SearchRequest.close()
+
+    @classmethod
+    def _searchData(cls, cmd_id, text: str, kategorie: MediaType, full_page=False):
+        """
+        Builds the form data for a search request.
+
+        Arguments:
+            cmd_id (int): Parameter for the search method: `703` for simple and
+                `701`for extended search
+            text (str): keyword to search for
+            kategorie (MediaType): the media category to be searched
+            full_page (bool): request `PAGE_LIMIT_FULL` media entries instead of
+                the smallest page `PAGE_LIMIT_COUNT` that is sufficient for counting
+
+        Returns:
+            dict: form data for the post request to `search_url`
+        """
+        return {'pMediaType': kategorie.value,
+                'pText': text,
+                "Suchen": "Suche",
+                "cmdId": cmd_id,
+                'sk': 1000,
+                'pPageLimit': cls.PAGE_LIMIT_FULL if full_page else cls.PAGE_LIMIT_COUNT}
+
+    def _postSearchParse(self, cmd_id, text: str, kategorie: MediaType, savefile=False,
+                         stream=False, full_page=False):
         """
         Executes a http request to the web search to the library.
 
@@ -328,20 +565,27 @@ class Bibliography(PyLeiheWeb):
             savefile (bool, optional): if the result page of the search should
                 be stored on the local disc. The file name is taken from the
                 title of the library.
+            stream (bool, optional): read the result page only until the number
+                of results is known, see `Bibliography.parse_results_stream`.
+                Ignored if `savefile` is set.
+            full_page (bool, optional): request the full result page with
+                `PAGE_LIMIT_FULL` media entries instead of the smallest page
         Returns:
             None: if ConnectionError occurs, see `PyLeiheWeb.simpleSession`
             int: number of results, see `Bibliography.parse_results`
             -1: result could not be parsed
         """
+        stream = stream and not savefile
         SearchRequest = self.simpleSession(self.search_url,
-                                           data={'pMediaType': kategorie.value,
-                                                 'pText': text,
-                                                 "Suchen": "Suche",
-                                                 "cmdId": cmd_id,
-                                                 'sk': 1000,
-                                                 'pPageLimit': 100})
+                                           data=self._searchData(cmd_id, text, kategorie,
+                                                                 full_page),
+                                           stream=stream,
+                                           # a search only reads, it may be repeated
+                                           idempotent=True)
         if SearchRequest is None:
             return None
+        if stream:
+            return self.parse_results_stream(SearchRequest)
         Treffer = self.parse_results(SearchRequest)
         if savefile or (Treffer == -1 and logging.getLogger().isEnabledFor(logging.DEBUG)):
             f = open("{0}_{1}.html".format(self.title, cmd_id), 'wb')
@@ -349,7 +593,38 @@ class Bibliography(PyLeiheWeb):
             f.close()
         return Treffer
 
-    def search(self, text: str, kategorie: MediaType = None, savefile=False):
+    def _cachedResult(self, cache, text: str, kategorie: MediaType):
+        """
+        Returns the cached result of a search or `None`, see `PyLeihe.cache.SearchCache`.
+        """
+        if cache is None or self.search_url is None:
+            return None
+        Treffer = cache.get(self.search_url, text, kategorie)
+        if Treffer is not None:
+            logging.debug("[%s][search: %s] result from cache: %i", self, text, Treffer)
+            self.LastSearch = Treffer
+        return Treffer
+
+    def _cacheResult(self, cache, text: str, kategorie: MediaType, Treffer):
+        """
+        Stores the result of a search in the `cache` (if available).
+        """
+        if cache is not None and self.search_url is not None and Treffer is not None:
+            cache.set(self.search_url, text, kategorie, Treffer)
+
+    def _hedgedSearchParse(self, hedger, cmd_id, text, kategorie, savefile=False, stream=False,
+                           full_page=False):
+        """
+        `_postSearchParse` with an optional `PyLeihe.hedge.Hedger`.
+        """
+        if hedger is None or savefile:
+            return self._postSearchParse(cmd_id, text, kategorie, savefile, stream, full_page)
+        return hedger.call(self.search_url,
+                           lambda: self._postSearchParse(cmd_id, text, kategorie,
+                                                         stream=stream, full_page=full_page))
+
+    def search(self, text: str, kategorie: MediaType = None, savefile=False, stream=False,
+               full_page=False, cache=None, cache_only=False, hedger=None, health=None):
         """
         Performs a search query to a library.
 
@@ -359,6 +634,17 @@ class Bibliography(PyLeiheWeb):
             savefile (bool, optional): if the result page of the search should
                 be stored on the local disc. The file name is taken from the
                 title of the library.
+            stream (bool, optional): read the result page only until the number
+                of results is known (transfers a few KB instead of the whole page)
+            full_page (bool, optional): request a full result page with media
+                entries, by default only the smallest page for counting is requested
+            cache (PyLeihe.cache.SearchCache, optional): cache for the results,
+                a valid cached result is returned without request
+            cache_only (bool, optional): answer only from the `cache`
+            hedger (PyLeihe.hedge.Hedger, optional): sends a second search request
+                if the first one is slow, ignored with `savefile`
+            health (PyLeihe.health.CircuitBreaker, optional): skips the library
+                while it is known to be down
 
         Returns:
             int: number of results or negative for error codes:
@@ -366,9 +652,44 @@ class Bibliography(PyLeiheWeb):
             - `-2`
             - `-3` no search url available
             - `-4` ConnectionError
+            - `-5` no cached result available (with `cache_only`)
+            - `-7` skipped, the circuit of the library is open (with `health`)
+
+            `PyLeihe.simple_functions.search_bibs` reports `-6` for libraries
+            which did not answer before the deadline of the search.
         """
         if kategorie is None:
             kategorie = MediaType.alleMedien
+        Treffer = self._cachedResult(cache, text, kategorie)
+        if Treffer is not None:
+            return Treffer
+        if cache_only:
+            return -5
+        if not self._healthAllows(health, text):
+            return -7
+        Treffer = None
+        try:
+            Treffer = self._searchRequest(text, kategorie, savefile, stream, full_page, cache,
+                                          hedger)
+        finally:
+            if health is not None:
+                health.record(self.url_up, Treffer)
+        return Treffer
+
+    def _healthAllows(self, health, text):
+        """
+        Returns whether the `PyLeihe.health.CircuitBreaker` allows the search.
+        """
+        if health is None or health.allow(self.url_up):
+            return True
+        logging.info("[%s][search: %s] skipped, the library is known to be down", self, text)
+        return False
+
+    def _searchRequest(self, text, kategorie, savefile=False, stream=False, full_page=False,
+                       cache=None, hedger=None):
+        """
+        Sends the search requests of `search` (without cache lookup).
+        """
         # get MainPage
         if self.search_url is None:
             self.grepSearchURL()
@@ -376,15 +697,162 @@ class Bibliography(PyLeiheWeb):
             logging.info("[%s][search: %s] No search_url available", self, text)
             return -3
 
-        Treffer = self._postSearchParse(703, text, kategorie, savefile)
+        Treffer = self._hedgedSearchParse(hedger, 703, text, kategorie, savefile, stream,
+                                          full_page)
         if Treffer is None:
+            self._cacheResult(cache, text, kategorie, -4)
             return -4
         if Treffer == -1:
             logging.info("[%s][search: %s] regex for result counting failed."
                          "Try second methode with cmdId for extended search",
                          self, text)
 
-            Treffer = self._postSearchParse(701, text, kategorie, savefile)
+            Treffer = self._hedgedSearchParse(hedger, 701, text, kategorie, savefile, stream,
+                                              full_page)
+
+        self._cacheResult(cache, text, kategorie, Treffer)
+        self.LastSearch = Treffer
+        return Treffer
+
+    async def _apostSearchParse(self, session, cmd_id, text: str, kategorie: MediaType,
+                                stream=False, full_page=False):
+        """
+        Asynchronous counterpart of `_postSearchParse` based on `aiohttp`.
+
+        Arguments:
+            session (aiohttp.ClientSession): session used for the http request
+            cmd_id (int): Parameter for the search method: `703` for simple and
+                `701`for extended search
+            text (str): keyword to search for
+            kategorie (MediaType): the media category to be searched
+            stream (bool, optional): read the result page only until the number
+                of results is known
+            full_page (bool, optional): request the full result page
+
+        Returns:
+            None: if a connection error occurs
+            int: number of results, see `Bibliography.parse_results_text`
+            -1: result could not be parsed
+        """
+        aiohttp = optionalModule("aiohttp")
+        try:
+            async with session.post(self.search_url,
+                                    data=self._searchData(cmd_id, text, kategorie,
+                                                          full_page)) as resp:
+                resp.raise_for_status()
+                if stream:
+                    return await self._aparse_results_stream(resp)
+                content = await resp.text(errors="replace")
+        except aiohttp.ClientConnectionError as exc:
+            logging.warning("[%s] Connection error: %s (%s)", self._get_title(),
+                            self.search_url, exc)
+            return None
+        return self.parse_results_text(content)
+
+    async def _aparse_results_stream(self, resp):
+        """
+        Asynchronous counterpart of `parse_results_stream` for an `aiohttp` response.
+        """
+        counter = ResultCounter(resp.charset, self.MAX_RESULT_BYTES)
+        try:
+            async for chunk in resp.content.iter_chunked(self.STREAM_CHUNK_SIZE):
+                Treffer = counter.feed(chunk)
+                if Treffer is not None:
+                    return Treffer
+                if counter.exceeded:
+                    logging.info("Result page is larger than %i bytes: %s",
+                                 counter.max_bytes, self.search_url)
+                    return -1
+            return counter.finish()
+        finally:
+            resp.close()
+
+    async def asearch(self, text: str, kategorie: MediaType = None, session=None,
+                      stream=False, full_page=False, cache=None, cache_only=False,
+                      health=None):
+        """
+        Performs a search query to a library as coroutine.
+
+        Behaves like `Bibliography.search` (including the fallback to the
+        extended search and the error codes), but the search request is sent
+        with `aiohttp` so that many searches can be in flight at the same time.
+        A missing `search_url` is still resolved with the blocking
+        `grepSearchURL` inside the default executor of the event loop.
+
+        Arguments:
+            text (str): keyword to search for
+            kategorie (MediaType, optional):  the media category to be searched
+            session (aiohttp.ClientSession, optional): shared session for all
+                searches, if `None` a temporary session is used
+            stream (bool, optional): read the result page only until the number
+                of results is known
+            full_page (bool, optional): request the full result page
+            cache (PyLeihe.cache.SearchCache, optional): cache for the results
+            cache_only (bool, optional): answer only from the `cache`
+            health (PyLeihe.health.CircuitBreaker, optional): skips the library
+                while it is known to be down
+
+        Returns:
+            int: number of results or negative for error codes,
+            see `Bibliography.search`
+
+        Raises:
+            ImportError: if the optional package `aiohttp` is not installed
+        """
+        if optionalModule("aiohttp") is None:
+            raise ImportError("asearch requires the optional package 'aiohttp'")
+        if kategorie is None:
+            kategorie = MediaType.alleMedien
+        Treffer = self._cachedResult(cache, text, kategorie)
+        if Treffer is not None:
+            return Treffer
+        if cache_only:
+            return -5
+        if not self._healthAllows(health, text):
+            return -7
+        Treffer = None
+        try:
+            Treffer = await self._asearchRequest(text, kategorie, session, stream, full_page,
+                                                 cache)
+        finally:
+            if health is not None:
+                health.record(self.url_up, Treffer)
+        return Treffer
+
+    async def _asearchRequest(self, text, kategorie, session=None, stream=False,
+                              full_page=False, cache=None):
+        """
+        Sends the search requests of `asearch` (without cache lookup).
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+        if self.search_url is None:
+            # `get_running_loop` is new in Python 3.7, inside a coroutine
+            # `get_event_loop` of Python 3.6 returns the running loop as well
+            loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)()
+            await loop.run_in_executor(None, self.grepSearchURL)
+        if self.search_url is None:
+            logging.info("[%s][search: %s] No search_url available", self, text)
+            return -3
 
+        own_session = session is None
+        if own_session:
+            session = optionalModule("aiohttp").ClientSession()
+        try:
+            Treffer = await self._apostSearchParse(session, 703, text, kategorie,
+                                                   stream, full_page)
+            if Treffer is None:
+                self._cacheResult(cache, text, kategorie, -4)
+                return -4
+            if Treffer == -1:
+                logging.info("[%s][search: %s] regex for result counting failed."
+                             "Try second methode with cmdId for extended search",
+                             self, text)
+                Treffer = await self._apostSearchParse(session, 701, text, kategorie,
+                                                       stream, full_page)
+        finally:
+            if own_session:
+                await session.close()
+
+        self._cacheResult(cache, text, kategorie, Treffer)
         self.LastSearch = Treffer
         return Treffer
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the `SearchCache`, a persistent cache for the results of
+`PyLeihe.bibliography.Bibliography.search`.
+
+The results are stored in a sqlite database in the cache directory of the user.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+import urllib.parse as up
+
+
+def userCacheDir():
+    """
+    Returns the cache directory of the package for the current user.
+
+    * Windows: `%LOCALAPPDATA%/PyLeihe/Cache`
+    * macOS: `~/Library/Caches/PyLeihe`
+    * others: `$XDG_CACHE_HOME/PyLeihe` or `~/.cache/PyLeihe`
+    """
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "PyLeihe", "Cache")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches/PyLeihe")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "PyLeihe")
+
+
+def normalizeSearch(text):
+    """
+    Normalizes a search text for the cache key:
+    unicode normalization, case folding and collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
+def normalizeURL(url):
+    """
+    Normalizes an url for the cache key: lower case scheme and host,
+    without fragment and trailing slash.
+    """
+    parts = up.urlsplit(url.strip())
+    return up.urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                          parts.path.rstrip("/"), parts.query, ""))
+
+
+class SearchCache:
+    """
+    Persistent, thread-safe cache for search results keyed by
+    (`search_url`, search text, `PyLeihe.bibliography.MediaType`).
+
+    Results with hits are kept for `ttl` seconds, results without hits and
+    errors (negative values) only for `negative_ttl` seconds.
+    If more than `max_entries` results are stored,
+    the least recently used results are removed.
+
+    The access times of the hits are kept in memory and written
+    with the next eviction (at the latest on `close`),
+    so a hit does not commit a write transaction.
+    """
+    TTL = 24 * 3600
+    NEGATIVE_TTL = 3600
+    MAX_ENTRIES = 50000
+    FILENAME = "search_cache.sqlite"
+    # number of writes between two evictions
+    EVICT_INTERVAL = 100
+
+    def __init__(self, path=None, ttl=None, negative_ttl=None, max_entries=None):
+        """
+        Arguments:
+            path (str): _optional_ path to the database file,
+                default `FILENAME` in `userCacheDir()`; `:memory:` for a temporary cache
+            ttl (float): _optional_ lifetime of results with hits in seconds
+            negative_ttl (float): _optional_ lifetime of zero-hit and error results in seconds
+            max_entries (int): _optional_ maximum number of stored results
+        """
+        if path is None:
+            path = os.path.join(userCacheDir(), self.FILENAME)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = self.TTL if ttl is None else ttl
+        self.negative_ttl = self.NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        # access times of the hits since the last eviction by key
+        self._accessed = {}
+        self._lock = threading.Lock()
+        # hits per thread, see `takeHit`
+        self._local = threading.local()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS results ("
+                             "key TEXT PRIMARY KEY, count INTEGER, "
+                             "expires REAL, accessed REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed "
+                             "ON results(accessed)")
+
+    @staticmethod
+    def key(search_url, text, kategorie):
+        """
+        Returns the cache key for a search.
+
+        Arguments:
+            search_url (str): search endpoint of the library
+            text (str): search text
+            kategorie (PyLeihe.bibliography.MediaType): media category
+        """
+        return "\x1f".join((normalizeURL(search_url), normalizeSearch(text), str(kategorie)))
+
+    def get(self, search_url, text, kategorie):
+        """
+        Returns the cached result of a search.
+
+        Returns:
+            * `None` if there is no valid result
+            * int: the cached result
+        """
+        key = self.key(search_url, text, kategorie)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT count, expires FROM results WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    with self._db:
+                        self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            self.hits += 1
+        self._local.hit = True
+        return row[0]
+
+    def takeHit(self):
+        """
+        Returns whether a `get` of the calling thread found a result since the last call
+        (e.g. to leave cached results out of the latency of the searches).
+        """
+        hit = getattr(self._local, "hit", False)
+        self._local.hit = False
+        return hit
+
+    def set(self, search_url, text, kategorie, count):
+        """
+        Stores the result of a search.
+
+        Arguments:
+            search_url (str): search endpoint of the library
+            text (str): search text
+            kategorie (PyLeihe.bibliography.MediaType): media category
+            count (int): result of the search, see `Bibliography.search`
+        """
+        now = time.time()
+        ttl = self.ttl if count > 0 else self.negative_ttl
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                             (self.key(search_url, text, kategorie), count, now + ttl, now))
+            self._writes += 1
+            if self._writes % self.EVICT_INTERVAL == 0:
+                self._evict()
+
+    def _evict(self):
+        # the access times of the hits decide which results are the least recently used
+        self._db.executemany("UPDATE results SET accessed = MAX(accessed, ?) WHERE key = ?",
+                             [(t, k) for k, t in self._accessed.items()])
+        self._accessed.clear()
+        now = time.time()
+        self._db.execute("DELETE FROM results WHERE expires < ?", (now,))
+        self._db.execute("DELETE FROM results WHERE key IN (SELECT key FROM results "
+                         "ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def evict(self):
+        """
+        Removes expired results and the least recently used results above `max_entries`.
+        """
+        with self._lock, self._db:
+            self._evict()
+
+    def clear(self):
+        """
+        Removes all results.
+        """
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM results")
+            self._accessed.clear()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self):
+        """
+        Returns:
+            dict with the number of stored `entries`, `hits` and `misses`
+        """
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        """
+        Evicts old results and closes the database.
+        """
+        self.evict()
+        with self._lock:
+            self._db.close()
+
+    def __repr__(self):
+        return "{}({!r}, hits={}, misses={})".format(self.__class__.__name__, self.path,
+                                                     self.hits, self.misses)
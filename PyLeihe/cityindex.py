@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the `CityIndex`, a reverse index from the member towns
+(`PyLeihe.bibliography.Bibliography.cities`) to the libraries.
+
+The normalized city names are stored in a sorted array,
+exact and prefix queries are two binary searches (`bisect`).
+"""
+import bisect
+import unicodedata
+
+# `str.casefold` already replaces `ß` with `ss`
+UMLAUTS = (("ä", "ae"), ("ö", "oe"), ("ü", "ue"))
+# larger than every character of a normalized name, upper bound of a prefix range
+_MAX_CHAR = "\U0010ffff"
+
+
+def normalizeCity(name):
+    """
+    Normalizes a city name for the index: unicode normalization, case folding,
+    umlauts as `ae`/`oe`/`ue`/`ss` and collapsed whitespace
+    (`"Groß Köris"` and `"gross koeris"` are the same).
+    """
+    name = unicodedata.normalize("NFC", name or "").casefold()
+    for umlaut, replacement in UMLAUTS:
+        if umlaut in name:
+            name = name.replace(umlaut, replacement)
+    return " ".join(name.split())
+
+
+class CityIndex:
+    """
+    Immutable reverse index from city names to libraries.
+    """
+
+    def __init__(self, bibs=(), entries=None):
+        """
+        Arguments:
+            bibs (list[PyLeihe.bibliography.Bibliography]): the indexed libraries
+            entries (list): _optional_ the prebuilt index (see `entries`),
+                by default it is built from the cities of `bibs`
+        """
+        if entries is None:
+            entries = []
+            for i, bib in enumerate(bibs):
+                for city in bib.cities:
+                    key = normalizeCity(city)
+                    if key:
+                        entries.append((key, i, city))
+            entries.sort(key=lambda e: (e[0], e[1]))
+        self._bibs = list(bibs)
+        self._keys = [e[0] for e in entries]
+        self._entries = [(e[2], e[1]) for e in entries]
+
+    def entries(self):
+        """
+        Returns the index as sorted list with tuples of the normalized name,
+        the position of the library in `bibs` and the city name
+        (stored in `PyLeihe.snapshot`).
+        """
+        return [(key, i, city) for key, (city, i) in zip(self._keys, self._entries)]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _range(self, start, stop):
+        return [(city, self._bibs[i]) for city, i in self._entries[start:stop]]
+
+    def find(self, city):
+        """
+        Returns a list with tuples of the city name and the library
+        for all libraries serving the `city` (exact match of the normalized name).
+        """
+        key = normalizeCity(city)
+        return self._range(bisect.bisect_left(self._keys, key),
+                           bisect.bisect_right(self._keys, key))
+
+    def findPrefix(self, prefix):
+        """
+        Returns a list with tuples of the city name and the library
+        for all cities starting with `prefix`, sorted by the city name.
+        """
+        key = normalizeCity(prefix)
+        if not key:
+            return []
+        return self._range(bisect.bisect_left(self._keys, key),
+                           bisect.bisect_left(self._keys, key + _MAX_CHAR))
+
+    def __repr__(self):
+        return "{}(cities={}, libraries={})".format(self.__class__.__name__,
+                                                    len(self._keys), len(self._bibs))
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the `CircuitBreaker`, which skips libraries known to be down.
+
+Every library has a circuit:
+
+* `closed`: the library is searched normally, failed searches are counted
+* `open`: after `threshold` failed searches in a row the library is skipped
+  (search result `-7`) for the cool-down period
+* `half-open`: after the cool-down one probe search is sent,
+  its success closes the circuit, its failure opens it again
+  with a doubled cool-down (up to `max_cooldown`)
+
+Failed searches are unknown hosts and connection errors (`-4`), missing
+search urls (`-3`) and unreadable result pages (`-1`). A library counts at
+most one failure per run (one `CircuitBreaker`), so the keywords of a
+batch search don't open the circuit after a single outage.
+The state is stored next to the JSON catalog (see `healthPath`), so the
+next run skips the libraries without paying their timeouts again.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+# search results of `PyLeihe.bibliography.Bibliography.search` counted as failure
+FAILURES = (-1, -3, -4)
+
+
+def healthPath(jsonfile=""):
+    """
+    Returns the path of the health state for the JSON catalog `jsonfile`
+    (without the extension `.json`, see `PyLeihe.basic.PyLeiheWeb.toJSONFile`).
+    """
+    return "{}.health.json".format(jsonfile or "PyLeiheNet")
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breakers for all libraries of a run, keyed by the library url.
+    """
+    THRESHOLD = 3
+    COOLDOWN = 3600.0
+    MAX_COOLDOWN = 7 * 24 * 3600.0
+
+    def __init__(self, path=None, threshold=None, cooldown=None, max_cooldown=None):
+        """
+        Arguments:
+            path (str): _optional_ file of the persisted state, `None` keeps it in memory
+            threshold (int): _optional_ number of failed searches in a row
+                which opens the circuit
+            cooldown (float): _optional_ seconds a library is skipped after the circuit opened
+            max_cooldown (float): _optional_ upper bound of the doubled cool-down in seconds
+        """
+        self.path = path
+        self.threshold = threshold or self.THRESHOLD
+        self.cooldown = self.COOLDOWN if cooldown is None else cooldown
+        self.max_cooldown = max(self.MAX_COOLDOWN if max_cooldown is None else max_cooldown,
+                                self.cooldown)
+        self.skipped = 0
+        self._circuits = {}
+        self._probing = set()
+        # libraries with a failure counted in this run
+        self._failed = set()
+        self._lock = threading.Lock()
+        if path is not None:
+            self.load()
+
+    def load(self):
+        """
+        Loads the persisted state from `path` (a missing or broken file is ignored).
+        """
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logging.warning("Health state '%s' could not be loaded: %s", self.path, exc)
+            return
+        with self._lock:
+            self._circuits = {key: circuit for key, circuit in data.items()
+                              if isinstance(circuit, dict) and "state" in circuit}
+
+    def save(self):
+        """
+        Stores the state of the libraries with failures in `path`.
+        """
+        if self.path is None:
+            return
+        with self._lock:
+            data = {key: circuit for key, circuit in self._circuits.items()
+                    if circuit["state"] != CLOSED or circuit["failures"]}
+        tmp = "{}.tmp".format(self.path)
+        with open(tmp, "w") as f:
+            json.dump(data, f, sort_keys=True, indent=4)
+        os.replace(tmp, self.path)
+
+    def state(self, key):
+        """
+        Returns:
+            str: `closed`, `open` or `half-open` for the library
+        """
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                return CLOSED
+            if circuit["state"] == OPEN and time.time() >= circuit["until"]:
+                return HALF_OPEN
+            return circuit["state"]
+
+    def allow(self, key):
+        """
+        Returns whether the library may be searched.
+        After the cool-down only one probe search at a time is allowed.
+
+        Arguments:
+            key: key of the library, e.g. `Bibliography.url_up`
+        """
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None or circuit["state"] == CLOSED:
+                return True
+            if time.time() >= circuit["until"] and key not in self._probing:
+                circuit["state"] = HALF_OPEN
+                self._probing.add(key)
+                logging.info("[%s] probing library after the cool-down", key)
+                return True
+            self.skipped += 1
+            return False
+
+    def record(self, key, result):
+        """
+        Records the result of an allowed search.
+
+        Arguments:
+            key: key of the library
+            result (int): result of the search, see `FAILURES`;
+                other negative results or `None` (search aborted) change nothing
+        """
+        with self._lock:
+            probe = key in self._probing
+            self._probing.discard(key)
+            if result is None or (result < 0 and result not in FAILURES):
+                return
+            circuit = self._circuits.get(key)
+            if result >= 0:
+                self._failed.discard(key)
+                if circuit is not None:
+                    if circuit["state"] != CLOSED:
+                        logging.info("[%s] library answers again, circuit closed", key)
+                    del self._circuits[key]
+                return
+            if key in self._failed and not probe:
+                return
+            self._failed.add(key)
+            if circuit is None:
+                circuit = self._circuits[key] = {"state": CLOSED, "failures": 0,
+                                                 "cooldown": self.cooldown, "until": 0}
+            circuit["failures"] += 1
+            if probe:
+                circuit["cooldown"] = min(self.max_cooldown, circuit["cooldown"] * 2)
+            elif circuit["state"] == CLOSED and circuit["failures"] < self.threshold:
+                return
+            circuit["state"] = OPEN
+            circuit["until"] = time.time() + circuit["cooldown"]
+            logging.info("[%s] circuit open for %i s after %i failed searches",
+                         key, circuit["cooldown"], circuit["failures"])
+
+    def stats(self):
+        """
+        Returns:
+            dict with the number of libraries per state and of the skipped searches
+        """
+        states = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        for key in list(self._circuits):
+            states[self.state(key)] += 1
+        states["skipped"] = self.skipped
+        return states
+
+    def __repr__(self):
+        return "{}(path={!r}, threshold={}, cooldown={}, circuits={}, skipped={})".format(
+            self.__class__.__name__, self.path, self.threshold, self.cooldown,
+            len(self._circuits), self.skipped)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the `Hedger` for hedged requests of `PyLeihe.bibliography.Bibliography.search`.
+
+If a search has not answered after the usual latency of its host
+(the `percentile` of the observed latencies), the same search is sent
+a second time and the first answer wins.
+The losing call is cancelled if it has not started yet
+(e.g. a first call queued behind the running losers of earlier calls).
+A budget limits the duplicated searches to a share of all searches.
+"""
+import collections
+import concurrent.futures
+import math
+import threading
+import time
+from .sessions import SessionPool
+
+
+def _notNone(result):
+    return result is not None
+
+
+class Hedger:
+    """
+    Thread-safe hedging of blocking calls with the latency statistic per host.
+    """
+    PERCENTILE = 0.9
+    BUDGET = 0.1
+    # delay before enough latencies of a host are known
+    DEFAULT_DELAY = 2.0
+    MIN_DELAY = 0.05
+    MIN_SAMPLES = 5
+    # number of latencies kept per host
+    SAMPLES = 100
+    WORKERS = 32
+
+    def __init__(self, percentile=None, budget=None, workers=None):
+        """
+        Arguments:
+            percentile (float): _optional_ latency percentile of the host (0-1)
+                after which the hedged request is sent
+            budget (float): _optional_ maximum share of duplicated requests (0-1)
+            workers (int): _optional_ number of threads for the first requests,
+                at least the number of threads calling `call`
+                (the hedged requests have threads of their own, so they never
+                wait behind the first requests)
+        """
+        self.percentile = self.PERCENTILE if percentile is None else percentile
+        self.budget = self.BUDGET if budget is None else budget
+        self.requests = 0
+        self.fired = 0
+        self.won = 0
+        self._latencies = collections.defaultdict(
+            lambda: collections.deque(maxlen=self.SAMPLES))
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers or self.WORKERS, thread_name_prefix="Hedger")
+        self._hedges = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers or self.WORKERS, thread_name_prefix="Hedge")
+
+    def observe(self, host, latency):
+        """
+        Adds the latency of a finished request to the statistic of the host.
+        """
+        with self._lock:
+            self._latencies[host].append(latency)
+
+    def delay(self, host):
+        """
+        Returns:
+            float: seconds to wait before the hedged request to the host is sent
+        """
+        with self._lock:
+            samples = sorted(self._latencies[host]) if host in self._latencies else []
+        if len(samples) < self.MIN_SAMPLES:
+            return self.DEFAULT_DELAY
+        index = min(len(samples) - 1, math.ceil(self.percentile * len(samples)) - 1)
+        return max(self.MIN_DELAY, samples[max(0, index)])
+
+    def _allow(self):
+        with self._lock:
+            if self.fired + 1 > self.budget * self.requests:
+                return False
+            self.fired += 1
+            return True
+
+    def _submit(self, host, func, executor):
+        def timed():
+            start = time.monotonic()
+            result = func()
+            self.observe(host, time.monotonic() - start)
+            return result
+        return executor.submit(timed)
+
+    def call(self, url, func, accept=None):
+        """
+        Calls `func` and sends a second call if the first one is slow.
+
+        Arguments:
+            url (str): target of the request, the latencies are grouped by its host
+            func: function without arguments which sends the request
+            accept: _optional_ function which returns whether a result is a
+                valid answer, default every result except `None`
+
+        Returns:
+            the first accepted result (or the result of the first call)
+
+        Raises:
+            Exception: the exception of the first call if no call was accepted
+        """
+        if accept is None:
+            accept = _notNone
+        host = SessionPool.hostKey(url)
+        with self._lock:
+            self.requests += 1
+        primary = self._submit(host, func, self._executor)
+        try:
+            return primary.result(timeout=self.delay(host))
+        except concurrent.futures.TimeoutError:
+            pass
+        if not self._allow():
+            return primary.result()
+        hedge = self._submit(host, func, self._hedges)
+        for done in concurrent.futures.as_completed([primary, hedge]):
+            if done.exception() is None and accept(done.result()):
+                # a running request can't be stopped, a queued one doesn't start
+                (primary if done is hedge else hedge).cancel()
+                if done is hedge:
+                    with self._lock:
+                        self.won += 1
+                return done.result()
+        return primary.result()
+
+    def stats(self):
+        """
+        Returns:
+            dict with the number of `requests`, hedged requests (`fired`)
+            and hedged requests which answered first (`won`)
+        """
+        return {"requests": self.requests, "fired": self.fired, "won": self.won}
+
+    def close(self):
+        """
+        Stops the threads after the running requests.
+        """
+        self._executor.shutdown(wait=False)
+        self._hedges.shutdown(wait=False)
+
+    def __repr__(self):
+        return "{}(percentile={}, budget={}, requests={}, fired={}, won={})".format(
+            self.__class__.__name__, self.percentile, self.budget,
+            self.requests, self.fired, self.won)
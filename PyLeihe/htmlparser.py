@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Selectable backends to parse html pages.
+
+All backends return a document with the subset of the `BeautifulSoup` interface
+used by the package (`find`, `find_all`, `get`, `[]` and `get_text`):
+
+* `html.parser`: `BeautifulSoup` with the pure python parser (default)
+* `lxml`: `BeautifulSoup` with the C parser of `lxml`
+* `selectolax`: the lexbor parser of `selectolax` with a small adapter
+
+The backend is selected with `setParser()`.
+If the requested backend is not installed, the default backend is used.
+The backends are imported on the first parse call.
+"""
+import functools
+import importlib.util
+import logging
+import sys
+
+DEFAULT_PARSER = "html.parser"
+# module which must be importable for a backend
+_MODULES = {"html.parser": "bs4", "lxml": "lxml", "selectolax": "selectolax.lexbor"}
+
+
+def BeautifulSoup(content, features):
+    """
+    Parses the content with `bs4.BeautifulSoup` (imported on the first call).
+    """
+    from bs4 import BeautifulSoup as Soup  # pylint: disable=import-outside-toplevel
+    return Soup(content, features=features)
+
+
+@functools.lru_cache(maxsize=None)
+def _installed(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ImportError:  # pragma: no cover
+        return False
+
+
+def _matchAttr(value, expected):
+    """
+    Compares one attribute like `BeautifulSoup` does.
+
+    Arguments:
+        value (str or None): value of the attribute, `None` if it is missing
+        expected: `True`/`False` for existence, compiled regex or `str`
+    """
+    if expected is True:
+        return value is not None
+    if expected is False or expected is None:
+        return value is None
+    if value is None:
+        return False
+    if hasattr(expected, "search"):
+        return expected.search(value) is not None
+    return value == expected
+
+
+class SelectolaxNode:
+    """
+    Adapter for a `selectolax` node with the interface of a `bs4.element.Tag`.
+    """
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    def _matches(self, node, attrs):
+        node_attrs = node.attributes
+        for key, expected in attrs.items():
+            value = node_attrs.get(key)
+            if key == "class" and value is not None and isinstance(expected, str):
+                if expected == value or expected in value.split():
+                    continue
+                return False
+            if value is None and key in node_attrs and expected is True:
+                continue
+            if not _matchAttr(value, expected):
+                return False
+        return True
+
+    def _iterMatches(self, name, attrs):
+        if isinstance(attrs, str):
+            attrs = {"class": attrs}
+        attrs = attrs or {}
+        # `css` includes the node itself if it matches, the nodes are compared
+        # by their address (`==` of selectolax compares the serialized html)
+        own_id = self.node.mem_id
+        for n in self.node.css(name or "*"):
+            if n.mem_id != own_id and self._matches(n, attrs):
+                yield SelectolaxNode(n)
+
+    def find_all(self, name=None, attrs=None):
+        """
+        Returns all descendants with the tag `name` and the attributes `attrs`.
+        A string as `attrs` is compared with the css class (like `BeautifulSoup`).
+        """
+        return list(self._iterMatches(name, attrs))
+
+    def find(self, name=None, attrs=None):
+        """
+        Returns the first descendant that matches, see `find_all`.
+        """
+        return next(self._iterMatches(name, attrs), None)
+
+    def get(self, key, default=None):
+        """
+        Returns the value of the attribute `key`.
+        """
+        value = self.node.attributes.get(key)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.node.attributes[key]
+        return "" if value is None else value
+
+    def get_text(self):
+        """
+        Returns the text of the node including all descendants.
+        """
+        return self.node.text(deep=True)
+
+
+def _parseSelectolax(content):
+    from selectolax.lexbor import LexborHTMLParser  # pylint: disable=import-outside-toplevel
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return SelectolaxNode(LexborHTMLParser(content).root)
+
+
+def isDocument(content):
+    """
+    Returns whether `content` is an already parsed document (or a node of it)
+    of one of the backends.
+    """
+    if isinstance(content, SelectolaxNode):
+        return True
+    # without the imported `bs4` there is no `BeautifulSoup` document,
+    # while another thread imports it `Tag` may not be defined yet
+    tag = getattr(sys.modules.get("bs4.element"), "Tag", None)
+    return tag is not None and isinstance(content, tag)
+
+
+PARSERS = {
+    "html.parser": lambda content: BeautifulSoup(content, features="html.parser"),
+    "lxml": lambda content: BeautifulSoup(content, features="lxml"),
+    "selectolax": _parseSelectolax,
+}
+
+_current = DEFAULT_PARSER
+
+
+def availableParsers():
+    """
+    Returns:
+        list with the names of the installed backends
+    """
+    return [name for name in PARSERS if name == DEFAULT_PARSER or _installed(_MODULES[name])]
+
+
+def setParser(name=None):
+    """
+    Selects the backend for all following parse calls.
+
+    Arguments:
+        name (str): name of the backend, `None` for the default backend.
+            If the backend is not installed, the default backend is used.
+
+    Returns:
+        str: name of the selected backend
+
+    Raises:
+        ValueError: if the backend is unknown
+    """
+    global _current  # pylint: disable=global-statement
+    name = name or DEFAULT_PARSER
+    if name not in PARSERS:
+        raise ValueError("unknown html parser: {}".format(name))
+    if name not in availableParsers():
+        logging.warning("html parser '%s' is not installed, using '%s'", name, DEFAULT_PARSER)
+        name = DEFAULT_PARSER
+    _current = name
+    return _current
+
+
+def getParser():
+    """
+    Returns:
+        str: name of the selected backend
+    """
+    return _current
+
+
+def parse(content, parser=None):
+    """
+    Parses html content with the selected backend.
+
+    Arguments:
+        content (str or bytes): html content
+        parser (str): _optional_ name of the backend, default see `setParser`
+
+    Returns:
+        the parsed document
+    """
+    return PARSERS[parser or _current](content)
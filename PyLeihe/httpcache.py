@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the `HTTPCache`, a disk cache for GET responses which are
+revalidated with `ETag` and `Last-Modified` (conditional requests).
+
+The pages of the federal states and the libraries rarely change,
+so a rebuild of the catalog mostly costs revalidations (`304 Not Modified`)
+instead of full downloads.
+"""
+import hashlib
+import json
+import os
+import threading
+from .cache import userCacheDir
+
+
+class HTTPCache:
+    """
+    Thread-safe disk cache for GET responses with validators
+    (`ETag` or `Last-Modified`).
+
+    Used by `PyLeihe.basic.PyLeiheWeb.simpleSession` if it is set as
+    `PyLeihe.basic.PyLeiheWeb.ResponseCache`.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Arguments:
+            directory (str): _optional_ directory for the cached responses,
+                default `http` in `PyLeihe.cache.userCacheDir()`
+        """
+        self.directory = directory or os.path.join(userCacheDir(), "http")
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, url):
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name)
+
+    def _loadMeta(self, url):
+        try:
+            with open(self._path(url) + ".json", "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url else None
+
+    @staticmethod
+    def _write(path, data, mode):
+        tmp = "{}.{}.tmp".format(path, threading.get_ident())
+        with open(tmp, mode) as f:
+            if mode == "w":
+                json.dump(data, f)
+            else:
+                f.write(data)
+        os.replace(tmp, path)
+
+    def conditionalHeaders(self, url):
+        """
+        Returns the headers for a conditional request of the `url`.
+
+        Returns:
+            dict with `If-None-Match` and/or `If-Modified-Since`,
+            empty if the url is not cached
+        """
+        meta = self._loadMeta(url)
+        if meta is None:
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def store(self, url, response):
+        """
+        Stores a successful response if it has a validator.
+
+        Arguments:
+            url (str): requested url (cache key)
+            response (requests.Response): response with status `200`
+
+        Returns:
+            bool: whether the response was stored
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return False
+        path = self._path(url)
+        self._write(path + ".body", response.content, "wb")
+        self._write(path + ".json", {"url": url,
+                                     "final_url": response.url,
+                                     "encoding": response.encoding,
+                                     "headers": dict(response.headers),
+                                     "etag": etag,
+                                     "last_modified": last_modified}, "w")
+        return True
+
+    def load(self, url, not_modified):
+        """
+        Builds the response for a `304 Not Modified` answer from the cache.
+
+        Arguments:
+            url (str): requested url (cache key)
+            not_modified (requests.Response): the `304` response of the server
+
+        Returns:
+            * `requests.Response` with status `200` and the cached content
+            * `None` if the url is not cached (anymore)
+        """
+        meta = self._loadMeta(url)
+        if meta is None:
+            return None
+        try:
+            with open(self._path(url) + ".body", "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+        import requests  # pylint: disable=import-outside-toplevel
+        response = requests.Response()
+        response.status_code = 200
+        response._content = content  # pylint: disable=protected-access
+        response.headers = requests.structures.CaseInsensitiveDict(meta["headers"])
+        response.headers.update(not_modified.headers)
+        response.url = meta["final_url"]
+        response.encoding = meta["encoding"]
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response.from_cache = True
+        return response
+
+    def count(self, hit):
+        """
+        Counts a cache hit (served from cache) or miss (downloaded).
+        """
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def hitRate(self):
+        """
+        Returns:
+            float: share of the requests served from the cache (0 if no request was made)
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """
+        Returns:
+            dict with the number of `hits`, `misses` and the `hit_rate`
+        """
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hitRate()}
+
+    def __repr__(self):
+        return "{}({!r}, hits={}, misses={}, hit_rate={:.0%})".format(
+            self.__class__.__name__, self.directory, self.hits, self.misses, self.hitRate())
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the `IndexedList`, a list with dictionary indexes for fast lookups
+of `PyLeihe.bibindex.PyLeiheNet.Laender` and `PyLeihe.localgroup.LocalGroup.Bibliotheken`.
+"""
+import functools
+import urllib.parse as up
+
+# number of changed keys of indexed elements, see `keyChanged`
+_changes = 0
+
+
+def keyChanged():
+    """
+    Marks a changed key of an element of any `IndexedList`
+    (e.g. the `search_url` of a library, see `searchHost`),
+    all indexes are built again on their next lookup.
+    """
+    global _changes  # pylint: disable=global-statement
+    _changes += 1
+
+
+def searchHost(bib):
+    """
+    Returns the lower case host of the `search_url` of a library or `None`.
+    """
+    if not bib.search_url:
+        return None
+    return up.urlsplit(bib.search_url).netloc.lower() or None
+
+
+class IndexedList(list):
+    """
+    List with lazily built dictionary indexes.
+
+    Every index is created by a key function on the first lookup and
+    dropped by every change of the list (`append`, `remove`, ...),
+    so a lookup costs O(1) as long as the list is not changed.
+    Changes of the elements themselves (e.g. a new `title`) are not
+    detected, call `invalidate` afterwards (or `keyChanged` for all lists,
+    as a new `search_url` of a library does).
+    Elements with the key `None` are not indexed.
+    """
+
+    def __init__(self, iterable=(), keys=None):
+        """
+        Arguments:
+            iterable: the initial elements
+            keys (dict): name of the index as key and the key function
+                of the elements as value
+        """
+        super().__init__(iterable)
+        self.keys = keys or {}
+        self._indexes = {}
+        self._built = _changes
+
+    def invalidate(self):
+        """
+        Drops all indexes, they are built again on the next lookup.
+        """
+        self._indexes = {}
+
+    def _index(self, name, unique):
+        if self._built != _changes:
+            self._indexes = {}
+            self._built = _changes
+        index = self._indexes.get((name, unique))
+        if index is None:
+            func = self.keys[name]
+            index = {}
+            for item in self:
+                key = func(item)
+                if key is None:
+                    continue
+                if unique:
+                    index.setdefault(key, item)
+                else:
+                    index.setdefault(key, []).append(item)
+            self._indexes[(name, unique)] = index
+        return index
+
+    def lookup(self, name, key, default=None):
+        """
+        Returns the first element with the `key` in the index `name` or `default`.
+        """
+        return self._index(name, True).get(key, default)
+
+    def lookupAll(self, name, key):
+        """
+        Returns a list with all elements with the `key` in the index `name`.
+        """
+        return list(self._index(name, False).get(key, ()))
+
+
+def _invalidating(name):
+    method = getattr(list, name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self._indexes = {}  # pylint: disable=protected-access
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+for _name in ("__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend",
+              "insert", "remove", "pop", "clear", "sort", "reverse"):
+    setattr(IndexedList, _name, _invalidating(_name))
@@ -2,12 +2,52 @@
 """
 ContaiDefines object representation of local libraries and bibliographies groups.
 """
+import concurrent.futures
 import logging
 from collections import defaultdict
 import re
-from bs4 import BeautifulSoup
+import threading
 from .basic import PyLeiheWeb
 from .bibliography import Bibliography
+from .indexedlist import IndexedList, searchHost
+
+
+def discoverSearchURLs(bibs, threads=1, progress=None):
+    """
+    Searches the search urls of the libraries (see `Bibliography.grepSearchURL`),
+    with more than one thread concurrently in a bounded thread pool.
+
+    Arguments:
+        bibs (list[PyLeihe.bibliography.Bibliography]): the libraries
+        threads (int): _optional_ maximum number of libraries loaded at the same time
+        progress: _optional_ function called with the number of finished and of all
+            libraries after every library (never concurrently)
+
+    Returns:
+        list with the results of `Bibliography.grepSearchURL` in the order of `bibs`
+
+    Raises:
+        Exception: the first exception of a library (in the order of `bibs`)
+            after all libraries are finished
+    """
+    lock = threading.Lock()
+    done = 0
+
+    def run(bib):
+        nonlocal done
+        try:
+            return bib.grepSearchURL()
+        finally:
+            with lock:
+                done += 1
+                if progress is not None:
+                    progress(done, len(bibs))
+    if threads <= 1 or len(bibs) <= 1:
+        return [run(bib) for bib in bibs]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(threads, len(bibs)),
+                                               thread_name_prefix="SearchURL") as executor:
+        futures = [executor.submit(run, bib) for bib in bibs]
+    return [future.result() for future in futures]
 
 
 class LocalGroup(PyLeiheWeb):
@@ -20,19 +60,44 @@ class LocalGroup(PyLeiheWeb):
 
     """
     BASIC_URL = "index.php?id={}"
+    # indexes of `Bibliotheken`, see `PyLeihe.indexedlist.IndexedList`
+    INDEXES = {"title": lambda bib: bib.title.lower(),
+               "host": searchHost}
 
-    def __init__(self, lid, name, bibs=None):
+    def __init__(self, lid, name, bibs=None, sess=None):
         """
         Arguments:
             lid: to `int`convertable object, as unique ID
             name (str): name of the group (federal state)
             bibs (list[bibliography]): _optional_ the initial elements of
                 the group
+            sess: _optional_ session which is also passed to the loaded
+                `PyLeihe.bibliography.Bibliography` instances
         """
-        super().__init__()
+        super().__init__(sess)
         self.lid = int(lid)
         self.name = name.capitalize().replace(' ', '_')
         self.Bibliotheken = bibs or []
+        # shard file and lower case titles of a lazily loaded group, see `fromShard`
+        self._shard = None
+        self._titles = None
+
+    @property
+    def Bibliotheken(self):
+        """
+        `PyLeihe.indexedlist.IndexedList` of the contained
+        `PyLeihe.bibliography.Bibliography` instances (indexed by title and search host),
+        loaded from the shard file on the first access (see `fromShard`).
+        """
+        if self._bibliotheken is None:
+            data = self._loadJSONFile(self._shard)
+            self.Bibliotheken = [Bibliography.loadFromJSON(b, session=self.Session)
+                                 for b in data["bibliotheken"].values()]
+        return self._bibliotheken
+
+    @Bibliotheken.setter
+    def Bibliotheken(self, bibs):
+        self._bibliotheken = IndexedList(bibs, keys=self.INDEXES)
 
     def __getitem__(self, key):
         """
@@ -46,10 +111,24 @@ class LocalGroup(PyLeiheWeb):
         """
         if isinstance(key, (int, slice)):
             return self.Bibliotheken[key]
-        for x in self.Bibliotheken:
-            if x.title.lower() == key.lower():
-                return x
-        return None
+        if not self.loaded and self._titles is not None and key.lower() not in self._titles:
+            return None
+        return self.Bibliotheken.lookup("title", key.lower())
+
+    @property
+    def loaded(self):
+        """
+        Whether the libraries are loaded (`False` for a group from a shard before the
+        first access of `Bibliotheken`).
+        """
+        return self._bibliotheken is not None
+
+    def getBibsByHost(self, host):
+        """
+        Returns a list with all `PyLeihe.bibliography.Bibliography` instances
+        whose `search_url` points to the `host` (e.g. `www2.onleihe.de`).
+        """
+        return self.Bibliotheken.lookupAll("host", host.lower())
 
     def loadBibURLs(self):
         """
@@ -60,7 +139,7 @@ class LocalGroup(PyLeiheWeb):
         """
         uebersicht = self.getURL(self.BASIC_URL.format(self.lid))
         r = self.simpleGET(uebersicht)
-        soup = BeautifulSoup(r.content, features="html.parser")
+        soup = self.parseHTML(r)
         links = soup.find('table', {"class": "contenttable"}).find_all(
             'a', attrs={'target': '_blank'})
         workBibs = {}
@@ -75,23 +154,45 @@ class LocalGroup(PyLeiheWeb):
                 raise type(e)(
                     str(e) + ' happens at [{}]:{}'.format(self.name, a))
 
-        self.Bibliotheken = [Bibliography(k, v) for k, v in workBibs.items()]
+        self.Bibliotheken = [Bibliography(k, v, session=self.Session)
+                             for k, v in workBibs.items()]
 
-    def loadsearchURLs(self, newtitle=False, force=False):
+    def loadsearchURLs(self, newtitle=False, force=False, threads=1, progress=None):
         """
         Loads all search urls for the containing elements.
 
         For additional information see: `Bibliography.grepSearchURL()`
+        and `discoverSearchURLs`
 
         Arguments:
             newtitle (bool): _optional_ whether new title names are to be
                 generated on the basis of the new available data
+            force (bool): _optional_ loads the search urls also for libraries
+                which already have one
+            threads (int): _optional_ number of libraries loaded at the same time
+            progress: _optional_ progress function, see `discoverSearchURLs`
         """
-        for bib in self.Bibliotheken:
-            if force or bib.search_url is None:
-                bib.grepSearchURL()
-            if newtitle:
+        discoverSearchURLs(self.pendingSearchURLs(force), threads, progress)
+        self.updateTitles(newtitle)
+
+    def pendingSearchURLs(self, force=False):
+        """
+        Returns a list with the libraries whose search url is loaded by `loadsearchURLs`.
+        """
+        return [bib for bib in self.Bibliotheken if force or bib.search_url is None]
+
+    def updateTitles(self, newtitle=True):
+        """
+        Updates the indexes after new search urls, see `loadsearchURLs`.
+
+        Arguments:
+            newtitle (bool): _optional_ generates new titles for all libraries
+                (`Bibliography.generateTitle`)
+        """
+        if newtitle:
+            for bib in self.Bibliotheken:
                 bib.generateTitle()
+        self.Bibliotheken.invalidate()
 
     def fix_searchurl(self, key, url):
         """
@@ -100,24 +201,47 @@ class LocalGroup(PyLeiheWeb):
         bib = self[key]
         if bib is not None:
             bib.search_url = url
+            self.Bibliotheken.invalidate()
 
     @classmethod
-    def from_url(cls, url):
+    def from_url(cls, url, sess=None):
         """
         Creates a new instance from a url.
 
         Arguments:
             url (str): in the format `...id=ID#Name...`
+            sess: _optional_ session for the new instance
 
         Raises:
             ValueError: if the URL did not fulfill the search condition.
         """
         m = re.search(r"id=(\d+)#([a-zA-Z]+)", url)
         if m is not None:
-            return LocalGroup(m.group(1), m.group(2))
+            return LocalGroup(m.group(1), m.group(2), sess=sess)
         logging.error("Can't create LocalGroup from url: '%s'", url)
         raise ValueError(url)
 
+    @classmethod
+    def fromShard(cls, lid, name, filename, titles=None, sess=None):
+        """
+        Creates a new instance whose libraries are loaded from the JSON file
+        on the first access (see `PyLeihe.shards`).
+
+        Arguments:
+            lid: to `int` convertable object, as unique ID
+            name (str): name of the group (federal state)
+            filename (str): path to the json file of the group without extension
+            titles (list[str]): _optional_ lower case titles of the libraries,
+                a lookup of another title does not load the file
+            sess: _optional_ session for the new instance and its libraries
+        """
+        # pylint: disable=protected-access
+        bl = LocalGroup(lid, name, sess=sess)
+        bl._bibliotheken = None
+        bl._shard = filename
+        bl._titles = set(titles) if titles is not None else None
+        return bl
+
     def __repr__(self):
         return "{}({:>2d}, {})".format(self.__class__.__name__, self.lid, self.name)
 
@@ -146,10 +270,10 @@ class LocalGroup(PyLeiheWeb):
                 "bibliotheken": {b.title: b.reprJSON() for b in self.Bibliotheken}}
 
     @classmethod
-    def loadFromJSON(cls, data=None, filename=None):
+    def loadFromJSON(cls, data=None, filename=None, sess=None):
         if data is None:
             data = cls._loadJSONFile(filename)
-        bl = LocalGroup(data["id"], data["name"])
+        bl = LocalGroup(data["id"], data["name"], sess=sess)
         bl.Bibliotheken = [Bibliography.loadFromJSON(
-            b) for b in data["bibliotheken"].values()]
+            b, session=bl.Session) for b in data["bibliotheken"].values()]
         return bl
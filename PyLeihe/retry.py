@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the `RetryPolicy` of `PyLeihe.basic.PyLeiheWeb.simpleSession`.
+
+* retries after a closed connection, a timeout or HTTP `429`/`5xx`
+* exponential backoff with full jitter between the attempts
+  (`Retry-After` of the server is respected up to `max_backoff`)
+* only idempotent requests are repeated (`GET`, `HEAD`, `OPTIONS` and
+  requests marked as idempotent like the search requests)
+* a retry budget per run and per host, so a flaky host cannot
+  slow down the whole run
+"""
+import collections
+import random
+import threading
+import time
+
+# messages of `requests.ConnectionError` for unknown host names (Windows, Linux, macOS)
+DNS_ERRORS = ("[Errno 11004] getaddrinfo failed",
+              "[Errno -2] Name or service not known",
+              "[Errno 8] nodename nor servname ")
+CLOSED_CONNECTION = "Remote end closed connection without response"
+
+
+def classify(exc):
+    """
+    Classifies an exception of a request.
+
+    Returns:
+        * `"dns"`: host name can't be resolved (not retried)
+        * `"closed"`: remote end closed the connection
+        * `"timeout"`: connect or read timeout
+        * `"status"`: HTTP `429` or `5xx`
+        * `None`: other errors (not retried)
+    """
+    import requests  # pylint: disable=import-outside-toplevel
+    if isinstance(exc, requests.HTTPError):
+        status = getattr(exc.response, "status_code", None)
+        if status is not None and (status == 429 or status >= 500):
+            return "status"
+        return None
+    message = str(exc)
+    if isinstance(exc, requests.ConnectionError):
+        if any(error in message for error in DNS_ERRORS):
+            return "dns"
+        if CLOSED_CONNECTION in message:
+            return "closed"
+    if isinstance(exc, requests.Timeout):
+        return "timeout"
+    return None
+
+
+class RetryPolicy:
+    """
+    Thread-safe retry policy with backoff, budget and counters.
+    """
+    RETRIES = 1
+    BACKOFF = 0.5
+    MAX_BACKOFF = 10.0
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, retries=None, backoff=None, max_backoff=None, budget=None,
+                 host_budget=None):
+        """
+        Arguments:
+            retries (int): _optional_ default number of retries per request
+            backoff (float): _optional_ base of the exponential backoff in seconds
+            max_backoff (float): _optional_ upper bound of one backoff in seconds
+            budget (int): _optional_ maximum number of retries of the run (`None` unlimited)
+            host_budget (int): _optional_ maximum number of retries per host (`None` unlimited)
+        """
+        self.retries = self.RETRIES if retries is None else retries
+        self.backoff = self.BACKOFF if backoff is None else backoff
+        self.max_backoff = self.MAX_BACKOFF if max_backoff is None else max_backoff
+        self.budget = budget
+        self.host_budget = host_budget
+        self.attempts = 0
+        self.retried = 0
+        self.exhausted = 0
+        self.reasons = collections.Counter()
+        self._hosts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def isIdempotent(self, method, idempotent=None):
+        """
+        Returns whether a request may be repeated.
+
+        Arguments:
+            method (str): http method in upper case
+            idempotent (bool): _optional_ explicit marker of the caller
+        """
+        if idempotent is not None:
+            return idempotent
+        return method in self.IDEMPOTENT_METHODS
+
+    def count(self):
+        """
+        Counts one attempt (request sent).
+        """
+        with self._lock:
+            self.attempts += 1
+
+    def allow(self, host, reason):
+        """
+        Takes one retry from the budget of the run and of the host.
+
+        Arguments:
+            host: key of the host, see `PyLeihe.sessions.SessionPool.hostKey`
+            reason (str): reason of the retry, see `classify`
+
+        Returns:
+            bool: whether the retry is allowed
+        """
+        with self._lock:
+            if (self.budget is not None and self.retried >= self.budget) or \
+                    (self.host_budget is not None and self._hosts[host] >= self.host_budget):
+                self.exhausted += 1
+                return False
+            self.retried += 1
+            self._hosts[host] += 1
+            self.reasons[reason] += 1
+            return True
+
+    def delay(self, attempt, response=None):
+        """
+        Returns the waiting time before the next attempt:
+        full jitter `uniform(0, backoff * 2 ** attempt)` up to `max_backoff`
+        or the `Retry-After` of the response.
+
+        Arguments:
+            attempt (int): number of the failed attempt (0 for the first request)
+            response (requests.Response): _optional_ the failed response
+        """
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None and retry_after.strip().isdigit():
+            return min(self.max_backoff, float(retry_after))
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))  # nosec
+
+    @staticmethod
+    def sleep(seconds):
+        """
+        Waits between two attempts.
+        """
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def stats(self):
+        """
+        Returns:
+            dict with the number of `attempts`, `retries`, retries denied by the
+            budget (`exhausted`) and the retries per reason (`reasons`)
+        """
+        return {"attempts": self.attempts, "retries": self.retried,
+                "exhausted": self.exhausted, "reasons": dict(self.reasons)}
+
+    def __repr__(self):
+        return "{}(retries={}, attempts={}, retried={}, exhausted={})".format(
+            self.__class__.__name__, self.retries, self.attempts, self.retried, self.exhausted)
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the `HostScheduler`, a thread pool which distributes the searches
+over the target hosts of the libraries.
+
+Most libraries share a few onleihe hosts (e.g. `www2.onleihe.de`).
+In catalog order the libraries of one host follow each other,
+so a plain thread pool sends all requests to the same host at once.
+The scheduler groups the work by host, limits the requests per host
+(`HostLimits`: token bucket and concurrency cap) and keeps a worker
+on its host as long as there is work for it (warm connections).
+"""
+import collections
+import multiprocessing
+import queue
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, at most `burst` tokens stored.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Arguments:
+            rate (float): refill rate in tokens (requests) per second
+            burst (float): _optional_ capacity of the bucket, default one second of `rate`
+        """
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def waitTime(self):
+        """
+        Returns:
+            float: seconds until the next token is available (0 if available now)
+        """
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self._tokens) / self.rate)
+
+    def reserve(self):
+        """
+        Takes one token, even if it is not yet available.
+
+        Returns:
+            float: seconds to wait before the token may be used
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+
+class HostLimits:
+    """
+    Limits for the requests to one host, shared by all searches of a run.
+
+    * `rate`: requests per second per host (token bucket, `None` for unlimited)
+    * `concurrency`: maximum number of requests in flight per host (`None` for unlimited)
+    """
+
+    def __init__(self, rate=None, burst=None, concurrency=None):
+        """
+        Arguments:
+            rate (float): _optional_ requests per second per host
+            burst (float): _optional_ number of requests sent without delay, see `TokenBucket`
+            concurrency (int): _optional_ maximum number of requests in flight per host
+        """
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        """
+        Returns:
+            `TokenBucket` of the host or `None` without rate limit
+        """
+        if not self.rate:
+            return None
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def waitTime(self, host):
+        """
+        Returns:
+            float: seconds until the next request to the host is allowed
+        """
+        bucket = self.bucket(host)
+        return bucket.waitTime() if bucket is not None else 0.0
+
+    def reserve(self, host):
+        """
+        Reserves a request to the host.
+
+        Returns:
+            float: seconds to wait before the request may be sent
+        """
+        bucket = self.bucket(host)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def __repr__(self):
+        return "{}(rate={!r}, burst={!r}, concurrency={!r})".format(
+            self.__class__.__name__, self.rate, self.burst, self.concurrency)
+
+
+class ResultIterator:
+    """
+    Iterator over the results of `HostScheduler.imap_unordered`
+    in the order of completion, like `multiprocessing.pool.IMapIterator`.
+    """
+    _STOP = object()
+
+    def __init__(self, results, total):
+        self._results = results
+        self._total = total
+        self._received = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next()
+
+    def next(self, timeout=None):
+        """
+        Returns the next result.
+
+        Arguments:
+            timeout (float): _optional_ maximum seconds to wait for the result
+
+        Raises:
+            StopIteration: if all results were returned or the scheduler was terminated
+            multiprocessing.TimeoutError: if no result arrived within `timeout`
+            Exception: the exception raised by the function for the item
+        """
+        if self._received >= self._total:
+            raise StopIteration
+        try:
+            item = self._results.get(timeout=timeout)
+        except queue.Empty:
+            raise multiprocessing.TimeoutError from None
+        if item is self._STOP:
+            self._results.put(item)
+            raise StopIteration
+        self._received += 1
+        _index, ok, value = item
+        if not ok:
+            raise value
+        return value
+
+
+class HostScheduler:
+    """
+    Thread pool which runs the work items grouped by host.
+
+    * each host gets at most `limits.concurrency` workers and
+      `limits.rate` requests per second
+    * a worker stays on its host while there is work for it,
+      otherwise it changes to the host with the fewest requests in flight
+
+    The interface follows `multiprocessing.pool.Pool` (`map`, `imap_unordered`,
+    `close`, `terminate`, `join`).
+    """
+
+    def __init__(self, threads=4, limits=None, key=None):
+        """
+        Arguments:
+            threads (int): number of worker threads
+            limits (HostLimits): _optional_ limits per host
+            key: function which returns the host of a work item
+        """
+        self.threads = max(1, threads)
+        self.limits = limits or HostLimits()
+        self.key = key
+        self._queues = collections.OrderedDict()
+        self._inflight = collections.Counter()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._results = None
+        self._stopped = False
+
+    def _capacity(self, host):
+        concurrency = self.limits.concurrency
+        return not concurrency or self._inflight[host] < concurrency
+
+    def _pick(self, current):
+        """
+        Selects the host for the next work item (called with the lock).
+
+        Returns:
+            the host or `None` if all hosts with work reached their concurrency cap
+        """
+        hosts = [h for h in self._queues if self._capacity(h)]
+        if not hosts:
+            return None
+        if current in hosts and self.limits.waitTime(current) == 0:
+            return current
+        return min(hosts, key=lambda h: (self.limits.waitTime(h) > 0,
+                                         self._inflight[h], -len(self._queues[h])))
+
+    def _work(self, func):
+        current = None
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped or not self._queues:
+                        return
+                    host = self._pick(current)
+                    if host is not None:
+                        break
+                    self._cond.wait()
+                index, item = self._queues[host].popleft()
+                if not self._queues[host]:
+                    del self._queues[host]
+                self._inflight[host] += 1
+                delay = self.limits.reserve(host)
+            current = host
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                result = (index, True, func(item))
+            except Exception as exc:  # pylint: disable=broad-except
+                result = (index, False, exc)
+            with self._cond:
+                self._inflight[host] -= 1
+                self._cond.notify_all()
+            self._results.put(result)
+
+    def _start(self, func, items):
+        if self._workers:
+            raise ValueError("the scheduler is already running")
+        self._results = queue.Queue()
+        total = 0
+        for index, item in enumerate(items):
+            self._queues.setdefault(self.key(item), collections.deque()).append((index, item))
+            total += 1
+        for i in range(min(self.threads, total)):
+            worker = threading.Thread(target=self._work, args=(func,),
+                                      name="HostScheduler-{}".format(i), daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return total
+
+    def imap_unordered(self, func, items):
+        """
+        Runs `func` for all items.
+
+        Returns:
+            `ResultIterator` with the results in the order of completion
+        """
+        total = self._start(func, items)
+        return ResultIterator(self._results, total)
+
+    def map(self, func, items):
+        """
+        Runs `func` for all items and waits for all results.
+
+        Returns:
+            list with the results in the order of `items`
+
+        Raises:
+            Exception: the first exception raised by `func`
+        """
+        total = self._start(func, items)
+        results = [self._results.get() for _i in range(total)]
+        self.join()
+        for _index, ok, value in results:
+            if not ok:
+                raise value
+        return [value for _index, _ok, value in sorted(results, key=lambda r: r[0])]
+
+    def close(self):
+        """
+        No more work will be added; the workers exit when the work is done.
+        """
+
+    def terminate(self):
+        """
+        Drops the work that has not started yet and stops the `ResultIterator`.
+        The running work is finished, but its results are discarded.
+        """
+        with self._cond:
+            self._stopped = True
+            self._queues.clear()
+            self._cond.notify_all()
+        if self._results is not None:
+            self._results.put(ResultIterator._STOP)  # pylint: disable=protected-access
+
+    def join(self):
+        """
+        Waits for the worker threads.
+        """
+        for worker in self._workers:
+            worker.join()
+
+    def __repr__(self):
+        return "{}(threads={}, limits={!r})".format(self.__class__.__name__,
+                                                    self.threads, self.limits)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the `SessionPool`, a registry of `requests.Session` objects keyed by library.
+
+Most libraries share a few onleihe hosts (e.g. `www2.onleihe.de`).
+With one connection pool (`HTTPAdapter`) per host, all libraries on the
+same host reuse the same TCP/TLS connections instead of opening their own.
+The cookies are not shared: onleihe keeps the search state on server side,
+so each library gets its own session with its own cookie jar.
+"""
+import threading
+import urllib.parse as up
+
+
+class SessionPool:
+    """
+    Thread-safe registry of `requests.Session` objects keyed by library.
+
+    The pool provides the same request methods as `requests.Session`,
+    so it can be used as `sess` argument of `PyLeihe.basic.PyLeiheWeb`.
+    Each request is forwarded to the session of the target library,
+    which is created on first use.
+
+    .. HINT::
+        All libraries on the same host share the connections of the host adapter,
+        but each library has its own cookie jar.
+    """
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 10
+
+    def __init__(self, pool_connections=None, pool_maxsize=None):
+        """
+        Arguments:
+            pool_connections (int): _optional_ number of connection pools
+                (different hosts reached by redirects) cached per session
+            pool_maxsize (int): _optional_ maximum number of connections
+                kept open per host, should be at least the number of threads
+        """
+        self.pool_connections = pool_connections or self.POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or self.POOL_MAXSIZE
+        self._sessions = {}
+        self._adapters = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def hostKey(url):
+        """
+        Returns the key of the host session for the `url`.
+
+        Arguments:
+            url (str or up.ParseResult): destination address
+
+        Returns:
+            tuple with the lower case scheme and network location
+        """
+        if not isinstance(url, (up.ParseResult, up.SplitResult)):
+            url = up.urlsplit(url)
+        return (url.scheme.lower(), url.netloc.lower())
+
+    @classmethod
+    def libraryKey(cls, url):
+        """
+        Returns the key of the library session for the `url`.
+
+        The libraries on an onleihe host are told apart by the
+        first segment of the path (e.g. `https://www2.onleihe.de/lib1/frontend`).
+
+        Arguments:
+            url (str or up.ParseResult): destination address
+
+        Returns:
+            tuple with the key of the host and the first segment of the path
+        """
+        if not isinstance(url, (up.ParseResult, up.SplitResult)):
+            url = up.urlsplit(url)
+        return cls.hostKey(url) + (url.path.lstrip("/").split("/", 1)[0],)
+
+    def _newSession(self, host):
+        import requests  # pylint: disable=import-outside-toplevel
+        from requests.adapters import HTTPAdapter  # pylint: disable=import-outside-toplevel
+        adapter = self._adapters.get(host)
+        if adapter is None:
+            adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                                  pool_maxsize=self.pool_maxsize)
+            self._adapters[host] = adapter
+        sess = requests.Session()
+        sess.mount("http://", adapter)
+        sess.mount("https://", adapter)
+        return sess
+
+    def getSession(self, url):
+        """
+        Returns the session for the library of the `url` and creates it if necessary.
+
+        The new session uses the adapter (connection pool) of the host.
+
+        Arguments:
+            url (str): destination address
+
+        Returns:
+            `requests.Session` of the library
+        """
+        key = self.libraryKey(url)
+        with self._lock:
+            sess = self._sessions.get(key)
+            if sess is None:
+                self.misses += 1
+                sess = self._newSession(key[:2])
+                self._sessions[key] = sess
+            else:
+                self.hits += 1
+        return sess
+
+    def request(self, method, url, **kwargs):
+        """
+        Sends the request with the session of the host, see `requests.Session.request`.
+        """
+        return self.getSession(url).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        """
+        Sends a GET request, see `requests.Session.get`.
+        """
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        """
+        Sends a POST request, see `requests.Session.post`.
+        """
+        return self.request("POST", url, data=data, **kwargs)
+
+    @staticmethod
+    def _countConnections(adapter):
+        connections = 0
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+        return connections
+
+    def stats(self):
+        """
+        Reports the usage of the pool.
+
+        Returns:
+            dict with the number of `hosts` and `libraries`, the session lookups
+            which reused a session (`hits`) or created a new one (`misses`)
+            and the number of opened `connections` (TCP/TLS handshakes)
+        """
+        with self._lock:
+            adapters = list(self._adapters.values())
+            stats = {"hosts": len(adapters), "libraries": len(self._sessions),
+                     "hits": self.hits, "misses": self.misses}
+        stats["connections"] = sum(self._countConnections(a) for a in adapters)
+        return stats
+
+    def close(self):
+        """
+        Closes all sessions and their connections.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._adapters.clear()
+        for sess in sessions:
+            sess.close()
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__,
+                               ", ".join("{}={}".format(k, v) for k, v in self.stats().items()))
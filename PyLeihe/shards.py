@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the sharded catalog: one JSON file per `PyLeihe.localgroup.LocalGroup`
+and a small manifest, so a single state is loaded without the others.
+
+The directory `<jsonfile>.shards` contains
+
+* `manifest.json`: version and per state the id, name, file and the
+  lower case titles of its libraries (to find a library without loading all states)
+* `<id>.json`: the JSON representation of the state (`LocalGroup.reprJSON`)
+
+see `PyLeihe.bibindex.PyLeiheNet.loadFromShards`
+"""
+import json
+import os
+
+VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def shardPath(jsonfile=""):
+    """
+    Returns the directory of the shards for the JSON catalog `jsonfile`
+    (without the extension `.json`, see `PyLeihe.basic.PyLeiheWeb.toJSONFile`).
+    """
+    return "{}.shards".format(jsonfile or "PyLeiheNet")
+
+
+def isCurrent(jsonfile=""):
+    """
+    Returns whether a manifest exists which is not older than the JSON catalog.
+    """
+    try:
+        manifest = os.path.getmtime(os.path.join(shardPath(jsonfile), MANIFEST))
+    except OSError:
+        return False
+    try:
+        return manifest >= os.path.getmtime("{}.json".format(jsonfile or "PyLeiheNet"))
+    except OSError:
+        return True
+
+
+def _dump(data, path):
+    tmp = "{}.tmp".format(path)
+    with open(tmp, "w") as f:
+        json.dump(data, f, sort_keys=False, indent=4)
+    os.replace(tmp, path)
+
+
+def writeShards(pln, directory):
+    """
+    Writes the catalog as one file per state and the manifest
+    (each file is replaced atomically, the manifest last).
+
+    Arguments:
+        pln (PyLeihe.bibindex.PyLeiheNet): the catalog
+        directory (str): directory of the shards, see `shardPath`
+    """
+    os.makedirs(directory, exist_ok=True)
+    states = []
+    for land in pln.Laender:
+        filename = "{}.json".format(land.lid)
+        _dump(land.reprJSON(), os.path.join(directory, filename))
+        states.append({"id": land.lid,
+                       "name": land.name,
+                       "file": filename,
+                       "titles": [b.title.lower() for b in land.Bibliotheken]})
+    _dump({"version": VERSION, "states": states}, os.path.join(directory, MANIFEST))
+
+
+def readManifest(directory):
+    """
+    Reads the manifest of the shards.
+
+    Arguments:
+        directory (str): directory of the shards, see `shardPath`
+
+    Returns:
+        list with a dict per state (`id`, `name`, `file` and `titles`)
+
+    Raises:
+        ValueError: if the manifest is broken or of another version
+        OSError: if the manifest can't be read
+    """
+    with open(os.path.join(directory, MANIFEST), "r") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get("version") != VERSION:
+        raise ValueError("no shard manifest of version {}: {}".format(VERSION, directory))
+    return data["states"]
@@ -2,9 +2,24 @@
 This module provides basic functions for the use of the package.
 Most of the functions are used for the command line interface in `__main__.py`
 """
+import heapq
+import itertools
 import logging
-from multiprocessing.dummy import Pool
+import multiprocessing
+import shutil
+import sys
+import time
 from . import PyLeiheNet
+from .bibindex import STATE_THREADS
+from .sessions import SessionPool
+from .basic import PyLeiheWeb, optionalModule
+from .scheduler import HostScheduler
+from .health import OPEN
+from .cache import normalizeURL
+from . import shards, snapshot
+
+# minimum time between two refreshes of the result table in seconds
+REFRESH_INTERVAL = 0.2
 
 
 def correct_search_urls(PyLN):
@@ -37,6 +52,8 @@ def correct_searchurls_land(land):
         land["libell-e"].search_url = "https://www2.onleihe.de/libell-e-sued/frontend/search,0-0-0-0-0-0-0-0-0-0-0.html"  # noqa: E501
     elif land["libell-e"] is not None:
         land["libell-e"].search_url = "https://www2.onleihe.de/libell-e-nord/frontend/search,0-0-0-0-0-0-0-0-0-0-0.html"  # noqa: E501
+    # the search host index of the libraries is outdated
+    land.Bibliotheken.invalidate()
     if land_name == "Badenwuerttemberg":
         remove_baden = land["baden"]
         if remove_baden is not None:
@@ -52,7 +69,22 @@ def correct_searchurls_land(land):
     # pylint: enable=line-too-long
 
 
-def makejson(reload_data=False, filename="", to_filename=""):
+def print_progress(done, total):
+    """
+    Prints the progress of a step, on a terminal refreshed in place,
+    else only when the step is finished.
+
+    Arguments:
+        done (int): number of finished items
+        total (int): number of all items
+    """
+    if sys.stdout.isatty():
+        print("\r{}/{}".format(done, total), end="\n" if done >= total else "", flush=True)
+    elif done >= total:
+        print("{}/{}".format(done, total))
+
+
+def makejson(reload_data=False, filename="", to_filename="", threads=4):
     """
     The aim of the function is to create a json file with all preprocessed data.
 
@@ -62,36 +94,43 @@ def makejson(reload_data=False, filename="", to_filename=""):
         filename (str): path to the json file
             from which the json data is imported if `reload_data` is `False`
         to_filename (str): path to the result json file - for further information see `toJSONFile()`
+        threads (int): number of libraries whose search url is loaded at the same time
 
     Returns:
-        the saved `PyLeihe.bibindex.PyLeiheNet` instance
+        the saved `PyLeihe.bibindex.PyLeiheNet` instance or `None` if the
+        json file or a federal state could not be loaded (nothing is saved)
     """
-    pln = PyLeiheNet()
+    pln = PyLeiheNet(sess=SessionPool(pool_maxsize=_pool_size(max(threads, STATE_THREADS))))
     if reload_data:
         print("Lade Bundeslaender")
         pln.getBundesLaender()
         print("Lade Bibliotheken der Bundeslaender")
         pln.loadallBundesLaender(groupbytitle=True, loadsearchURLs=False)
+        if pln.LoadErrors:
+            # don't replace a complete catalog with one missing states
+            logging.error("The catalog is not saved, the states could not be loaded: %s",
+                          ", ".join(sorted(pln.LoadErrors)))
+            return None
     else:
         try:
-            pln = pln.loadFromJSON(filename=filename)
+            pln = pln.loadFromJSON(filename=filename, sess=pln.Session)
         except FileNotFoundError:
             logging.exception("The json file '%s' to import does not exist.", filename)
             return None
     print("SearchURLs manuell ergänzen")
     correct_search_urls(pln)
-    print("SearchURLslLaden")
-    for land in pln.Laender:
-        land.loadsearchURLs(newtitle=True)
+    print("SearchURLs laden")
+    pln.loadsearchURLs(newtitle=True, threads=threads, progress=print_progress)
     print("Neues Gruppieren mit SearchURL")
-    for land in pln.Laender:
-        land.groupbytitle()
+    pln.groupbytitle()
     print("Speichere JSON")
     pln.toJSONFile(to_filename)
+    pln.toSnapshotFile(to_filename)
+    pln.toShards(to_filename)
     return pln
 
 
-def parallel_search_helper(search="", category=None):
+def parallel_search_helper(search="", category=None, **kwargs):
     """
     Help function that creates the search function when using multiple threads.
 
@@ -100,6 +139,7 @@ def parallel_search_helper(search="", category=None):
                 which is passed to `Bibliography.search()`
         search (PyLeihe.bibliography.MediaType): _optional_ media categorie to search for
                 which is passed to `Bibliography.search()`
+        kwargs: additional options passed to `Bibliography.search()`
 
     Returns:
         Function `run()` which can be called
@@ -115,42 +155,763 @@ def parallel_search_helper(search="", category=None):
             Tuple with the library and the return value from the search.
             see `Bibliography.search()`
         """
-        return (bib, bib.search(search, category))
+        return (bib, bib.search(search, category, **kwargs))
     return run
 
 
-def search_list(search="", category=None, use_json=True, jsonfile='', threads=4):
+def _item_host(item):
+    """
+    Returns the host key of a work item (library or pair of search text and library).
+    """
+    bib = item[1] if isinstance(item, tuple) else item
+    return SessionPool.hostKey(bib.search_url or bib.url)
+
+
+def _connector(concurrency, limits=None):
+    per_host = limits.concurrency if limits is not None and limits.concurrency else 0
+    return optionalModule("aiohttp").TCPConnector(limit=concurrency, limit_per_host=per_host)
+
+
+def _client_timeout():
+    """
+    Returns the `aiohttp.ClientTimeout` with the connect and read timeouts
+    of `PyLeiheWeb.TIMEOUT`.
+    """
+    connect, read = PyLeiheWeb.TIMEOUT
+    return optionalModule("aiohttp").ClientTimeout(sock_connect=connect, sock_read=read)
+
+
+async def _throttle(bib, limits=None):
+    """
+    Waits until the rate limit of the host allows the next search.
+    """
+    if limits is not None:
+        delay = limits.reserve(_item_host(bib))
+        if delay > 0:
+            import asyncio  # pylint: disable=import-outside-toplevel
+            await asyncio.sleep(delay)
+
+
+async def async_batch_helper(tasks, category=None, concurrency=100, limits=None, **kwargs):
     """
+    Coroutine to run search tasks (search text and library) with `Bibliography.asearch()`.
+
+    All searches share one `aiohttp.ClientSession`.
+    At most `concurrency` searches (and connections) are in flight at the same time.
 
     Arguments:
-        search (str): keyword to search for in all PyLeiheNet
+        tasks (list[tuple]): pairs of the search text and the library to be searched
+        category (PyLeihe.bibliography.MediaType): _optional_ media categorie to search for
+        concurrency (int): maximum number of concurrent searches
+        limits (PyLeihe.scheduler.HostLimits): _optional_ rate and connection limits per host
+        kwargs: additional options passed to `Bibliography.asearch()`
+
+    Returns:
+        list with tuples of the search text, the library and the return value
+        from the search in the order of `tasks`.
+    """
+    import asyncio  # pylint: disable=import-outside-toplevel
+    aiohttp = optionalModule("aiohttp")
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(connector=_connector(concurrency, limits),
+                                     timeout=_client_timeout()) as session:
+        async def run(search, bib):
+            # wait for the rate limit of the host without a slot,
+            # so a throttled host does not hold back the other hosts
+            await _throttle(bib, limits)
+            async with semaphore:
+                return (search, bib,
+                        await bib.asearch(search, category, session=session, **kwargs))
+        return await asyncio.gather(*(run(search, bib) for search, bib in tasks))
+
+
+async def async_search_helper(bibs, search="", category=None, concurrency=100, limits=None,
+                              **kwargs):
+    """
+    Coroutine to search in all libraries with `Bibliography.asearch()`,
+    see `async_batch_helper`.
+
+    Arguments:
+        bibs (list[PyLeihe.bibliography.Bibliography]): the libraries to be searched
+        search (str): _optional_ keyword to search for
+        category (PyLeihe.bibliography.MediaType): _optional_ media categorie to search for
+        concurrency (int): maximum number of concurrent searches
+        limits (PyLeihe.scheduler.HostLimits): _optional_ rate and connection limits per host
+        kwargs: additional options passed to `Bibliography.asearch()`
+
+    Returns:
+        list with tuples of the library and the return value from the search
+        in the order of `bibs`.
+    """
+    results = await async_batch_helper([(search, bib) for bib in bibs], category,
+                                       concurrency, limits, **kwargs)
+    return [(bib, result) for _search, bib, result in results]
+
+
+async def async_iter_batch_helper(tasks, category=None, concurrency=100, limits=None,
+                                  **kwargs):
+    """
+    Asynchronous generator of the results of search tasks in the order of completion,
+    see `async_batch_helper`.
+
+    Yields:
+        tuples of the search text, the library and the return value from the search
+    """
+    import asyncio  # pylint: disable=import-outside-toplevel
+    aiohttp = optionalModule("aiohttp")
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(connector=_connector(concurrency, limits),
+                                     timeout=_client_timeout()) as session:
+        async def run(search, bib):
+            # wait for the rate limit of the host without a slot,
+            # so a throttled host does not hold back the other hosts
+            await _throttle(bib, limits)
+            async with semaphore:
+                return (search, bib,
+                        await bib.asearch(search, category, session=session, **kwargs))
+        pending = [asyncio.ensure_future(run(search, bib)) for search, bib in tasks]
+        try:
+            for done in asyncio.as_completed(pending):
+                yield await done
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def async_iter_helper(bibs, search="", category=None, concurrency=100, limits=None,
+                            **kwargs):
+    """
+    Asynchronous generator of the search results in the order of completion,
+    see `async_search_helper`.
+
+    Yields:
+        tuples of the library and the return value from the search
+    """
+    results = async_iter_batch_helper([(search, bib) for bib in bibs], category,
+                                      concurrency, limits, **kwargs)
+    try:
+        async for _search, bib, result in results:
+            yield (bib, result)
+    finally:
+        await results.aclose()
+
+
+def batch_search_helper(category=None, **kwargs):
+    """
+    Help function that creates the function for one search task
+    (search text and library) when using multiple threads.
+
+    Arguments:
+        category (PyLeihe.bibliography.MediaType): _optional_ media categorie to search for
+        kwargs: additional options passed to `Bibliography.search()`
+
+    Returns:
+        Function `run(task)` which returns a tuple with the search text,
+        the library and the return value from the search.
+    """
+    def run(task):
+        search, bib = task
+        return (search, bib, bib.search(search, category, **kwargs))
+    return run
+
+
+def _failed_result(item):
+    """
+    Returns the result `-4` (see `Bibliography.search`) for a work item.
+    """
+    if isinstance(item, tuple):
+        return item + (-4,)
+    return (item, -4)
+
+
+def _adapt(run, threads, adaptive=None, cache=None):
+    """
+    Wraps the search function of the engine `threads` for an `AdaptiveLimiter`.
+    Results from the `cache` and skipped searches (`-5`, `-7`) are no latency samples.
+
+    Returns:
+        tuple with the search function and the number of threads
+    """
+    if adaptive is None:
+        return run, threads
+    search = run
+    if cache is not None:
+        def search(item):
+            cache.takeHit()
+            return run(item)
+
+    def sample(result):
+        return result[-1] not in (-5, -7) and (cache is None or not cache.takeHit())
+    return (adaptive.wrap(search, error=lambda result: result[-1] == -4,
+                          fallback=_failed_result, sample=sample),
+            adaptive.maximum)
+
+
+def _pool_size(threads, adaptive=None):
+    """
+    Returns the number of connections kept open per host for the `SessionPool`.
+    """
+    return max(threads, adaptive.maximum if adaptive is not None else 0,
+               SessionPool.POOL_MAXSIZE)
+
+
+def Pool(processes):
+    """
+    Returns a thread pool of `multiprocessing.dummy` (imported on the first call).
+    """
+    from multiprocessing.dummy import Pool as ThreadPool  # pylint: disable=import-outside-toplevel
+    return ThreadPool(processes)
+
+
+def _workpool(threads, limits=None):
+    """
+    Returns the thread pool: a `HostScheduler` with `limits`, else a `Pool`.
+    """
+    if limits is not None:
+        return HostScheduler(threads, limits, key=_item_host)
+    return Pool(threads)
+
+
+def _run_engine(engine, threads, run, items, coroutine, limits=None):
+    """
+    Runs the searches with the selected engine.
+
+    Arguments:
+        engine (str): `threads` or `async`, see `search_bibs`
+        threads (int): number of threads for the engine `threads`
+        run: function called for every item with the engine `threads`
+        items (list): the work items
+        coroutine: function without arguments creating the coroutine for the engine `async`
+        limits (PyLeihe.scheduler.HostLimits): _optional_ limits per host,
+            the engine `threads` schedules the items with a `HostScheduler`
+
+    Returns:
+        list with the results in the order of `items`
+    """
+    if engine == "async":
+        if optionalModule("aiohttp") is None:
+            raise ImportError("the engine 'async' requires the optional package 'aiohttp'")
+        import asyncio  # pylint: disable=import-outside-toplevel
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine())
+        finally:
+            loop.close()
+    if engine != "threads":
+        raise ValueError("unknown search engine: {}".format(engine))
+    if threads <= 0:
+        return [run(item) for item in items]
+    workpool = _workpool(threads, limits)
+    results = workpool.map(run, items)
+    # close the pool and wait for the work to finish
+    workpool.close()
+    workpool.join()
+    return results
+
+
+def _remaining(until):
+    """
+    Returns the seconds until the monotonic time `until` (`None` without deadline).
+    """
+    return None if until is None else until - time.monotonic()
+
+
+def _iter_threads(threads, run, items, limits=None, until=None):
+    if threads <= 0 and until is None:
+        for item in items:
+            yield run(item)
+        return
+    # with a deadline the items run in at least one worker thread,
+    # so a running search can't delay the deadline either
+    workpool = _workpool(max(threads, 1), limits)
+    finished = False
+    try:
+        results = workpool.imap_unordered(run, items)
+        while True:
+            timeout = _remaining(until)
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                yield results.next(timeout)
+            except StopIteration:
+                finished = True
+                break
+            except multiprocessing.TimeoutError:
+                break
+    finally:
+        if finished:
+            workpool.close()
+            workpool.join()
+        else:
+            # drops the outstanding work if the deadline passed or the consumer
+            # stopped early, running requests end with their timeout in the background
+            workpool.terminate()
+
+
+def _iter_async(agen, until=None):
+    import asyncio  # pylint: disable=import-outside-toplevel
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            timeout = _remaining(until)
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                yield loop.run_until_complete(asyncio.wait_for(agen.__anext__(), timeout))
+            except (StopAsyncIteration, asyncio.TimeoutError):
+                break
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
+
+
+def _iter_engine(engine, threads, run, items, agen, limits=None, until=None):
+    """
+    Like `_run_engine`, but returns an iterator over the results in the order of completion.
+
+    Arguments:
+        agen: function without arguments creating the asynchronous generator
+            for the engine `async`
+        until (float): _optional_ deadline as `time.monotonic()` value,
+            the iterator stops and the outstanding work is cancelled when it passes
+    """
+    if engine == "async":
+        if optionalModule("aiohttp") is None:
+            raise ImportError("the engine 'async' requires the optional package 'aiohttp'")
+        return _iter_async(agen(), until)
+    if engine != "threads":
+        raise ValueError("unknown search engine: {}".format(engine))
+    return _iter_threads(threads, run, items, limits, until)
+
+
+def _mark_unfinished(results, bibs):
+    """
+    Yields the results and afterwards `-6` (deadline exceeded)
+    for the libraries without result.
+    """
+    done = set()
+    for result in results:
+        done.add(id(result[0]))
+        yield result
+    for bib in bibs:
+        if id(bib) not in done:
+            yield (bib, -6)
+
+
+def search_bibs(bibs, search="", category=None, threads=4, engine="threads", concurrency=100,
+                as_completed=False, limits=None, adaptive=None, deadline=None, **kwargs):
+    """
+    Searches in all given libraries with the selected engine.
+
+    Arguments:
+        bibs (list[PyLeihe.bibliography.Bibliography]): the libraries to be searched
+        search (str): keyword to search for
         category (MediaType): mediatype filter
-        use_json (bool): whether pre-processed local data from a json file
-                  of countries and libraries should be used
-                  or everything should be downloaded on-the-fly from the Internet
-        jsonfile (str): path to json file (used for `use_json = True`)
         threads (int): number of concurrent threads to be used for searching
+            with the engine `threads`
+        engine (str): `threads` for a thread pool with blocking requests or
+            `async` for `asyncio` (requires `aiohttp`)
+        concurrency (int): maximum number of searches in flight with the engine `async`
+        as_completed (bool): return an iterator which yields the results
+            as soon as they are available instead of a list
+        limits (PyLeihe.scheduler.HostLimits): _optional_ rate and concurrency limits
+            per host; the engine `threads` then groups the libraries by host
+            (see `PyLeihe.scheduler.HostScheduler`)
+        adaptive (PyLeihe.adaptive.AdaptiveLimiter): _optional_ adapts the number of
+            concurrent searches of the engine `threads` to the push back of the servers
+            (up to `adaptive.maximum` threads instead of `threads`)
+        deadline (float): _optional_ maximum duration of the whole search in seconds,
+            afterwards the outstanding searches are cancelled and the
+            unfinished libraries get the result `-6`
+        kwargs: additional options passed to `Bibliography.search()`,
+            e.g. `stream`
+
+    Returns:
+        list (or iterator with `as_completed`) with tuples of the library
+        and the return value from the search.
+
+    Raises:
+        ImportError: if the engine `async` is selected without `aiohttp`
+        ValueError: for an unknown engine
     """
-    logging.debug("SearchList start")
-    pln = PyLeiheNet()
+    run, threads = _adapt(parallel_search_helper(search, category, **kwargs), threads, adaptive,
+                          kwargs.get("cache"))
+    if as_completed or deadline is not None:
+        until = None if deadline is None else time.monotonic() + deadline
+        results = _iter_engine(engine, threads, run, bibs,
+                               lambda: async_iter_helper(bibs, search, category, concurrency,
+                                                         limits, **kwargs),
+                               limits, until)
+        if deadline is not None:
+            results = _mark_unfinished(results, bibs)
+        if as_completed:
+            return results
+        done = {id(bib): result for bib, result in results}
+        return [(bib, done[id(bib)]) for bib in bibs]
+    return _run_engine(engine, threads, run, bibs,
+                       lambda: async_search_helper(bibs, search, category, concurrency,
+                                                   limits, **kwargs),
+                       limits)
+
+
+def resolve_search_urls(bibs, threads=4, until=None):
+    """
+    Resolves the missing `search_url` of the libraries once
+    (see `Bibliography.grepSearchURL`) before several searches use them.
+
+    Arguments:
+        bibs (list[PyLeihe.bibliography.Bibliography]): the libraries
+        threads (int): number of concurrent threads
+        until (float): _optional_ deadline as `time.monotonic()` value
+
+    Returns:
+        tuple with the list of libraries whose `search_url` could not be found and
+        the list of libraries which were not resolved before the deadline
+    """
+    def resolve(bib):
+        bib.grepSearchURL()
+        return bib
+    missing = [bib for bib in bibs if bib.search_url is None]
+    done = set()
+    if missing:
+        for bib in _iter_engine("threads", threads, resolve, missing, None, until=until):
+            done.add(id(bib))
+    return ([bib for bib in missing if id(bib) in done and bib.search_url is None],
+            [bib for bib in missing if id(bib) not in done])
+
+
+def group_endpoints(bibs):
+    """
+    Groups the libraries with the same normalized `search_url`
+    (e.g. a library association listed in several states).
+
+    Arguments:
+        bibs (list[PyLeihe.bibliography.Bibliography]): the libraries
+
+    Returns:
+        tuple with the list of libraries to search (the first library of every
+        endpoint and all libraries without `search_url`) and a dict with
+        `id()` of these libraries as key and the list of all libraries
+        sharing the endpoint as value
+    """
+    unique = []
+    owners = {}
+    endpoints = {}
+    for bib in bibs:
+        key = normalizeURL(bib.search_url) if bib.search_url else None
+        first = endpoints.get(key) if key is not None else None
+        if first is not None:
+            owners[id(first)].append(bib)
+            continue
+        if key is not None:
+            endpoints[key] = bib
+        unique.append(bib)
+        owners[id(bib)] = [bib]
+    return unique, owners
+
+
+def _fan_out(results, owners):
+    """
+    Yields the result of every searched library for all libraries sharing its endpoint,
+    see `group_endpoints`.
+    """
+    for bib, result in results:
+        for owner in owners[id(bib)]:
+            yield (owner, result)
+
+
+def load_net(use_json=True, jsonfile='', sess=None, lazy=False):
+    """
+    Loads the catalog of all states and libraries.
+
+    A binary snapshot (see `PyLeihe.snapshot`) which is not older than the
+    json file is loaded instead of the json file.
+
+    Arguments:
+        use_json (bool): whether pre-processed local data from a json file should be used
+            or everything should be downloaded on-the-fly from the Internet
+        jsonfile (str): path to json file (used for `use_json = True`)
+        sess: _optional_ session shared by all libraries, see `PyLeiheWeb`
+        lazy (bool): _optional_ load the states from the shards (see `PyLeihe.shards`)
+            on the first access, if they are not older than the json file
+
+    Returns:
+        PyLeihe.bibindex.PyLeiheNet
+    """
+    pln = PyLeiheNet(sess=sess)
+    if use_json and lazy and shards.isCurrent(jsonfile):
+        try:
+            return pln.loadFromShards(filename=jsonfile, sess=sess)
+        except (OSError, ValueError) as exc:
+            logging.warning("Shards of '%s' could not be loaded: %s", jsonfile, exc)
+    if use_json and snapshot.isCurrent(jsonfile):
+        try:
+            return pln.loadFromSnapshot(filename=jsonfile, sess=sess)
+        except (OSError, ValueError) as exc:
+            logging.warning("Snapshot of '%s' could not be loaded: %s", jsonfile, exc)
     if use_json:
-        pln = pln.loadFromJSON(filename=jsonfile)
+        pln = pln.loadFromJSON(filename=jsonfile, sess=sess)
     else:
         pln.getBundesLaender()
         pln.loadallBundesLaender(groupbytitle=True, loadsearchURLs=False)
+    return pln
+
+
+def load_bibs(use_json=True, jsonfile='', sess=None, state=None):
+    """
+    Loads all libraries.
+
+    Arguments:
+        use_json (bool): see `load_net`
+        jsonfile (str): path to json file (used for `use_json = True`)
+        sess: _optional_ session shared by all libraries, see `PyLeiheWeb`
+        state (str): _optional_ name of a federal state, only its libraries are
+            loaded (from the shards if possible, see `load_net`)
+
+    Returns:
+        list[PyLeihe.bibliography.Bibliography] (empty for an unknown `state`)
+    """
+    pln = load_net(use_json, jsonfile, sess, lazy=state is not None)
+    if state is not None:
+        land = pln[state]
+        if land is None:
+            logging.error("The state '%s' does not exist.", state)
+            return []
+        try:
+            return list(land.Bibliotheken)
+        except (OSError, ValueError, KeyError) as exc:
+            # a missing or broken shard of the state
+            logging.warning("Shard of the state '%s' could not be loaded: %s", state, exc)
+        land = load_net(use_json, jsonfile, sess)[state]
+        return list(land.Bibliotheken) if land is not None else []
     bibs = [b for l in pln.Laender for b in l.Bibliotheken]
     logging.debug("Libraries: %i", len(bibs))
-    results = []
-    if threads > 0:
-        workpool = Pool(threads)
-        search_run = parallel_search_helper(search, category)
-        results = workpool.map(search_run, bibs)
-        # close the pool and wait for the work to finish
-        workpool.close()
-        workpool.join()
+    return bibs
+
+
+def search_list(search="", category=None, use_json=True, jsonfile='', threads=4,
+                engine="threads", concurrency=100, as_completed=False, limits=None,
+                adaptive=None, deadline=None, state=None, **kwargs):
+    """
+
+    Arguments:
+        search (str): keyword to search for in all PyLeiheNet
+        category (MediaType): mediatype filter
+        use_json (bool): whether pre-processed local data from a json file
+                  of countries and libraries should be used
+                  or everything should be downloaded on-the-fly from the Internet
+        jsonfile (str): path to json file (used for `use_json = True`)
+        threads (int): number of concurrent threads to be used for searching
+        engine (str): search engine, see `search_bibs`
+        concurrency (int): maximum number of searches in flight with the engine `async`
+        as_completed (bool): yield the results as soon as they are available,
+            see `search_bibs`
+        limits (PyLeihe.scheduler.HostLimits): _optional_ limits per host, see `search_bibs`
+        adaptive (PyLeihe.adaptive.AdaptiveLimiter): _optional_ adaptive concurrency,
+            see `search_bibs`
+        deadline (float): _optional_ maximum duration of the search in seconds,
+            unfinished libraries get the result `-6`, see `search_bibs`
+        state (str): _optional_ search only the libraries of this federal state,
+            see `load_bibs`
+        kwargs: additional options passed to `Bibliography.search()`
+
+    Every search endpoint is queried once, libraries with the same `search_url`
+    share the result (see `group_endpoints`).
+    """
+    logging.debug("SearchList start")
+    sess = SessionPool(pool_maxsize=_pool_size(threads, adaptive))
+    bibs = load_bibs(use_json, jsonfile, sess, state)
+    unique, owners = group_endpoints(bibs)
+    if len(unique) < len(bibs):
+        logging.debug("Search endpoints: %i for %i libraries", len(unique), len(bibs))
+    results = search_bibs(unique, search, category, threads=threads, engine=engine,
+                          concurrency=concurrency, as_completed=as_completed, limits=limits,
+                          adaptive=adaptive, deadline=deadline, **kwargs)
+    logging.debug("HTTP sessions: %r", sess)
+    if len(unique) == len(bibs):
+        return results
+    if as_completed:
+        return _fan_out(results, owners)
+    found = {id(bib): result for bib, result in _fan_out(results, owners)}
+    return [(bib, found[id(bib)]) for bib in bibs]
+
+
+def search_batch(searches, category=None, use_json=True, jsonfile='', threads=4,
+                 engine="threads", concurrency=100, limits=None, adaptive=None, deadline=None,
+                 state=None, **kwargs):
+    """
+    Searches several keywords in all libraries in one pass.
+
+    The catalog is loaded once, all searches share the sessions and
+    the `search_url` of every library is resolved only once.
+    All combinations of keyword and search endpoint are scheduled together
+    on the selected engine (see `search_bibs`), libraries with the same
+    `search_url` share the result (see `group_endpoints`).
+
+    Arguments:
+        searches (list[str]): keywords to search for, duplicates are searched once
+        category (MediaType): mediatype filter
+        use_json (bool): see `search_list`
+        jsonfile (str): path to json file (used for `use_json = True`)
+        threads (int): number of concurrent threads to be used for searching
+        engine (str): search engine, see `search_bibs`
+        concurrency (int): maximum number of searches in flight with the engine `async`
+        limits (PyLeihe.scheduler.HostLimits): _optional_ limits per host, see `search_bibs`
+        adaptive (PyLeihe.adaptive.AdaptiveLimiter): _optional_ adaptive concurrency,
+            see `search_bibs`
+        deadline (float): _optional_ maximum duration of all searches in seconds
+            (including the resolution of the search urls),
+            unfinished searches get the result `-6`
+        state (str): _optional_ search only the libraries of this federal state,
+            see `load_bibs`
+        kwargs: additional options passed to `Bibliography.search()`
+
+    Returns:
+        dict with the keyword as key and a list with tuples of the library and
+        the return value from the search (in the order of the libraries) as value.
+    """
+    searches = list(dict.fromkeys(searches))
+    logging.debug("SearchBatch start: %i keywords", len(searches))
+    sess = SessionPool(pool_maxsize=_pool_size(threads, adaptive))
+    bibs = load_bibs(use_json, jsonfile, sess, state)
+    until = None if deadline is None else time.monotonic() + deadline
+    health = kwargs.get("health")
+    # libraries without search url: -3, or -6 if the deadline stopped their resolution
+    unresolved = {}
+    if not kwargs.get("cache_only"):
+        # libraries with an open circuit are skipped by the search (-7)
+        pending = [bib for bib in bibs
+                   if health is None or health.state(bib.url_up) != OPEN]
+        failed, unfinished = resolve_search_urls(pending, threads, until)
+        unresolved = {id(bib): -3 for bib in failed}
+        unresolved.update((id(bib), -6) for bib in unfinished)
+        if health is not None:
+            for bib in failed:
+                health.record(bib.url_up, -3)
+    unique, owners = group_endpoints([bib for bib in bibs if id(bib) not in unresolved])
+    tasks = [(search, bib) for search in searches for bib in unique]
+    run, search_threads = _adapt(batch_search_helper(category, **kwargs), threads, adaptive,
+                                 kwargs.get("cache"))
+    if until is None:
+        results = _run_engine(engine, search_threads, run, tasks,
+                              lambda: async_batch_helper(tasks, category, concurrency, limits,
+                                                         **kwargs),
+                              limits)
     else:
-        results = [(bib, bib.search(search, category)) for bib in bibs]
-    return results
+        results = _iter_engine(engine, search_threads, run, tasks,
+                               lambda: async_iter_batch_helper(tasks, category, concurrency,
+                                                               limits, **kwargs),
+                               limits, until)
+    found = {(search, id(owner)): result
+             for search, bib, result in results for owner in owners[id(bib)]}
+    logging.debug("HTTP sessions: %r", sess)
+    return {search: [(bib, found.get((search, id(bib)), unresolved.get(id(bib), -6)))
+                     for bib in bibs]
+            for search in searches}
+
+
+def read_search_file(filename):
+    """
+    Reads the keywords for `search_batch` from a text file.
+
+    One keyword per line, empty lines and lines starting with `#` are ignored.
+
+    Arguments:
+        filename (str): path to the utf-8 encoded text file
+
+    Returns:
+        list[str] with the keywords
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+class TopResults:
+    """
+    Collects the `top` best search results with a bounded heap,
+    results with the same number of hits keep their arrival order.
+    """
+
+    def __init__(self, top=10):
+        """
+        Arguments:
+            top (int): number of kept results (<1 for unlimited)
+        """
+        self.top = top
+        self._heap = []
+        self._counter = itertools.count()
+
+    def add(self, bib, count):
+        """
+        Adds a search result.
+
+        Returns:
+            bool: whether the result is among the best results
+        """
+        entry = (count, -next(self._counter), bib)
+        if self.top <= 0 or len(self._heap) < self.top:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] <= self._heap[0][:2]:
+            return False
+        heapq.heapreplace(self._heap, entry)
+        return True
+
+    def results(self):
+        """
+        Returns:
+            list with tuples of the library and the return value from the search,
+            sorted by the number of hits
+        """
+        return [(bib, count) for count, _n, bib in sorted(self._heap, reverse=True,
+                                                          key=lambda e: e[:2])]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+def format_result(bib, count):
+    """
+    Returns one line of the result table.
+    """
+    title = bib.title or "NA"
+    return "{1:2d} {0:25}\t{2}".format(title, count, ','.join(bib.cities[:5]))
+
+
+def print_results(results, top=10):
+    """
+    Sorts the results of one search and prints the first `top` results to the console.
+
+    Arguments:
+        results (list): tuples of the library and the return value from the search
+        top (int): _optional_ limitation of the number of results (<1 for unlimited)
+    """
+    best = TopResults(top)
+    for r in filter(None, results):
+        best.add(*r)
+    for r in best.results():
+        print(format_result(*r))
+
+
+def city_print(city, use_json=True, jsonfile=''):
+    """
+    Prints the libraries serving a city to the console,
+    see `PyLeihe.bibindex.PyLeiheNet.findCity`.
+
+    Arguments:
+        city (str): name of the city, with a trailing `*` all cities with the prefix
+        use_json (bool): see `load_net`
+        jsonfile (str): path to json file (used for `use_json = True`)
+    """
+    prefix = city.endswith("*")
+    found = load_net(use_json, jsonfile).findCity(city.rstrip("*"), prefix=prefix)
+    if not found:
+        print("Keine Bibliothek fuer '{}' gefunden".format(city))
+    for name, bib in found:
+        print("{0:25}\t{1:25}\t{2}".format(name, bib.title or "NA",
+                                           bib.search_url or bib.url_up))
 
 
 def search_print(top=10, *args, **kwargs):  # pylint: disable=keyword-arg-before-vararg
@@ -158,26 +919,64 @@ def search_print(top=10, *args, **kwargs):  # pylint: disable=keyword-arg-before
     Simple function to search and output the results in the console.
 
     Tasks:
-        1. start `search_list`
-        2. sort results
-        3. print the first `top` results to the console
+        1. start `search_list` which yields the results as soon as they are available
+        2. keep the `top` best results
+        3. print the results to the console; on a terminal the table is
+           refreshed while the results arrive (at most every `REFRESH_INTERVAL` seconds)
 
     Arguments:
         top (int): _optional_ limitation of the number of results (<1 for unlimited)
         args: passed to `search_list`
         kwargs: passed to `search_list`
     """
-    results = search_list(*args, **kwargs)
-    results = list(filter(None, results)) 
-    results.sort(key=lambda x: x[1], reverse=True)
-    for i, r in enumerate(results):
-        if i >= top > 0:
-            break
-        b = r[0]
-        title = b.title or "NA"
-        ls = b.LastSearch or -128
-        print("{1:2d} {0:25}\t".format(title, r[1]), end='')
-        if len(b.cities) < 5:
-            print(','.join(b.cities))
-        else:
-            print(','.join(b.cities[:5]))
+    best = TopResults(top)
+    size = shutil.get_terminal_size()
+    # the cursor can't move above the screen, so the table must fit on it
+    live = sys.stdout.isatty() and 0 < top <= size.lines - 1
+    shown = 0
+    last_refresh = 0
+    for r in filter(None, search_list(*args, as_completed=True, **kwargs)):
+        if best.add(*r) and live and time.monotonic() - last_refresh >= REFRESH_INTERVAL:
+            shown = _refresh_table(best.results(), shown, size.columns)
+            last_refresh = time.monotonic()
+    if shown:
+        _refresh_table([], shown, size.columns)
+    for r in best.results():
+        print(format_result(*r))
+
+
+def _refresh_table(results, shown, columns=80):
+    """
+    Replaces the `shown` lines printed before on the terminal with the results.
+    The lines are cut to the width of the terminal, so every result takes one line.
+
+    Arguments:
+        results (list): tuples of the library and the return value from the search
+        shown (int): number of lines printed before
+        columns (int): _optional_ width of the terminal
+
+    Returns:
+        int: number of printed lines
+    """
+    if shown:
+        # move the cursor up to the first line and clear the rest of the screen
+        sys.stdout.write("\x1b[{}F\x1b[J".format(shown))
+    for r in results:
+        sys.stdout.write(format_result(*r).expandtabs()[:max(columns - 1, 1)] + "\n")
+    sys.stdout.flush()
+    return len(results)
+
+
+def search_batch_print(top=10, *args, **kwargs):  # pylint: disable=keyword-arg-before-vararg
+    """
+    Searches several keywords with `search_batch` and
+    prints the first `top` results of each keyword to the console.
+
+    Arguments:
+        top (int): _optional_ limitation of the number of results per keyword (<1 for unlimited)
+        args: passed to `search_batch`
+        kwargs: passed to `search_batch`
+    """
+    for search, results in search_batch(*args, **kwargs).items():
+        print("== {} ==".format(search))
+        print_results(results, top)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Contains the binary snapshot of the catalog (`PyLeihe.bibindex.PyLeiheNet`),
+a compact alternative to the JSON file which loads without a JSON parser.
+
+Layout (little endian):
+
+* header: magic `PYLS`, version, flags, number of strings, states, libraries,
+  cities and city index entries, size of the string table in bytes
+* string table: every string (url, title, city, ...) once as UTF-8,
+  separated by `NUL`, a string is referenced by its position
+* states: `int32` id, `uint32` name, `uint32` first library, `uint32` number of libraries
+* libraries: `uint32` url, title, search url (`NONE` for missing),
+  first city and number of cities
+* cities: `uint32` string per member town
+* city index: `uint32` normalized name, library, city
+  (the sorted `PyLeihe.cityindex.CityIndex`, so it is not built again on load)
+
+The file is mapped with `mmap` and the records are unpacked with `struct`
+directly from the mapping (without copying the sections first). The gain is
+the load time without JSON parser; the loaded catalog consists of the same
+Python objects as one loaded from JSON and needs about as much memory.
+"""
+import contextlib
+import gc
+import mmap
+import os
+import struct
+from .cityindex import CityIndex
+
+MAGIC = b"PYLS"
+VERSION = 1
+# string reference of a missing value (`None`)
+NONE = 0xFFFFFFFF
+HEADER = struct.Struct("<4sHHIIIIII")
+STATE = struct.Struct("<iIII")
+BIB = struct.Struct("<IIIII")
+CITY = struct.Struct("<I")
+ENTRY = struct.Struct("<III")
+
+
+class SnapshotError(ValueError):
+    """
+    The file is no snapshot or was written by another version.
+    """
+
+
+def snapshotPath(jsonfile=""):
+    """
+    Returns the path of the snapshot for the JSON catalog `jsonfile`
+    (without the extension `.json`, see `PyLeihe.basic.PyLeiheWeb.toJSONFile`).
+    """
+    return "{}.snapshot".format(jsonfile or "PyLeiheNet")
+
+
+def isCurrent(jsonfile=""):
+    """
+    Returns whether a snapshot exists which is not older than the JSON catalog.
+    """
+    try:
+        snapshot = os.path.getmtime(snapshotPath(jsonfile))
+    except OSError:
+        return False
+    try:
+        return snapshot >= os.path.getmtime("{}.json".format(jsonfile or "PyLeiheNet"))
+    except OSError:
+        return True
+
+
+class _Strings:
+    """
+    String table of a snapshot while writing.
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def add(self, value):
+        if value is None:
+            return NONE
+        position = self.index.get(value)
+        if position is None:
+            if "\0" in value:
+                raise ValueError("NUL in string: {!r}".format(value))
+            position = self.index[value] = len(self.values)
+            self.values.append(value)
+        return position
+
+
+@contextlib.contextmanager
+def pausedGC():
+    """
+    Disables the cyclic garbage collector while the catalog is built:
+    the many new objects without cycles would trigger it again and again.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def writeSnapshot(pln, path):
+    """
+    Writes the catalog to a snapshot file (replaced atomically).
+
+    Arguments:
+        pln (PyLeihe.bibindex.PyLeiheNet): the catalog
+        path (str): path of the snapshot, see `snapshotPath`
+
+    Raises:
+        ValueError: if a string contains `NUL`
+    """
+    strings = _Strings()
+    states = []
+    records = []
+    cities = []
+    bibs = []
+    for land in pln.Laender:
+        states.append(STATE.pack(land.lid, strings.add(land.name), len(records),
+                                 len(land.Bibliotheken)))
+        for bib in land.Bibliotheken:
+            records.append(BIB.pack(strings.add(bib.url_up), strings.add(bib.title),
+                                    strings.add(bib.search_url), len(cities), len(bib.cities)))
+            cities.extend(CITY.pack(strings.add(city)) for city in bib.cities)
+            bibs.append(bib)
+    entries = [ENTRY.pack(strings.add(key), i, strings.add(city))
+               for key, i, city in CityIndex(bibs).entries()]
+    blob = "\0".join(strings.values).encode("utf-8")
+    tmp = "{}.tmp".format(path)
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(strings.values), len(states), len(records),
+                            len(cities), len(entries), len(blob)))
+        f.write(blob)
+        for section in (states, records, cities, entries):
+            f.write(b"".join(section))
+    os.replace(tmp, path)
+
+
+def readSnapshot(path):
+    """
+    Reads the catalog from a snapshot file.
+
+    Arguments:
+        path (str): path of the snapshot, see `snapshotPath`
+
+    Returns:
+        tuple with a list with a tuple (id, name, libraries) per state and the
+        entries of the city index (see `PyLeihe.cityindex.CityIndex.entries`),
+        the libraries are tuples (url, title, search url, list of cities),
+        see `PyLeihe.bibindex.PyLeiheNet.loadFromSnapshot`
+
+    Raises:
+        SnapshotError: if the file is no snapshot of this version
+        OSError: if the file can't be read
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise SnapshotError("snapshot too short: {}".format(path))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            try:
+                magic, version, _flags, n_strings, n_states, n_bibs, n_cities, n_entries, \
+                    size = HEADER.unpack_from(view)
+                if magic != MAGIC or version != VERSION:
+                    raise SnapshotError("no snapshot of version {}: {}".format(VERSION, path))
+                offset = HEADER.size + size
+                if offset > len(view):
+                    raise SnapshotError("snapshot truncated: {}".format(path))
+                strings = str(view[HEADER.size:offset], "utf-8").split("\0") \
+                    if n_strings else []
+                sections = []
+                for record, count in ((STATE, n_states), (BIB, n_bibs), (CITY, n_cities),
+                                      (ENTRY, n_entries)):
+                    end = offset + record.size * count
+                    if end > len(view):
+                        raise SnapshotError("snapshot truncated: {}".format(path))
+                    sections.append(list(record.iter_unpack(view[offset:end])))
+                    offset = end
+            except UnicodeDecodeError as exc:
+                raise SnapshotError("broken snapshot {}: {}".format(path, exc)) from None
+    if len(strings) != n_strings:
+        raise SnapshotError("broken string table: {}".format(path))
+    states, records, city_refs, entries = sections
+    try:
+        cities = [strings[i] for i, in city_refs]
+
+        def get(index):
+            return None if index == NONE else strings[index]
+        bibs = [(strings[url], get(title), get(search_url), cities[first:first + count])
+                for url, title, search_url, first, count in records]
+        index = [(strings[key], i, strings[city]) for key, i, city in entries]
+        return ([(lid, strings[name], bibs[first:first + count])
+                 for lid, name, first, count in states], index)
+    except IndexError:
+        raise SnapshotError("broken references in snapshot: {}".format(path)) from None
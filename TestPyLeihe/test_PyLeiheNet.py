@@ -2,12 +2,33 @@
 Testfunctins for  `PyLeiheNet` from `bibindex.py`
 """
 # pylint: disable=unused-import
+import threading
 from unittest import mock
 import pytest
 import _paths  # pylint: disable=unused-import
 from PyLeihe.bibindex import PyLeiheNet
 
 
+def test_loadsearchURLs():
+    """
+    Test for `PyLeiheNet.loadsearchURLs` over all states.
+    """
+    lands = [mock.Mock(), mock.Mock()]
+    bibs = [mock.Mock(), mock.Mock(), mock.Mock()]
+    lands[0].pendingSearchURLs.return_value = bibs[:2]
+    lands[1].pendingSearchURLs.return_value = bibs[2:]
+    pln = PyLeiheNet()
+    pln.Laender = lands
+    progress = mock.Mock()
+    pln.loadsearchURLs(newtitle=True, threads=2, progress=progress)
+    for bib in bibs:
+        bib.grepSearchURL.assert_called_once_with()
+    assert progress.call_count == 3
+    for land in lands:
+        land.pendingSearchURLs.assert_called_once_with(False)
+        land.updateTitles.assert_called_once_with(True)
+
+
 @mock.patch('PyLeihe.bibindex.PyLeiheNet.getBundesLaender')
 def test_loadallBundesLaender(mock_get):
     """
@@ -34,6 +55,35 @@ def test_loadallBundesLaender(mock_get):
     mock_get.assert_not_called()
 
 
+def test_loadallBundesLaender_concurrent(caplog):
+    """
+    Checks that `PyLeiheNet.loadallBundesLaender` loads the states at the same time
+    and continues after a failed state.
+    """
+    barrier = threading.Barrier(3, timeout=5)
+    lands = [mock.Mock(lid=i) for i in range(3)]
+    for i, land in enumerate(lands):
+        land.name = "L{}".format(i)
+        land.loadBibURLs.side_effect = barrier.wait
+
+    def fail():
+        barrier.wait()
+        raise ValueError("broken page")
+    lands[1].loadBibURLs.side_effect = fail
+    pln = PyLeiheNet()
+    pln.Laender = lands
+    pln.Cities = mock.Mock()
+    pln.loadallBundesLaender(groupbytitle=True, threads=3)
+    assert set(pln.LoadTimes) == {"L0", "L1", "L2"}
+    assert list(pln.LoadErrors) == ["L1"]
+    assert isinstance(pln.LoadErrors["L1"], ValueError)
+    assert "'L1' could not be loaded: broken page" in caplog.text
+    lands[0].groupbytitle.assert_called_once_with()
+    lands[1].groupbytitle.assert_not_called()
+    lands[2].groupbytitle.assert_called_once_with()
+    assert pln.Cities is None
+
+
 def test_get():
     """
     Test for get acces of `PyLeiheNet`
@@ -48,6 +98,24 @@ def test_get():
     assert pln[0] is None
     assert pln[1] == ml1
     assert pln["l2"] == ml2
+    pln.Laender.remove(ml1)
+    assert pln[1] is None
+    pln.Laender.append(ml1)
+    assert pln["L1"] == ml1
+
+
+def test_getBibsByHost():
+    """
+    Test the lookup of the libraries by the host in all `LocalGroup` instances.
+    """
+    pln = PyLeiheNet()
+    l1 = mock.Mock()
+    l1.getBibsByHost.return_value = ["a"]
+    l2 = mock.Mock()
+    l2.getBibsByHost.return_value = ["b", "c"]
+    pln.Laender = [l1, l2]
+    assert pln.getBibsByHost("host") == ["a", "b", "c"]
+    l1.getBibsByHost.assert_called_once_with("host")
 
 
 def test_getBib():
@@ -94,6 +162,7 @@ def test_getBundesLaender(mock_getURL, mock_simpleGET):
     """
     pln = PyLeiheNet()
     pln.getBundesLaender()
+    assert all(l.Session is pln.Session for l in pln.Laender), "session should be shared"
     mock_getURL.assert_called_once_with(pln.URL_Deutschland)
     mock_simpleGET.assert_called_once_with(mock_getURL.return_value)
     ids = [l.lid for l in pln.Laender]  # pylint: disable=no-member
@@ -0,0 +1,196 @@
+"""
+Testfunctions for `AdaptiveLimiter` from `adaptive.py`
+"""
+# pylint: disable=protected-access
+import random
+import threading
+import time
+from unittest import mock
+import pytest
+import requests
+import _paths  # pylint: disable=unused-import
+from PyLeihe.adaptive import AdaptiveLimiter, isPushback
+from PyLeihe.simple_functions import search_bibs
+from PyLeihe.cache import SearchCache
+
+
+def http_error(status):
+    """
+    Creates a `requests.HTTPError` with the status code.
+    """
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError("{} error".format(status), response=response)
+
+
+@pytest.mark.parametrize("status, expected", [(429, True), (500, True), (503, True),
+                                              (404, False), (403, False)])
+def test_isPushback(status, expected):
+    """
+    Checks the detection of the push back status codes.
+    """
+    assert isPushback(http_error(status)) == expected
+    assert not isPushback(ValueError())
+
+
+def test_aimd():
+    """
+    Checks the additive increase and the multiplicative decrease.
+    """
+    limiter = AdaptiveLimiter(initial=4, minimum=1, maximum=6)
+    for _i in range(5):
+        limiter.acquire()
+        limiter.release(0.1)
+    assert limiter.stats()["limit"] == 5, "about +1 per round of `limit` searches"
+    for _i in range(100):
+        limiter.acquire()
+        limiter.release(0.1)
+    assert limiter.stats()["limit"] == 6, "limited by the maximum"
+    assert limiter.peak == 6
+    limiter.acquire()
+    limiter.release(pushback=True)
+    assert limiter.stats()["limit"] == 3
+    limiter.acquire()
+    limiter.release(pushback=True)
+    assert limiter.stats()["limit"] == 3, "one decrease per round"
+    for _i in range(3):
+        limiter.acquire()
+        limiter.release(1.0)
+    assert limiter.stats()["limit"] == 1, "latency above the factor is a push back"
+    assert limiter.decreases == 2
+    limiter.acquire()
+    limiter.release()
+    assert limiter.stats()["limit"] == 1, "without latency no change"
+    assert "AdaptiveLimiter(limit=1" in repr(limiter)
+
+
+def run_latencies(limiter, latency, searches=1000):
+    """
+    Reports `searches` successful searches with the latencies of `latency(limit)`.
+    """
+    for _i in range(searches):
+        limiter.acquire()
+        limiter.release(latency(int(limiter.limit)))
+    return limiter.stats()
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_healthy_varied_latency(seed):
+    """
+    Different latencies of the libraries without push back increase the limit.
+    """
+    rand = random.Random(seed)
+    stats = run_latencies(AdaptiveLimiter(), lambda _limit: rand.uniform(0.3, 1.5))
+    assert stats["limit"] == AdaptiveLimiter.MAXIMUM
+    assert stats["decreases"] == 0
+    stats = run_latencies(AdaptiveLimiter(), lambda _limit: rand.lognormvariate(0, 1))
+    assert stats["average"] > 2 * AdaptiveLimiter.INITIAL
+
+
+def test_rising_latency():
+    """
+    A latency which rises with the concurrency (overloaded servers) limits the concurrency.
+    """
+    rand = random.Random(1)
+    stats = run_latencies(AdaptiveLimiter(),
+                          lambda limit: rand.uniform(0.3, 1.5) * (1 + max(0, limit - 8)))
+    assert stats["decreases"] > 0
+    assert stats["average"] < 12
+
+
+def test_acquire_blocks():
+    """
+    Checks that at most `limit` searches are in flight.
+    """
+    limiter = AdaptiveLimiter(initial=2)
+    limiter.acquire()
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def third():
+        limiter.acquire()
+        acquired.set()
+    thread = threading.Thread(target=third)
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release()
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_wrap():
+    """
+    Checks the retries and the fallback of the wrapped function.
+    """
+    limiter = AdaptiveLimiter(initial=4)
+    func = mock.Mock(side_effect=[http_error(503), "ok"])
+    assert limiter.wrap(func)("item") == "ok"
+    assert limiter.decreases == 1
+    func = mock.Mock(side_effect=http_error(429))
+    assert limiter.wrap(func, fallback=lambda item: (item, -4))("item") == ("item", -4)
+    assert func.call_count == 2
+    with pytest.raises(requests.HTTPError):
+        limiter.wrap(mock.Mock(side_effect=http_error(429)))("item")
+    func = mock.Mock(side_effect=http_error(404))
+    with pytest.raises(requests.HTTPError):
+        limiter.wrap(func, fallback=lambda item: None)("item")
+    assert func.call_count == 1, "no retry without push back"
+    with pytest.raises(KeyError):
+        limiter.wrap(mock.Mock(side_effect=KeyError))("item")
+    assert limiter._inflight == 0
+
+
+def test_search_bibs_adaptive_samples(tmp_path):
+    """
+    Checks that cached results and skipped searches are no latency samples.
+    """
+    cache = SearchCache(str(tmp_path / "cache.sqlite"))
+    cache.set("https://lib.test/search", "word", None, 3)
+
+    def search(_text, _category, cache=None):
+        if cache.get("https://lib.test/search", "word", None) is not None:
+            return 3
+        time.sleep(0.2)
+        return 1
+    cached = [mock.Mock() for _i in range(10)]
+    for bib in cached:
+        bib.search.side_effect = search
+    skipped = mock.Mock()
+    skipped.search.return_value = -7
+    slow = mock.Mock()
+    slow.search.side_effect = lambda _text, _category, cache=None: time.sleep(0.2) or 1
+    limiter = AdaptiveLimiter(initial=1, maximum=8)
+    search_bibs(cached + [skipped, slow], "word", threads=1, adaptive=limiter, cache=cache)
+    cache.close()
+    assert limiter._baseline >= 0.2, "only the search sent to the server is a sample"
+    assert limiter.decreases == 0
+    assert limiter.increases == 1
+
+
+def test_search_bibs_adaptive():
+    """
+    Checks that the concurrency of `search_bibs` shrinks on push back and grows again.
+    """
+    lock = threading.Lock()
+    state = {"inflight": 0, "peak": 0}
+
+    def search(_text, _category):
+        with lock:
+            state["inflight"] += 1
+            state["peak"] = max(state["peak"], state["inflight"])
+            overloaded = state["inflight"] > 3
+        time.sleep(0.005)
+        with lock:
+            state["inflight"] -= 1
+        if overloaded:
+            raise http_error(503)
+        return 1
+    bibs = [mock.Mock() for _i in range(60)]
+    for bib in bibs:
+        bib.search.side_effect = search
+    limiter = AdaptiveLimiter(initial=2, maximum=8)
+    results = search_bibs(bibs, "word", threads=2, adaptive=limiter)
+    assert len(results) == 60
+    assert state["peak"] <= 8
+    assert limiter.decreases >= 1
+    assert limiter.completed >= 60
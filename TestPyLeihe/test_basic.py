@@ -7,7 +7,9 @@ import urllib.parse as up
 from unittest import mock
 import pytest
 import requests
+from bs4 import BeautifulSoup
 import _paths  # pylint: disable=unused-import
+from PyLeihe import basic
 from PyLeihe.basic import PyLeiheWeb
 
 
@@ -101,6 +103,35 @@ def test_searchNodeMultipleContain():
     pass
 
 
+def test_parseHTML():
+    """
+    Checks that `parseHTML` memoizes the parsed document per response.
+    """
+    content = "<div><a href='x.html'>x</a></div>"
+    mp = mock.Mock(content=content)
+    with mock.patch("PyLeihe.htmlparser.BeautifulSoup", wraps=BeautifulSoup) as mock_bs:
+        doc = PyLeiheWeb.parseHTML(mp)
+        assert PyLeiheWeb.parseHTML(mp) is doc, "document should be memoized"
+        assert PyLeiheWeb.parseHTML(doc) is doc, "documents are not parsed again"
+        assert PyLeiheWeb.searchNodeMultipleContain(mp, "a", {}).get("href") == "x.html"
+        assert mock_bs.call_count == 1
+        # changed content of the response
+        mp.content = "<div><a href='y.html'>y</a></div>"
+        assert PyLeiheWeb.searchNodeMultipleContain(mp, "a", {}).get("href") == "y.html"
+        assert mock_bs.call_count == 2
+        # plain text is always parsed
+        PyLeiheWeb.parseHTML(content)
+        assert mock_bs.call_count == 3
+
+
+def test_optionalModule():
+    """
+    Tests the import of optional packages on the first use.
+    """
+    assert basic.optionalModule("json") is json
+    assert basic.optionalModule("PyLeihe_not_installed") is None
+
+
 def test_get_title():
     """
     Checks the behaviour of `_get_title`
@@ -118,10 +149,16 @@ def test_get_title():
                           ])
 def test_loadJSONFile(mock_file, name_in, name_called):
     """
-    Tests `_loadJSONFile()`
+    Tests `_loadJSONFile()` with the json module and with `orjson` (if installed)
     """
-    assert PyLeiheWeb._loadJSONFile(name_in) == {'a': 'data', 'b': 2}
+    with mock.patch("PyLeihe.basic.optionalModule", return_value=None):
+        assert PyLeiheWeb._loadJSONFile(name_in) == {'a': 'data', 'b': 2}
     mock_file.assert_called_once_with(name_called, "r")
+    orjson = pytest.importorskip("orjson")
+    mock_file.reset_mock()
+    with mock.patch("PyLeihe.basic.optionalModule", return_value=orjson):
+        assert PyLeiheWeb._loadJSONFile(name_in) == {'a': 'data', 'b': 2}
+    mock_file.assert_called_once_with(name_called, "rb")
 
 
 @mock.patch("PyLeihe.basic.PyLeiheWeb.reprJSON")
@@ -191,7 +228,7 @@ def test_simpleSession(method_in):
                                                          method=method_in,
                                                          data="data_arg")
     called_func.assert_called_once_with(method_in.upper(), "test.url",
-                                        data="data_arg")
+                                        data="data_arg", timeout=PyLeiheWeb.TIMEOUT)
 
 
 @mock.patch("PyLeihe.basic.up.urlunparse")
@@ -205,14 +242,16 @@ def test_simpleSession_urlunparse(mock_urlunparse):
     # test: url is already string
     plw.simpleSession(url="test.url")
     mock_urlunparse.assert_not_called()
-    plw.Session.request.assert_called_with("POST", "test.url")
+    plw.Session.request.assert_called_with("POST", "test.url", timeout=PyLeiheWeb.TIMEOUT)
     # test: url is no string
     plw.simpleSession(url=up.urlparse("test.url"))
     mock_urlunparse.assert_called_once()
-    plw.Session.request.assert_called_with("POST", mock_urlunparse.return_value)
+    plw.Session.request.assert_called_with("POST", mock_urlunparse.return_value,
+                                           timeout=PyLeiheWeb.TIMEOUT)
 
 
-def test_simpleSession_exception_ClosedConnection(caplog):
+@mock.patch("PyLeihe.retry.time.sleep")
+def test_simpleSession_exception_ClosedConnection(mock_sleep, caplog):
     """
     Checks `simpleSession` with `ClosedConnection` exception
     """
@@ -227,8 +266,9 @@ def test_simpleSession_exception_ClosedConnection(caplog):
     # test
     retrys = 3
     calls = retrys + 1
-    assert plw.simpleSession(url="test.url", retry=retrys) is None
+    assert plw.simpleSession(url="test.url", retry=retrys, idempotent=True) is None
     assert plw.Session.request.call_count == calls
+    assert mock_sleep.call_count == retrys
     assert mock_rfs.call_count == calls
     assert len([x for x in caplog.record_tuples
                 if "Remote end closed connection" in x[2]]) == calls, \
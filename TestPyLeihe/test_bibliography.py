@@ -2,21 +2,38 @@
 Testfunctins for `Bibliography` from `bibliography.py`
 """
 # pylint: disable=protected-access, singleton-comparison
+import asyncio
 from unittest import mock
 import pytest
+from bs4 import BeautifulSoup
 import _paths  # pylint: disable=unused-import
-from PyLeihe.bibliography import Bibliography
+from PyLeihe.bibliography import Bibliography, MediaType, ResultCounter
 
 
-@mock.patch('PyLeihe.bibliography.Bibliography.generateTitle')
-def test_init(mock_generateTitle):
+def test_init():
     """
-    Test initialization
+    Test initialization with the lazy url, title and session
     """
     bib = Bibliography("https://http//www.test.land")
-    mock_generateTitle.assert_called_once()
     assert bib.url_up == "https://www.test.land"
+    assert bib._url is None and bib._title is None and bib._session is None
     assert bib.url.netloc == "www.test.land"
+    assert bib.title == "test"
+    assert bib.Session is bib.Session
+    assert not hasattr(bib, "__dict__") or not bib.__dict__, "attributes are stored in slots"
+
+
+def test_loadFromJSON_title():
+    """
+    Test the stored title of the json representation
+    """
+    data = {"name": "stored", "url": "https://www.test.land", "search_url": "search.url",
+            "cities": ["a"]}
+    bib = Bibliography.loadFromJSON(data)
+    assert bib.title == "stored"
+    assert bib._url is None, "the url is not parsed while loading"
+    del data["name"]
+    assert Bibliography.loadFromJSON(data).title == "test"
 
 
 @mock.patch('PyLeihe.bibliography.Bibliography._generateTitleByUrl')
@@ -211,3 +228,177 @@ def test_grepSearchURL_simplelink(mock_simpleGET, mock_PostFormURL):
     # the mocks should only be called in the first case.
     mock_simpleGET.assert_called_once_with("http://www.onleihe-hn.de")
     mock_PostFormURL.assert_called_once_with(mock_simpleGET.return_value)
+
+
+def run_coroutine(coro):
+    """
+    Runs a coroutine in a new event loop and returns the result.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class FakeAsyncResponse:
+    """
+    Async context manager of `FakeAsyncSession.post` with the page text
+    (or the exception raised on entering).
+    """
+
+    def __init__(self, answer):
+        self.answer = answer
+
+    async def __aenter__(self):
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        """
+        The fake responses are always successful.
+        """
+
+    async def text(self, **_kwargs):
+        """
+        Returns the page text.
+        """
+        return self.answer
+
+
+class FakeAsyncSession:
+    """
+    Minimal replacement for `aiohttp.ClientSession` that answers the posts with
+    the given page texts (or raises the given exceptions) in order.
+    """
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.posts = []
+
+    def post(self, url, data=None):
+        """
+        Returns the next answer as fake response.
+        """
+        self.posts.append((url, data))
+        return FakeAsyncResponse(self.answers.pop(0))
+
+
+def test_asearch():
+    """
+    Test for `Bibliography.asearch` with the fallback to the extended search.
+    """
+    pytest.importorskip("aiohttp")
+    bib = Bibliography("")
+    bib.search_url = "search.url"
+    session = FakeAsyncSession("Suchergebnis : 42 Treffer")
+    assert run_coroutine(bib.asearch("word", session=session)) == 42
+    assert bib.LastSearch == 42
+    assert session.posts[0][1]["cmdId"] == 703
+    assert session.posts[0][1]["pText"] == "word"
+
+    session = FakeAsyncSession("nothing", "Suchergebnis : keine Treffer")
+    assert run_coroutine(bib.asearch("word", MediaType.eBook, session=session)) == 0
+    assert [p[1]["cmdId"] for p in session.posts] == [703, 701]
+    assert session.posts[1][1]["pMediaType"] == MediaType.eBook.value
+
+
+def test_asearch_errors():
+    """
+    Test for the error codes of `Bibliography.asearch`.
+    """
+    aiohttp = pytest.importorskip("aiohttp")
+    bib = Bibliography("")
+    with mock.patch.object(bib, "grepSearchURL") as mock_grep:
+        assert run_coroutine(bib.asearch("word", session=FakeAsyncSession())) == -3
+        mock_grep.assert_called_once_with()
+    bib.search_url = "search.url"
+    session = FakeAsyncSession(aiohttp.ServerDisconnectedError())
+    assert run_coroutine(bib.asearch("word", session=session)) == -4
+
+
+@mock.patch('PyLeihe.bibliography.Bibliography._grepSearchURL_loadData')
+def test_grepSearchURL_parse_once(mock_loadData):
+    """
+    Checks that `grepSearchURL` parses the start page only once for all search methods.
+    """
+    mock_loadData.return_value = mock.Mock(content="<div><p>no links</p></div>",
+                                           url="https://test.url/start.html")
+    bib = Bibliography("")
+    with mock.patch("PyLeihe.htmlparser.BeautifulSoup", wraps=BeautifulSoup) as mock_bs:
+        assert bib.grepSearchURL(lvl=2) is False
+        assert mock_bs.call_count == 1
+
+
+@pytest.mark.parametrize("chunks,expected", [
+    ([b"<html>\n<h2>Suchergebnis : 4", b"2 Treffer</h2>\n", b"<div>"], 42),
+    ([b"<p>Sucherg", b"ebnis : 1.234 Treffer\n", b"x"], 1234),
+    ([b"Suchergebnis : keine Treffer"], 0),
+    ([b"<html>no result", b"count\n"], -1),
+    ([b"Suchergebnis : f\xc3", b"\xbcr x: 7 Treffer"], 7),
+])
+def test_ResultCounter(chunks, expected):
+    """
+    Test for `ResultCounter` with numbers split over chunks.
+    """
+    counter = ResultCounter("utf-8")
+    for chunk in chunks:
+        Treffer = counter.feed(chunk)
+        if Treffer is not None:
+            break
+    else:
+        Treffer = counter.finish()
+    assert Treffer == expected
+
+
+def test_parse_results_stream():
+    """
+    Test for `Bibliography.parse_results_stream` with early exit and size limit.
+    """
+    def chunks():
+        yield b"<html>\n<h2>Suchergebnis : 42 Treffer</h2>\n"
+        raise AssertionError("the page should not be read completely")
+
+    SearchRequest = mock.Mock(encoding=None)
+    SearchRequest.iter_content.return_value = chunks()
+    assert Bibliography.parse_results_stream(SearchRequest) == 42
+    SearchRequest.close.assert_called_once_with()
+
+    SearchRequest = mock.Mock(encoding="ISO-8859-1")
+    SearchRequest.iter_content.return_value = iter([b"x" * 10] * 10)
+    assert Bibliography.parse_results_stream(SearchRequest, max_bytes=30) == -1
+    SearchRequest.close.assert_called_once_with()
+
+
+@mock.patch('PyLeihe.bibliography.Bibliography.parse_results_stream')
+@mock.patch('PyLeihe.bibliography.Bibliography.simpleSession')
+def test_search_stream(mock_simpleSession, mock_parse_results_stream):
+    """
+    Checks that `search(stream=True)` requests a streamed response.
+    """
+    bib = Bibliography("")
+    bib.search_url = "search.url"
+    mock_parse_results_stream.return_value = 5
+    assert bib.search("word", stream=True) == 5
+    _a, k = mock_simpleSession.call_args
+    assert k["stream"] is True
+    assert k["data"]["pPageLimit"] == Bibliography.PAGE_LIMIT_COUNT
+    mock_parse_results_stream.assert_called_once_with(mock_simpleSession.return_value)
+
+
+def test_searchData():
+    """
+    Checks the requested page size for counting and for the full result page.
+    """
+    data = Bibliography._searchData(703, "word", MediaType.eBook)
+    assert data["pPageLimit"] == Bibliography.PAGE_LIMIT_COUNT
+    assert data["pPageLimit"] < Bibliography.PAGE_LIMIT_FULL
+    assert data["pText"] == "word"
+    assert data["pMediaType"] == MediaType.eBook.value
+    data = Bibliography._searchData(701, "word", MediaType.eBook, full_page=True)
+    assert data["pPageLimit"] == Bibliography.PAGE_LIMIT_FULL
+    assert data["cmdId"] == 701
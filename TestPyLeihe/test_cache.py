@@ -0,0 +1,132 @@
+"""
+Testfunctions for `SearchCache` from `cache.py`
+"""
+# pylint: disable=protected-access
+from unittest import mock
+import pytest
+import _paths  # pylint: disable=unused-import
+from PyLeihe.cache import SearchCache, normalizeSearch, normalizeURL, userCacheDir
+from PyLeihe.bibliography import Bibliography, MediaType
+
+URL = "https://www2.onleihe.de/lib/frontend/search,0-0-0-0-0-0-0-0-0-0-0.html"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """
+    Temporary cache database.
+    """
+    c = SearchCache(str(tmp_path / "sub" / "cache.sqlite"))
+    yield c
+    c.close()
+
+
+def test_normalize():
+    """
+    Test for the normalization of the cache keys.
+    """
+    assert normalizeSearch("  Harry   POTTER ") == "harry potter"
+    assert normalizeSearch("Straße") == normalizeSearch("STRASSE")
+    assert normalizeURL("HTTPS://WWW2.onleihe.de/Lib/#top") == "https://www2.onleihe.de/Lib"
+    assert SearchCache.key(URL, "Harry  Potter", MediaType.eBook) == \
+        SearchCache.key(URL.replace("www2", "WWW2"), "harry potter", MediaType.eBook)
+    assert SearchCache.key(URL, "a", MediaType.eBook) != SearchCache.key(URL, "a", MediaType.eAudio)
+    assert "PyLeihe" in userCacheDir()
+
+
+def test_get_set(cache):
+    """
+    Checks storing and loading of results.
+    """
+    assert cache.get(URL, "word", MediaType.eBook) is None
+    cache.set(URL, "word", MediaType.eBook, 42)
+    assert cache.get(URL, " WORD ", MediaType.eBook) == 42
+    assert cache.get(URL, "word", MediaType.eAudio) is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+    assert cache.takeHit() is True
+    assert cache.takeHit() is False
+    cache.get(URL, "word", MediaType.eAudio)
+    assert cache.takeHit() is False
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_ttl(cache):
+    """
+    Checks the lifetime of results with and without hits.
+    """
+    cache.ttl = 100
+    cache.negative_ttl = 10
+    with mock.patch("PyLeihe.cache.time.time", return_value=1000):
+        cache.set(URL, "hits", MediaType.eBook, 42)
+        cache.set(URL, "none", MediaType.eBook, 0)
+        cache.set(URL, "error", MediaType.eBook, -4)
+    with mock.patch("PyLeihe.cache.time.time", return_value=1050):
+        assert cache.get(URL, "hits", MediaType.eBook) == 42
+        assert cache.get(URL, "none", MediaType.eBook) is None
+        assert cache.get(URL, "error", MediaType.eBook) is None
+    with mock.patch("PyLeihe.cache.time.time", return_value=1101):
+        assert cache.get(URL, "hits", MediaType.eBook) is None
+    assert len(cache) == 0, "expired results are removed"
+
+
+def test_evict(cache):
+    """
+    Checks that the least recently used results are removed.
+    """
+    cache.max_entries = 3
+    for i in range(5):
+        with mock.patch("PyLeihe.cache.time.time", return_value=1000 + i):
+            cache.set(URL, "word{}".format(i), MediaType.eBook, i + 1)
+    with mock.patch("PyLeihe.cache.time.time", return_value=1010):
+        assert cache.get(URL, "word0", MediaType.eBook) == 1
+    with mock.patch("PyLeihe.cache.time.time", return_value=1011):
+        cache.evict()
+        assert len(cache) == 3
+        assert cache.get(URL, "word0", MediaType.eBook) == 1
+        assert cache.get(URL, "word1", MediaType.eBook) is None
+        assert cache.get(URL, "word2", MediaType.eBook) is None
+        assert cache.get(URL, "word4", MediaType.eBook) == 5
+
+
+def test_accessed_batch(cache):
+    """
+    Checks that a hit writes nothing and its access time is written with the eviction.
+    """
+    def accessed():
+        return cache._db.execute("SELECT accessed FROM results").fetchone()[0]
+    with mock.patch("PyLeihe.cache.time.time", return_value=1000):
+        cache.set(URL, "word", MediaType.eBook, 1)
+    changes = cache._db.total_changes
+    with mock.patch("PyLeihe.cache.time.time", return_value=1005):
+        assert cache.get(URL, "word", MediaType.eBook) == 1
+    assert cache._db.total_changes == changes
+    assert not cache._db.in_transaction
+    assert accessed() == 1000
+    with mock.patch("PyLeihe.cache.time.time", return_value=1010):
+        cache.evict()
+    assert accessed() == 1005
+    assert cache._accessed == {}
+
+
+@mock.patch('PyLeihe.bibliography.Bibliography._postSearchParse')
+def test_search_with_cache(mock_postSearchParse):
+    """
+    Checks `Bibliography.search` with a cache.
+    """
+    cache = SearchCache(":memory:")
+    bib = Bibliography("")
+    bib.search_url = URL
+    assert bib.search("word", cache=cache, cache_only=True) == -5
+    mock_postSearchParse.return_value = 7
+    assert bib.search("word", cache=cache) == 7
+    assert bib.search("Word", cache=cache) == 7
+    assert bib.search("Word", cache=cache, cache_only=True) == 7
+    assert mock_postSearchParse.call_count == 1
+    mock_postSearchParse.return_value = None
+    assert bib.search("other", cache=cache) == -4
+    assert cache.get(URL, "other", MediaType.alleMedien) == -4
+    bib.search_url = None
+    with mock.patch.object(bib, "grepSearchURL") as mock_grep:
+        assert bib.search("word", cache=cache, cache_only=True) == -5
+        mock_grep.assert_not_called()
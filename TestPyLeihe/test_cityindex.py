@@ -0,0 +1,110 @@
+"""
+Testfunctions for `CityIndex` from `cityindex.py`
+"""
+from unittest import mock
+import pytest
+import _paths  # pylint: disable=unused-import
+from PyLeihe.cityindex import CityIndex, normalizeCity
+from PyLeihe.bibindex import PyLeiheNet
+from PyLeihe.localgroup import LocalGroup
+from PyLeihe.bibliography import Bibliography
+from PyLeihe.simple_functions import city_print
+
+
+@pytest.mark.parametrize("name, expected", [("Münster", "muenster"),
+                                            (" Groß  Köris ", "gross koeris"),
+                                            ("MUENSTER", "muenster"),
+                                            ("Münster", "muenster"),
+                                            (None, "")])
+def test_normalizeCity(name, expected):
+    """
+    Checks the normalization of the city names.
+    """
+    assert normalizeCity(name) == expected
+
+
+def make_bibs():
+    """
+    Creates libraries with member towns.
+    """
+    return [mock.Mock(cities=["Münster", "Münsingen"]),
+            mock.Mock(cities=["Muenster", "Berlin", ""]),
+            mock.Mock(cities=[])]
+
+
+def test_find():
+    """
+    Checks exact and prefix queries.
+    """
+    bibs = make_bibs()
+    index = CityIndex(bibs)
+    assert len(index) == 4
+    assert index.find("MÜNSTER") == [("Münster", bibs[0]), ("Muenster", bibs[1])]
+    assert index.find("Muen") == []
+    assert index.findPrefix("mün") == [("Münsingen", bibs[0]), ("Münster", bibs[0]),
+                                       ("Muenster", bibs[1])]
+    assert index.findPrefix("b") == [("Berlin", bibs[1])]
+    assert index.findPrefix("") == []
+    assert index.findPrefix("x") == []
+    assert "cities=4" in repr(index)
+
+
+def test_PyLeiheNet_findCity():
+    """
+    Checks the city index of the catalog and its rebuild.
+    """
+    bibs = make_bibs()
+    pln = PyLeiheNet()
+    pln.Laender = [LocalGroup(1, "a", bibs=bibs[:1]), LocalGroup(2, "b", bibs=bibs[1:])]
+    assert pln.findCity("berlin") == [("Berlin", bibs[1])]
+    bibs[2].cities.append("Bonn")
+    assert pln.findCity("b", prefix=True) == [("Berlin", bibs[1])], "built once"
+    pln.buildCityIndex()
+    assert pln.findCity("b", prefix=True) == [("Berlin", bibs[1]), ("Bonn", bibs[2])]
+
+
+def test_PyLeiheNet_findCity_changes():
+    """
+    Checks that grouping and new search urls drop the city index of the catalog.
+    """
+    bibs = [Bibliography("https://www.onleihe.de/bib", ["Bonn"]),
+            Bibliography("https://www.onleihe.de/bib/", ["Berlin"])]
+    pln = PyLeiheNet()
+    pln.Laender = [LocalGroup(1, "a", bibs=bibs)]
+    assert pln.findCity("berlin") == [("Berlin", bibs[1])]
+    pln.groupbytitle()
+    assert pln.Laender[0].Bibliotheken == [bibs[0]]
+    assert pln.findCity("berlin") == [("Berlin", bibs[0])]
+    bibs[0].search_url = "https://www.onleihe.de/bib/frontend/search"
+    pln.loadsearchURLs()
+    assert pln.Cities is None
+
+
+def test_PyLeiheNet_findCity_lazy():
+    """
+    Checks that loading the catalog doesn't build the city index before the first query.
+    """
+    pln = PyLeiheNet()
+    pln.Laender = [LocalGroup(1, "a", bibs=[Bibliography("https://www.onleihe.de/a", ["Bonn"]),
+                                            Bibliography("https://www.onleihe.de/b", ["Berlin"])])]
+    loaded = PyLeiheNet.loadFromJSON(pln.reprJSON())
+    assert loaded.Cities is None
+    assert [city for city, _bib in loaded.findCity("berlin")] == ["Berlin"]
+    assert loaded.Cities is not None
+
+
+@mock.patch('PyLeihe.simple_functions.load_net')
+def test_city_print(mock_load_net, capsys):
+    """
+    Checks the output of `city_print`.
+    """
+    bib = mock.Mock(title="bib", search_url="https://search")
+    mock_load_net.return_value.findCity.return_value = [("Berlin", bib)]
+    city_print("Ber*", jsonfile="file")
+    mock_load_net.assert_called_once_with(True, "file")
+    mock_load_net.return_value.findCity.assert_called_once_with("Ber", prefix=True)
+    assert "Berlin" in capsys.readouterr().out
+    mock_load_net.return_value.findCity.return_value = []
+    city_print("Nowhere", use_json=False)
+    mock_load_net.return_value.findCity.assert_called_with("Nowhere", prefix=False)
+    assert "Keine Bibliothek" in capsys.readouterr().out
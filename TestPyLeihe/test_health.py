@@ -0,0 +1,125 @@
+"""
+Testfunctions for `CircuitBreaker` from `health.py`
+"""
+# pylint: disable=protected-access
+import json
+from unittest import mock
+import _paths  # pylint: disable=unused-import
+from PyLeihe.health import CircuitBreaker, healthPath, CLOSED, OPEN, HALF_OPEN
+from PyLeihe.bibliography import Bibliography
+from PyLeihe.simple_functions import search_batch
+
+KEY = "https://www.onleihe.de/bib"
+
+
+def test_healthPath():
+    """
+    Checks the path next to the JSON catalog.
+    """
+    assert healthPath() == "PyLeiheNet.health.json"
+    assert healthPath("data/bibs") == "data/bibs.health.json"
+
+
+def test_trip_and_probe():
+    """
+    Checks the states closed, open and half-open.
+    """
+    with mock.patch('PyLeihe.health.time.time', return_value=1000.0) as clock:
+        health = CircuitBreaker(threshold=2, cooldown=10)
+        assert health.allow(KEY)
+        health.record(KEY, -4)
+        assert health.state(KEY) == CLOSED
+        health.record(KEY, -6)
+        health.record(KEY, None)
+        assert health.state(KEY) == CLOSED, "aborted searches are no failures"
+        health.record(KEY, -4)
+        assert health.state(KEY) == CLOSED, "one failure per library and run"
+        # next run
+        health._failed.clear()
+        health.record(KEY, -3)
+        assert health.state(KEY) == OPEN
+        assert not health.allow(KEY)
+        assert health.stats() == {CLOSED: 0, OPEN: 1, HALF_OPEN: 0, "skipped": 1}
+
+        clock.return_value = 1010.0
+        assert health.state(KEY) == HALF_OPEN
+        assert health.allow(KEY), "one probe after the cool-down"
+        assert not health.allow(KEY), "only one probe at a time"
+        health.record(KEY, -1)
+        assert health.state(KEY) == OPEN
+        assert health._circuits[KEY]["cooldown"] == 20, "failed probe doubles the cool-down"
+
+        clock.return_value = 1030.0
+        assert health.allow(KEY)
+        health.record(KEY, 5)
+        assert health.state(KEY) == CLOSED
+        assert KEY not in health._circuits
+        assert "skipped=2" in repr(health)
+
+
+def test_persistence(tmp_path):
+    """
+    Checks that the state is stored and loaded again.
+    """
+    path = str(tmp_path / "bibs.health.json")
+    health = CircuitBreaker(path, threshold=1)
+    health.record(KEY, -4)
+    health.record("other", -4)
+    health.record("other", 3)
+    health.save()
+    with open(path) as f:
+        assert list(json.load(f)) == [KEY]
+    assert not CircuitBreaker(path).allow(KEY)
+    with open(path, "w") as f:
+        f.write("{broken")
+    assert CircuitBreaker(path).allow(KEY)
+    assert CircuitBreaker(str(tmp_path / "missing.json")).allow(KEY)
+
+
+def test_search_health():
+    """
+    Checks that `Bibliography.search` skips a library with an open circuit.
+    """
+    bib = Bibliography(KEY)
+    bib.search_url = KEY + "/search"
+    health = CircuitBreaker(threshold=1)
+    with mock.patch.object(Bibliography, "_postSearchParse", return_value=None) as parse:
+        assert bib.search("word", health=health) == -4
+        assert bib.search("word", health=health) == -7
+        assert parse.call_count == 1
+    assert health.state(KEY) == OPEN
+
+
+@mock.patch('PyLeihe.simple_functions.load_bibs')
+def test_search_batch_health(mock_load_bibs):
+    """
+    Checks that `search_batch` does not resolve the search url of libraries
+    with an open circuit and records libraries without search url.
+    """
+    down = mock.Mock(search_url=None, url_up="down")
+    broken = mock.Mock(search_url=None, url_up="broken")
+    broken.grepSearchURL.return_value = False
+    down.search.return_value = -7
+    mock_load_bibs.return_value = [down, broken]
+    health = CircuitBreaker(threshold=1)
+    health.record("down", -4)
+    results = search_batch(["a"], health=health)
+    down.grepSearchURL.assert_not_called()
+    assert results == {"a": [(down, -7), (broken, -3)]}
+    assert health.state("broken") == OPEN
+
+
+@mock.patch('PyLeihe.simple_functions.load_bibs')
+def test_search_batch_health_once(mock_load_bibs):
+    """
+    Checks that a library failing for every keyword of a batch counts one failure.
+    """
+    bib = Bibliography(KEY)
+    bib.search_url = KEY + "/search"
+    mock_load_bibs.return_value = [bib]
+    health = CircuitBreaker(threshold=3)
+    with mock.patch.object(Bibliography, "_postSearchParse", return_value=None):
+        results = search_batch(["a", "b", "c"], health=health)
+    assert [r for _bib, r in results["c"]] == [-4]
+    assert health.state(KEY) == CLOSED
+    assert health._circuits[KEY]["failures"] == 1
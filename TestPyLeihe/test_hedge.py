@@ -0,0 +1,152 @@
+"""
+Testfunctions for `Hedger` from `hedge.py`
+"""
+# pylint: disable=protected-access
+import threading
+import time
+from unittest import mock
+import pytest
+import _paths  # pylint: disable=unused-import
+from PyLeihe.hedge import Hedger
+from PyLeihe.bibliography import Bibliography
+
+URL = "https://www2.onleihe.de/bib/frontend/search,0-0-0-0-0-0-0-0-0-0-0.html"
+
+
+def test_delay():
+    """
+    Checks the default delay and the percentile of the observed latencies.
+    """
+    hedger = Hedger(percentile=0.9)
+    assert hedger.delay("host") == Hedger.DEFAULT_DELAY
+    for latency in range(1, 11):
+        hedger.observe("host", latency / 10)
+    assert hedger.delay("host") == 0.9
+    assert hedger.delay("other") == Hedger.DEFAULT_DELAY
+    for _i in range(10):
+        hedger.observe("fast", 0.001)
+    assert hedger.delay("fast") == Hedger.MIN_DELAY
+    hedger.close()
+
+
+def test_call_fast():
+    """
+    Checks that a fast request is not duplicated.
+    """
+    hedger = Hedger(budget=1)
+    func = mock.Mock(return_value=5)
+    assert hedger.call(URL, func) == 5
+    func.assert_called_once_with()
+    assert hedger.stats() == {"requests": 1, "fired": 0, "won": 0}
+    hedger.close()
+
+
+def test_call_hedge_wins():
+    """
+    Checks that the duplicated request answers for a hanging first request.
+    """
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)
+            return 1
+        return 2
+    hedger = Hedger(budget=1)
+    hedger.DEFAULT_DELAY = 0.01
+    assert hedger.call(URL, func) == 2
+    release.set()
+    assert hedger.stats() == {"requests": 1, "fired": 1, "won": 1}
+    assert "won=1" in repr(hedger)
+    hedger.close()
+
+
+def test_call_hedge_not_queued():
+    """
+    Checks that the duplicated request doesn't wait for a free thread of the first requests.
+    """
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)
+            return 1
+        return 2
+    hedger = Hedger(budget=1, workers=1)
+    hedger.DEFAULT_DELAY = 0.01
+    start = time.monotonic()
+    assert hedger.call(URL, func) == 2
+    assert time.monotonic() - start < 1
+    release.set()
+    hedger.close()
+
+
+def test_call_saturated():
+    """
+    Checks that the first requests queued behind a running loser are cancelled
+    when their hedged request wins.
+    """
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)
+            return 1
+        return 2
+    hedger = Hedger(budget=1, workers=1)
+    hedger.DEFAULT_DELAY = 0.01
+    start = time.monotonic()
+    for _i in range(4):
+        assert hedger.call(URL, func) == 2
+    assert time.monotonic() - start < 1
+    release.set()
+    hedger._executor.shutdown(wait=True)
+    assert len(calls) == 5, "the queued first requests never run"
+    assert hedger.stats() == {"requests": 4, "fired": 4, "won": 4}
+    hedger.close()
+
+
+def test_call_budget_error():
+    """
+    Checks the budget and the fallback to the first request.
+    """
+    hedger = Hedger(budget=0)
+    hedger.DEFAULT_DELAY = 0.01
+    func = mock.Mock(side_effect=KeyError("failed"))
+    with pytest.raises(KeyError):
+        hedger.call(URL, func)
+    assert hedger.stats()["fired"] == 0
+
+    hedger = Hedger(budget=1)
+    hedger.DEFAULT_DELAY = 0.01
+    release = threading.Event()
+
+    def slow_none():
+        release.wait(0.05)
+        return None
+    assert hedger.call(URL, slow_none) is None, "no accepted result"
+    assert hedger.stats() == {"requests": 1, "fired": 1, "won": 0}
+    hedger.close()
+
+
+def test_search_hedger():
+    """
+    Checks that `Bibliography.search` sends its requests through the hedger.
+    """
+    bib = Bibliography(URL)
+    bib.search_url = URL
+    hedger = mock.Mock()
+    hedger.call.side_effect = lambda url, func: func()
+    with mock.patch.object(Bibliography, "_postSearchParse", return_value=3) as parse:
+        assert bib.search("word", hedger=hedger) == 3
+        hedger.call.assert_called_once_with(URL, mock.ANY)
+        assert parse.call_args[0][0] == 703
+        hedger.call.reset_mock()
+        assert bib.search("word", hedger=hedger, savefile=True) == 3
+        hedger.call.assert_not_called()
@@ -0,0 +1,97 @@
+"""
+Testfunctions for the parser backends from `htmlparser.py`
+"""
+import re
+from unittest import mock
+import pytest
+import _paths  # pylint: disable=unused-import
+from PyLeihe import htmlparser
+from PyLeihe.basic import PyLeiheWeb
+
+PAGE = """
+<html><body>
+<table class="contenttable top">
+<tr><td><a href="https://lib1.test" target="_blank">City1</a></td></tr>
+<tr><td><a href="https://lib2.test" target="_blank">City<b>2</b></a></td></tr>
+<tr><td><a href="https://other.test">no target</a></td></tr>
+</table>
+<form method="post" action="first.html"><p>text</p></form>
+<form method="post" action="search.html"><input id="searchtext" disabled></form>
+<a title="Erweiterte Suche" href="extended.html">extended</a>
+<a href="https://www2.onleihe.de/lib/frontend">onleihe</a>
+</body></html>
+"""
+
+
+@pytest.fixture(params=htmlparser.availableParsers())
+def backend(request):
+    """
+    Selects every installed backend and resets the default afterwards.
+    """
+    htmlparser.setParser(request.param)
+    yield request.param
+    htmlparser.setParser()
+
+
+def test_backend_queries(backend):
+    """
+    Checks the queries used by the package with all installed backends.
+    """
+    doc = htmlparser.parse(PAGE)
+    links = doc.find('table', {"class": "contenttable"}).find_all('a', attrs={'target': '_blank'})
+    assert [a['href'] for a in links] == ["https://lib1.test", "https://lib2.test"]
+    assert [a.get_text() for a in links] == ["City1", "City2"]
+    assert doc.find('table', "contenttable") is not None, "string attrs match the css class"
+    assert doc.find("a", {"title": "Erweiterte Suche"}).get("href") == "extended.html"
+    link = doc.find("a", {"href": re.compile(r'.*onleihe[^\/]*\.de.*')})
+    assert link.get("href") == "https://www2.onleihe.de/lib/frontend"
+    assert doc.find("a", {"href": "missing"}) is None
+    assert PyLeiheWeb.getPostFormURL(PAGE, curr_url="https://test/x.html", ContNode="input",
+                                     ContNodeData={"id": "searchtext"}) \
+        == "https://test/search.html", backend
+    assert PyLeiheWeb.getPostFormURL(PAGE) == "first.html"
+
+
+def test_backend_nested(backend):
+    """
+    Checks that a node does not find itself and `find` returns the first match.
+    """
+    doc = htmlparser.parse('<div class="a"><div class="a" id="1"><div class="a" id="2"></div>'
+                           '</div></div>')
+    outer = doc.find("div", "a")
+    assert [d.get("id") for d in outer.find_all("div", "a")] == ["1", "2"], backend
+    assert outer.find("div").get("id") == "1"
+    assert outer.find("div", {"id": "2"}).find("div") is None
+
+
+def test_setParser():
+    """
+    Checks the selection of a backend and the fallback.
+    """
+    assert htmlparser.getParser() == htmlparser.DEFAULT_PARSER
+    with pytest.raises(ValueError):
+        htmlparser.setParser("unknown")
+    with mock.patch("PyLeihe.htmlparser.availableParsers", return_value=["html.parser"]):
+        assert htmlparser.setParser("lxml") == "html.parser"
+    assert htmlparser.setParser(None) == htmlparser.DEFAULT_PARSER
+
+
+def test_parseHTML_backend_change():
+    """
+    The memoized document of a response is only reused with the same backend.
+    """
+    mp = mock.Mock(content=PAGE)
+    doc = PyLeiheWeb.parseHTML(mp)
+    assert PyLeiheWeb.parseHTML(mp) is doc
+    with mock.patch("PyLeihe.htmlparser.getParser", return_value="other"), \
+            mock.patch.dict(htmlparser.PARSERS, {"other": mock.Mock()}):
+        assert PyLeiheWeb.parseHTML(mp) is htmlparser.PARSERS["other"].return_value
+
+
+def test_isDocument_partial_import():
+    """
+    Checks `htmlparser.isDocument` while another thread still imports `bs4.element`.
+    """
+    assert htmlparser.isDocument(htmlparser.parse(PAGE, "html.parser"))
+    with mock.patch.dict("sys.modules", {"bs4.element": mock.Mock(spec=[])}):
+        assert not htmlparser.isDocument(PAGE)
@@ -0,0 +1,105 @@
+"""
+Testfunctions for `HTTPCache` from `httpcache.py` and its use in `PyLeiheWeb.simpleSession`
+"""
+from unittest import mock
+import pytest
+import requests
+import _paths  # pylint: disable=unused-import
+from PyLeihe.httpcache import HTTPCache
+from PyLeihe.basic import PyLeiheWeb
+
+URL = "https://www.onleihe.net/index.php?id=43"
+
+
+def make_response(status=200, content=b"<html>page</html>", headers=None):
+    """
+    Creates a `requests.Response` without network.
+    """
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = content  # pylint: disable=protected-access
+    resp.headers.update(headers or {})
+    resp.url = URL
+    resp.encoding = "utf-8"
+    return resp
+
+
+@pytest.fixture
+def http_cache(tmp_path):
+    """
+    Temporary `HTTPCache`.
+    """
+    return HTTPCache(str(tmp_path))
+
+
+def test_store_load(http_cache):
+    """
+    Checks storing and building the response from the cache.
+    """
+    assert http_cache.conditionalHeaders(URL) == {}
+    assert not http_cache.store(URL, make_response()), "no validator, no caching"
+    assert http_cache.store(URL, make_response(headers={"ETag": '"v1"',
+                                                        "Last-Modified": "Mon, 1 Jan 2024"}))
+    assert http_cache.conditionalHeaders(URL) == {"If-None-Match": '"v1"',
+                                                  "If-Modified-Since": "Mon, 1 Jan 2024"}
+    cached = http_cache.load(URL, make_response(304, b"", {"Date": "today"}))
+    assert cached.status_code == 200
+    assert cached.content == b"<html>page</html>"
+    assert cached.text == "<html>page</html>"
+    assert cached.headers["ETag"] == '"v1"'
+    assert cached.headers["Date"] == "today"
+    assert http_cache.load("https://other.url", make_response(304)) is None
+
+
+def test_hitRate(http_cache):
+    """
+    Checks the statistic of the cache.
+    """
+    assert http_cache.hitRate() == 0
+    http_cache.count(hit=True)
+    http_cache.count(hit=True)
+    http_cache.count(hit=True)
+    http_cache.count(hit=False)
+    assert http_cache.stats() == {"hits": 3, "misses": 1, "hit_rate": 0.75}
+    assert "75%" in repr(http_cache)
+
+
+def test_simpleSession_with_cache(http_cache):
+    """
+    Checks the conditional requests of `simpleSession`.
+    """
+    plw = PyLeiheWeb()
+    plw.ResponseCache = http_cache
+    plw.Session = mock.Mock(name="requests.Session")
+    # first download
+    plw.Session.request.return_value = make_response(headers={"ETag": '"v1"'})
+    assert plw.simpleGET(URL).content == b"<html>page</html>"
+    plw.Session.request.assert_called_once_with("GET", URL, headers={}, timeout=PyLeiheWeb.TIMEOUT)
+    # revalidation
+    plw.Session.request.return_value = make_response(304, b"")
+    mp = plw.simpleGET(URL)
+    assert mp.content == b"<html>page</html>"
+    assert mp.from_cache
+    plw.Session.request.assert_called_with("GET", URL, headers={"If-None-Match": '"v1"'},
+                                           timeout=PyLeiheWeb.TIMEOUT)
+    # per call switch and POST requests without cache
+    plw.Session.request.return_value = make_response()
+    plw.simpleGET(URL, cache=False)
+    plw.Session.request.assert_called_with("GET", URL, timeout=PyLeiheWeb.TIMEOUT)
+    plw.simpleSession(URL, data="x")
+    plw.Session.request.assert_called_with("POST", URL, data="x", timeout=PyLeiheWeb.TIMEOUT)
+    assert http_cache.stats()["hits"] == 1
+    assert http_cache.stats()["misses"] == 1
+
+
+def test_simpleSession_cache_lost(http_cache):
+    """
+    A `304` without cached page loads the page again without conditions.
+    """
+    plw = PyLeiheWeb()
+    plw.ResponseCache = http_cache
+    plw.Session = mock.Mock(name="requests.Session")
+    plw.Session.request.side_effect = [make_response(304, b""), make_response()]
+    assert plw.simpleGET(URL, headers={"If-None-Match": '"old"'}).status_code == 200
+    assert plw.Session.request.call_args_list[1] == mock.call("GET", URL, headers={},
+                                                              timeout=PyLeiheWeb.TIMEOUT)
@@ -0,0 +1,69 @@
+"""
+Testfunctions for `IndexedList` from `indexedlist.py`
+"""
+from unittest import mock
+import pytest
+import _paths  # pylint: disable=unused-import
+from PyLeihe.indexedlist import IndexedList, searchHost
+
+
+def test_lookup():
+    """
+    Checks the lookups, the first element per key and the elements without key.
+    """
+    items = IndexedList(["Ab", "ab", "cd", ""], keys={"lower": lambda s: s.lower() or None})
+    assert items.lookup("lower", "ab") == "Ab"
+    assert items.lookup("lower", "xy") is None
+    assert items.lookup("lower", "xy", "default") == "default"
+    assert items.lookupAll("lower", "ab") == ["Ab", "ab"]
+    assert items.lookupAll("lower", "") == []
+    assert items == ["Ab", "ab", "cd", ""], "still a list"
+    with pytest.raises(KeyError):
+        items.lookup("missing", "ab")
+
+
+def test_index_built_once():
+    """
+    Checks that the index is built once for many lookups on a large list.
+    """
+    key = mock.Mock(side_effect=lambda i: i)
+    items = IndexedList(range(20000), keys={"id": key})
+    for i in range(0, 20000, 7):
+        assert items.lookup("id", i) == i
+    assert key.call_count == 20000
+    items.invalidate()
+    assert items.lookup("id", 5) == 5
+    assert key.call_count == 40000
+
+
+@pytest.mark.parametrize("change", [
+    lambda l: l.append("x"),
+    lambda l: l.extend(["x"]),
+    lambda l: l.insert(0, "x"),
+    lambda l: l.remove("a"),
+    lambda l: l.pop(),
+    lambda l: l.clear(),
+    lambda l: l.sort(),
+    lambda l: l.reverse(),
+    lambda l: l.__setitem__(0, "x"),
+    lambda l: l.__delitem__(0),
+    lambda l: l.__iadd__(["x"]),
+    lambda l: l.__imul__(2)])
+def test_invalidation(change):
+    """
+    Checks that every change of the list drops the indexes.
+    """
+    items = IndexedList(["a", "b"], keys={"id": lambda s: s})
+    items.lookup("id", "a")
+    change(items)
+    assert items.lookup("id", "x") == ("x" if "x" in items else None)
+    assert items.lookup("id", "a") == ("a" if "a" in items else None)
+
+
+def test_searchHost():
+    """
+    Checks the host of the search url.
+    """
+    assert searchHost(mock.Mock(search_url="https://WWW2.onleihe.de/bib/frontend")) \
+        == "www2.onleihe.de"
+    assert searchHost(mock.Mock(search_url=None)) is None
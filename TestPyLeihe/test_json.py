@@ -96,7 +96,7 @@ def test_PyLeiheNet_from_json(mock_loadJSONFile, mock_LocalGrouploadFromJSON):
         assert len(mock_LocalGrouploadFromJSON.call_args_list) == len(j)
         for call_data in j.values():
             count = len([x for x in mock_LocalGrouploadFromJSON.call_args_list
-                         if x == mock.call(call_data)])
+                         if x == mock.call(call_data, sess=pln.Session)])
             assert count == 1, "every dict value should be exactly one time the call parameter"
         # check the end result
         assert len(pln.Laender) == len(j)
@@ -4,10 +4,12 @@ Testfunctins for `LocalGroup` from `bibindex.py`
 from collections import namedtuple
 import logging
 import json
+import threading
 from unittest import mock
 import pytest
 import _paths  # pylint: disable=unused-import
-from PyLeihe.localgroup import LocalGroup
+from PyLeihe.localgroup import LocalGroup, discoverSearchURLs
+from PyLeihe.bibliography import Bibliography
 
 
 def test_getitem():
@@ -29,12 +31,51 @@ def test_getitem():
     assert land["B1"] == B1
     assert land["B3"] == B3
     assert land["B5"] is None
+    # check the index after changes of the list and of the elements
+    land.Bibliotheken.remove(B1)
+    assert land["B1"] is None
+    B2.title = "New"
+    assert land["new"] is None
+    land.fix_searchurl("B3", "https://www2.onleihe.de/b3/frontend/search")
+    assert land["new"] == B2
+    land.Bibliotheken = [B3]
+    assert land["b2"] is None
 
 
+def test_getBibsByHost():
+    """
+    Checks the lookup of the libraries by the host of their search url.
+    """
+    bibs = [mock.Mock(title="A", search_url="https://www2.onleihe.de/a/frontend"),
+            mock.Mock(title="B", search_url=None),
+            mock.Mock(title="C", search_url="https://www2.onleihe.de/c/frontend")]
+    land = LocalGroup(0, "", bibs=bibs)
+    assert land.getBibsByHost("WWW2.onleihe.de") == [bibs[0], bibs[2]]
+    assert land.getBibsByHost("other") == []
+    bibs[1].search_url = "https://www2.onleihe.de/b/frontend"
+    land.loadsearchURLs()
+    assert land.getBibsByHost("www2.onleihe.de") == bibs
+
+
+def test_getBibsByHost_search():
+    """
+    Checks that a search url found by a search updates the host index.
+    """
+    bib = Bibliography("https://www.bib.de")
+    land = LocalGroup(0, "", bibs=[bib])
+    assert land.getBibsByHost("www2.onleihe.de") == []
+
+    def grep():
+        bib.search_url = "https://www2.onleihe.de/bib/frontend/search"
+    with mock.patch.object(Bibliography, "grepSearchURL", side_effect=grep), \
+            mock.patch.object(Bibliography, "_hedgedSearchParse", return_value=3):
+        assert bib.search("word") == 3
+    assert land.getBibsByHost("www2.onleihe.de") == [bib]
+
 @mock.patch("PyLeihe.localgroup.Bibliography")
-@mock.patch("PyLeihe.localgroup.BeautifulSoup")
+@mock.patch("PyLeihe.localgroup.LocalGroup.parseHTML")
 @mock.patch("PyLeihe.basic.PyLeiheWeb.simpleGET")
-def test_loadBibURLs(mock_simpleGET, mock_BeautifulSoup, mock_Bibliography):
+def test_loadBibURLs(mock_simpleGET, mock_parseHTML, mock_Bibliography):
     """
     UnitTest for `LocalGroup.loadBibURLs`
     """
@@ -48,31 +89,32 @@ def test_loadBibURLs(mock_simpleGET, mock_BeautifulSoup, mock_Bibliography):
         m.__getitem__.side_effect = d.__getitem__
         m.get_text.return_value = m.text
     # setup additional mocks
-    soup = mock_BeautifulSoup.return_value
+    soup = mock_parseHTML.return_value
     soup.find.return_value.find_all.return_value = links
     mock_Bibliography.return_value = 1
     # run method under test
     land.loadBibURLs()
     # evaluate calls
     mock_simpleGET.assert_called_once()
-    mock_BeautifulSoup.assert_called_once_with(mock_simpleGET.return_value.content,
-                                               features="html.parser")
+    mock_parseHTML.assert_called_once_with(mock_simpleGET.return_value)
     assert mock_Bibliography.call_count == 2
-    assert mock_Bibliography.call_args_list[0] == mock.call("m1.test", ["m1.city1", "m1.city2"])
-    assert mock_Bibliography.call_args_list[1] == mock.call("m2.test", ["m2.city1"])
+    assert mock_Bibliography.call_args_list[0] == mock.call("m1.test", ["m1.city1", "m1.city2"],
+                                                            session=land.Session)
+    assert mock_Bibliography.call_args_list[1] == mock.call("m2.test", ["m2.city1"],
+                                                            session=land.Session)
     assert len(land.Bibliotheken) == 2
 
 
-@mock.patch("PyLeihe.localgroup.BeautifulSoup")
+@mock.patch("PyLeihe.localgroup.LocalGroup.parseHTML")
 @mock.patch("PyLeihe.basic.PyLeiheWeb.simpleGET")
-def test_loadBibURLs_exception(mock_simpleGET, mock_BeautifulSoup):
+def test_loadBibURLs_exception(mock_simpleGET, mock_parseHTML):
     """
     Checks if Exception during loadBibURLs is reraised
     """
     # setup
     land = LocalGroup(73, "TestLand")
     # setup additional mocks
-    soup = mock_BeautifulSoup.return_value
+    soup = mock_parseHTML.return_value
     soup.find.return_value.find_all.return_value = ["abc"]
     # test
     with pytest.raises(Exception) as excinfo:
@@ -103,6 +145,34 @@ def test_loadsearchURLs():
     assert B2.generateTitle.call_count == 1
 
 
+def test_discoverSearchURLs():
+    """
+    Test for `discoverSearchURLs` with one and more threads.
+    """
+    barrier = threading.Barrier(3, timeout=5)
+
+    def grep(found):
+        def run():
+            barrier.wait()
+            return found
+        return run
+    bibs = [mock.Mock(grepSearchURL=grep(i % 2 == 0)) for i in range(3)]
+    progress = mock.Mock()
+    # all three libraries wait for each other, so they run at the same time
+    assert discoverSearchURLs(bibs, threads=4, progress=progress) == [True, False, True]
+    assert progress.call_args_list == [mock.call(1, 3), mock.call(2, 3), mock.call(3, 3)]
+
+    bibs = [mock.Mock(), mock.Mock()]
+    bibs[0].grepSearchURL.side_effect = ValueError("broken")
+    with pytest.raises(ValueError):
+        discoverSearchURLs(bibs, threads=2)
+    bibs[1].grepSearchURL.assert_called_once_with()
+    bibs[0].grepSearchURL.side_effect = None
+    assert discoverSearchURLs(bibs) == [bibs[0].grepSearchURL.return_value,
+                                        bibs[1].grepSearchURL.return_value]
+    assert discoverSearchURLs([], threads=4) == []
+
+
 def test_fix_searchurl():
     """
     Test for `LocalGroup.fix_searchurl`
@@ -127,7 +197,8 @@ def test_from_url(caplog):
                BLU("https://www.onleihe.net/index.php?id=35#mecklenburgvorpommern",
                    35, "mecklenburgvorpommern")]
     for x in to_test:
-        BL = LocalGroup.from_url(x.url)
+        BL = LocalGroup.from_url(x.url, sess=x)
+        assert BL.Session is x, "the session should be passed"
         assert BL.lid == x.id
         assert BL.name.lower() == x.name
 
@@ -1,12 +1,38 @@
 """
 Tests to check the command line interface from the module
 """
-# pylint: disable=wrong-import-position,wildcard-import
+# pylint: disable=wrong-import-position,wildcard-import,protected-access
+import argparse
+import os
+import subprocess  # nosec
+import sys
 from unittest import mock
+import pytest
 import _paths  # pylint: disable=unused-import
+import PyLeihe
 from PyLeihe import __main__ as pylmain
 
 
+def test_startup_imports():
+    """
+    Checks that the command line interface starts without the deferred packages
+    (see `benchmarks/bench_import.py`) and that the package exports are loaded lazily.
+    """
+    code = ("import sys, PyLeihe\n"
+            "assert 'PyLeihe.bibindex' not in sys.modules\n"
+            "assert PyLeihe.MediaType.alleMedien and 'PyLeiheNet' in dir(PyLeihe)\n"
+            "from PyLeihe import __main__\n"
+            "__main__.parseargs(['-s', 'word'])\n"
+            "print(' '.join(m for m in ('requests', 'bs4', 'aiohttp', 'asyncio',"
+            " 'multiprocessing.dummy') if m in sys.modules))")
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, check=True,  # nosec
+                         stdout=subprocess.PIPE, universal_newlines=True).stdout
+    assert out.split() == []
+    with pytest.raises(AttributeError):
+        getattr(PyLeihe, "no_attribute")
+
+
 def test_checkmaincall():
     """
     Checks if the main() function is called if the module is called from command line.
@@ -42,13 +68,16 @@ def test_main_makejson(mock_makejson, mock_search_print, mock_dev_make):
     and the command to load the data.
     """
     pylmain.main(["--makejson"])
-    mock_makejson.assert_called_once_with(False, "")
+    mock_makejson.assert_called_once_with(False, "", threads=4)
     mock_search_print.assert_not_called()
     mock_dev_make.assert_not_called()
 
     mock_makejson.reset_mock()
-    pylmain.main(["--makejson", '--loadonline', "-j", "./path/to/file"])
-    mock_makejson.assert_called_once_with(True, "./path/to/file")
+    pylmain.main(["--makejson", '--loadonline', "-j", "./path/to/file", "--threads", "16"])
+    mock_makejson.assert_called_once_with(True, "./path/to/file", threads=16)
+
+    mock_makejson.return_value = None
+    assert pylmain.main(["--makejson", '--loadonline']) == 1
 
 
 @mock.patch('PyLeihe.__main__.dev_make')
@@ -74,6 +103,135 @@ def test_main_search(mock_makejson, mock_search_print, mock_dev_make):
     mock_makejson.assert_not_called()
     mock_dev_make.assert_not_called()
     assert mock_search_print.call_count == 2
+    assert k['cache'] is None, "no cache by default"
+
+
+@mock.patch('PyLeihe.__main__.SearchCache')
+@mock.patch('PyLeihe.__main__.search_print')
+def test_main_search_cache(mock_search_print, mock_SearchCache):
+    """
+    Checks the cache options of the search.
+    """
+    pylmain.main(["-s", "word", "--cache-only", "--cache-file", "c.sqlite", "--cache-ttl", "60"])
+    mock_SearchCache.assert_called_once_with("c.sqlite", ttl=60,
+                                             negative_ttl=mock_SearchCache.NEGATIVE_TTL)
+    _a, k = mock_search_print.call_args
+    assert k['cache'] == mock_SearchCache.return_value
+    assert k['cache_only'] is True
+    mock_SearchCache.return_value.close.assert_called_once_with()
+
+
+@mock.patch('PyLeihe.__main__.search_print')
+def test_main_search_adaptive(mock_search_print, capsys, caplog):
+    """
+    Checks the options of the adaptive concurrency and its report.
+    """
+    pylmain.main(["-s", "word", "--threads", "3", "--adaptive", "--max-threads", "12"])
+    _a, k = mock_search_print.call_args
+    assert k['adaptive'].limit == 3
+    assert k['adaptive'].maximum == 12
+    assert "Parallelitaet: 3" in capsys.readouterr().out
+    pylmain.main(["-s", "word"])
+    _a, k = mock_search_print.call_args
+    assert k['adaptive'] is None
+    capsys.readouterr()
+    pylmain.main(["-s", "word", "--adaptive", "--engine", "async"])
+    _a, k = mock_search_print.call_args
+    assert k['adaptive'] is None
+    assert "Parallelitaet" not in capsys.readouterr().out
+    assert "only available with the engine 'threads'" in caplog.text
+
+
+@mock.patch('PyLeihe.__main__.search_print')
+def test_main_hedge(mock_search_print, capsys, caplog):
+    """
+    Checks the options of the hedged requests and their report.
+    """
+    pylmain.main(["-s", "word", "--hedge", "--hedge-budget", "0.2"])
+    _a, k = mock_search_print.call_args
+    assert k['hedger'].budget == 0.2
+    assert k['hedger'].percentile == pylmain.Hedger.PERCENTILE
+    assert k['hedger']._executor._max_workers == 4, "one thread per search thread"
+    assert "Hedging: 0 von 0 Suchen dupliziert, 0 gewonnen" in capsys.readouterr().out
+    pylmain.main(["-s", "word", "--hedge", "--adaptive", "--max-threads", "40"])
+    _a, k = mock_search_print.call_args
+    assert k['hedger']._executor._max_workers == 40
+    pylmain.main(["-s", "word", "--hedge", "--engine", "async"])
+    _a, k = mock_search_print.call_args
+    assert 'hedger' not in k
+    assert "only available with the engine 'threads'" in caplog.text
+
+
+@mock.patch('PyLeihe.__main__.search_print')
+def test_main_health(mock_search_print, capsys, tmp_path):
+    """
+    Checks the options of the circuit breaker, its report and the stored state.
+    """
+    jsonfile = str(tmp_path / "bibs")
+    pylmain.main(["-s", "word", "-j", jsonfile, "--health", "--health-threshold", "1",
+                  "--health-cooldown", "30m"])
+    _a, k = mock_search_print.call_args
+    health = k['health']
+    assert (health.path, health.threshold, health.cooldown) == \
+        (jsonfile + ".health.json", 1, 1800)
+    assert "Gesundheit: 0 Bibliotheken gesperrt, 0 Suchen uebersprungen" in \
+        capsys.readouterr().out
+    assert (tmp_path / "bibs.health.json").exists()
+    pylmain.main(["-s", "word"])
+    _a, k = mock_search_print.call_args
+    assert 'health' not in k
+
+
+@mock.patch('PyLeihe.__main__.search_print')
+def test_main_state(mock_search_print):
+    """
+    Checks the restriction of the search to one federal state.
+    """
+    pylmain.main(["-s", "word", "--state", "Bayern"])
+    _a, k = mock_search_print.call_args
+    assert k['state'] == "Bayern"
+    pylmain.main(["-s", "word"])
+    _a, k = mock_search_print.call_args
+    assert 'state' not in k
+
+
+@mock.patch('PyLeihe.__main__.search_print')
+@mock.patch('PyLeihe.__main__.city_print')
+def test_main_city(mock_city_print, mock_search_print):
+    """
+    Checks the city lookup.
+    """
+    pylmain.main(["--city", "Berlin", "-j", "file"])
+    mock_city_print.assert_called_once_with("Berlin", use_json=True, jsonfile="file")
+    mock_search_print.assert_not_called()
+
+
+@mock.patch('PyLeihe.__main__.search_print')
+def test_main_retry(mock_search_print):
+    """
+    Checks the options of the retry policy.
+    """
+    try:
+        pylmain.main(["-s", "word", "--retries", "3", "--retry-budget", "50"])
+        policy = pylmain.PyLeiheWeb.Retry
+        assert (policy.retries, policy.budget, policy.host_budget) == (3, 50, None)
+    finally:
+        pylmain.PyLeiheWeb.Retry = pylmain.RetryPolicy()
+
+
+@mock.patch('PyLeihe.__main__.search_batch_print')
+@mock.patch('PyLeihe.__main__.search_print')
+def test_main_search_file(mock_search_print, mock_search_batch_print, tmp_path):
+    """
+    Checks that the keywords of the search file are searched in one batch.
+    """
+    path = tmp_path / "searches.txt"
+    path.write_text("word1\nword2\n", encoding="utf-8")
+    pylmain.main(["--search-file", str(path), "-s", "word0", "-t", "3"])
+    mock_search_print.assert_not_called()
+    _a, k = mock_search_batch_print.call_args
+    assert k['searches'] == ["word0", "word1", "word2"]
+    assert k['top'] == 3
 
 
 @mock.patch('PyLeihe.__main__.dev_make')
@@ -170,3 +328,39 @@ def test_loglevel(mock_basicConfig, mock_RotatingFileHandler, mock_isdir, mock_m
     mock_makedirs.assert_called_once_with(params_isdir[0])
     if len(caplog.record_tuples) == 1:
         caplog.clear()
+
+
+@pytest.mark.parametrize("text, seconds", [("10", 10), ("10s", 10), ("500ms", 0.5),
+                                           ("2m", 120), ("1h", 3600), (" 1.5S ", 1.5)])
+def test_duration(text, seconds):
+    """
+    Checks the conversion of the durations.
+    """
+    assert pylmain.duration(text) == seconds
+
+
+@pytest.mark.parametrize("text", ["abc", "0", "-1s", "s"])
+def test_duration_invalid(text):
+    """
+    Checks the invalid durations.
+    """
+    with pytest.raises(argparse.ArgumentTypeError):
+        pylmain.duration(text)
+
+
+@mock.patch('PyLeihe.__main__.search_print')
+def test_main_deadline(mock_search_print):
+    """
+    Checks the deadline and the timeouts of the search.
+    """
+    timeout = pylmain.PyLeiheWeb.TIMEOUT
+    try:
+        pylmain.main(["-s", "word", "--deadline", "10s", "--read-timeout", "3"])
+        _a, k = mock_search_print.call_args
+        assert k['deadline'] == 10
+        assert pylmain.PyLeiheWeb.TIMEOUT == (timeout[0], 3)
+    finally:
+        pylmain.PyLeiheWeb.TIMEOUT = timeout
+    pylmain.main(["-s", "word"])
+    _a, k = mock_search_print.call_args
+    assert k['deadline'] is None
@@ -0,0 +1,125 @@
+"""
+Testfunctions for `RetryPolicy` from `retry.py` and its use in `PyLeiheWeb.simpleSession`
+"""
+# pylint: disable=protected-access
+from unittest import mock
+import pytest
+import requests
+import _paths  # pylint: disable=unused-import
+from PyLeihe.retry import RetryPolicy, classify
+from PyLeihe.basic import PyLeiheWeb
+from PyLeihe.sessions import SessionPool
+
+
+def http_error(status, headers=None):
+    """
+    Creates a `requests.HTTPError` with the status code.
+    """
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError("{} error".format(status), response=response)
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (requests.ConnectionError("[Errno -2] Name or service not known"), "dns"),
+    (requests.ConnectionError("Remote end closed connection without response"), "closed"),
+    (requests.ConnectTimeout("connect timeout"), "timeout"),
+    (requests.ReadTimeout("read timeout"), "timeout"),
+    (http_error(429), "status"),
+    (http_error(503), "status"),
+    (http_error(404), None),
+    (requests.ConnectionError("UnKnownException"), None),
+])
+def test_classify(exc, expected):
+    """
+    Checks the classification of the request errors.
+    """
+    assert classify(exc) == expected
+
+
+def test_delay():
+    """
+    Checks the exponential backoff with full jitter and `Retry-After`.
+    """
+    policy = RetryPolicy(backoff=1, max_backoff=5)
+    with mock.patch('PyLeihe.retry.random.uniform', side_effect=lambda a, b: b) as uniform:
+        assert [policy.delay(i) for i in range(4)] == [1, 2, 4, 5]
+        assert uniform.call_args_list[0] == mock.call(0, 1)
+    assert 0 <= policy.delay(1) <= 2
+    assert policy.delay(0, http_error(429, {"Retry-After": "3"}).response) == 3
+    assert policy.delay(0, http_error(429, {"Retry-After": "120"}).response) == 5
+
+
+def test_budget():
+    """
+    Checks the retry budget of the run and of the hosts.
+    """
+    policy = RetryPolicy(budget=3, host_budget=2)
+    assert policy.allow("a", "closed")
+    assert policy.allow("a", "timeout")
+    assert not policy.allow("a", "closed"), "budget of the host is used up"
+    assert policy.allow("b", "status")
+    assert not policy.allow("c", "closed"), "budget of the run is used up"
+    assert policy.stats() == {"attempts": 0, "retries": 3, "exhausted": 2,
+                              "reasons": {"closed": 1, "timeout": 1, "status": 1}}
+    assert policy.isIdempotent("GET")
+    assert not policy.isIdempotent("POST")
+    assert policy.isIdempotent("POST", idempotent=True)
+
+
+@pytest.fixture
+def plw():
+    """
+    `PyLeiheWeb` with a mocked session and its own retry policy without waiting.
+    """
+    web = PyLeiheWeb()
+    web.Session = mock.Mock(name="requests.Session")
+    web.Retry = RetryPolicy(retries=2)
+    with mock.patch.object(web.Retry, "sleep") as sleep:
+        web.sleep = sleep
+        yield web
+
+
+def test_simpleSession_retry_status(plw):
+    """
+    HTTP 5xx is retried, the last error is raised.
+    """
+    ok = mock.Mock()
+    plw.Session.request.side_effect = [mock.Mock(raise_for_status=mock.Mock(
+        side_effect=http_error(503))), ok]
+    assert plw.simpleGET("https://host.test/page") is ok
+    assert plw.sleep.call_count == 1
+    plw.Session.request.side_effect = None
+    plw.Session.request.return_value.raise_for_status.side_effect = http_error(500)
+    with pytest.raises(requests.HTTPError):
+        plw.simpleGET("https://host.test/page")
+    assert plw.Retry.stats()["attempts"] == 5
+    assert plw.Retry.stats()["reasons"] == {"status": 3}
+    assert dict(plw.Retry._hosts) == {SessionPool.hostKey("https://host.test/page"): 3}
+
+
+def test_simpleSession_retry_idempotent(plw):
+    """
+    POST requests are only repeated if they are marked as idempotent.
+    """
+    plw.Session.request.side_effect = requests.ReadTimeout("read timeout")
+    assert plw.simpleSession("https://host.test/search", data="x") is None
+    assert plw.Session.request.call_count == 1
+    assert plw.simpleSession("https://host.test/search", data="x", idempotent=True) is None
+    assert plw.Session.request.call_count == 4
+    plw.sleep.assert_called()
+
+
+def test_simpleSession_retry_budget(plw):
+    """
+    Without budget the request is not repeated.
+    """
+    plw.Retry.budget = 1
+    plw.Session.request.side_effect = requests.ConnectionError(
+        "Remote end closed connection without response")
+    assert plw.simpleGET("https://host.test/a") is None
+    assert plw.Session.request.call_count == 2
+    assert plw.simpleGET("https://host.test/b") is None
+    assert plw.Session.request.call_count == 3
+    assert plw.Retry.exhausted == 2
@@ -0,0 +1,149 @@
+"""
+Testfunctions for `HostScheduler` from `scheduler.py`
+"""
+# pylint: disable=protected-access
+import collections
+import multiprocessing
+import threading
+import time
+from unittest import mock
+import pytest
+import _paths  # pylint: disable=unused-import
+from PyLeihe.scheduler import TokenBucket, HostLimits, HostScheduler
+from PyLeihe.simple_functions import search_bibs
+
+
+def test_TokenBucket():
+    """
+    Checks the refill and the reservation of tokens.
+    """
+    with mock.patch('PyLeihe.scheduler.time.monotonic', return_value=100.0) as clock:
+        bucket = TokenBucket(rate=2, burst=2)
+        assert bucket.waitTime() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.waitTime() == 0.5
+        assert bucket.reserve() == 0.5
+        assert bucket.reserve() == 1.0
+        clock.return_value = 101.0
+        assert bucket.waitTime() == 0.5
+        clock.return_value = 110.0
+        assert bucket.reserve() == 0, "the bucket holds at most `burst` tokens"
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0.5
+
+
+def test_HostLimits():
+    """
+    Checks that every host has its own bucket.
+    """
+    assert HostLimits().bucket("a") is None
+    assert HostLimits().reserve("a") == 0
+    limits = HostLimits(rate=1, burst=1)
+    assert limits.bucket("a") is limits.bucket("a")
+    assert limits.bucket("a") is not limits.bucket("b")
+    assert limits.reserve("a") == 0
+    assert limits.waitTime("a") > 0
+    assert limits.waitTime("b") == 0
+
+
+def run_tracked(items, threads, limits, duration=0.02):
+    """
+    Runs the items (host, value) and records the threads and the concurrency per host.
+    """
+    lock = threading.Lock()
+    inflight = collections.Counter()
+    peak = collections.Counter()
+    workers = collections.defaultdict(set)
+
+    def work(item):
+        host, value = item
+        with lock:
+            inflight[host] += 1
+            peak[host] = max(peak[host], inflight[host])
+            workers[host].add(threading.current_thread().name)
+        time.sleep(duration)
+        with lock:
+            inflight[host] -= 1
+        return value
+    scheduler = HostScheduler(threads, limits, key=lambda item: item[0])
+    return scheduler.map(work, items), peak, workers
+
+
+def test_map_concurrency_affinity():
+    """
+    Checks the order of `map`, the concurrency cap and the host affinity.
+    """
+    items = [("a", i) for i in range(6)] + [("b", i) for i in range(6, 10)]
+    results, peak, workers = run_tracked(items, 4, HostLimits(concurrency=1))
+    assert results == list(range(10))
+    assert peak == {"a": 1, "b": 1}
+    assert len(workers["a"]) == 1, "a host stays on the worker with the warm connection"
+    assert len(workers["b"]) == 1
+    _results, peak, _workers = run_tracked(items, 4, HostLimits(concurrency=2))
+    assert peak["a"] == 2
+
+
+def test_map_rate():
+    """
+    Checks the rate limit per host.
+    """
+    items = [("a", i) for i in range(5)] + [("b", 5)]
+    start = time.monotonic()
+    results, _peak, _workers = run_tracked(items, 3, HostLimits(rate=25, burst=1), duration=0)
+    elapsed = time.monotonic() - start
+    assert results == list(range(6))
+    assert elapsed >= 4 / 25 * 0.9
+
+
+def test_imap_unordered():
+    """
+    Checks the iterator with timeout, exceptions and `terminate`.
+    """
+    event = threading.Event()
+
+    def work(item):
+        if item == "error":
+            raise KeyError(item)
+        if item == "slow":
+            event.wait(2)
+        return item
+    scheduler = HostScheduler(2, key=lambda item: item)
+    results = scheduler.imap_unordered(work, ["slow", "fast"])
+    assert results.next() == "fast"
+    with pytest.raises(multiprocessing.TimeoutError):
+        results.next(timeout=0.01)
+    event.set()
+    assert list(results) == ["slow"]
+    scheduler.join()
+
+    scheduler = HostScheduler(1, key=lambda item: item)
+    with pytest.raises(KeyError):
+        scheduler.map(work, ["ok", "error"])
+
+    event.clear()
+    scheduler = HostScheduler(1, key=lambda item: item)
+    results = scheduler.imap_unordered(work, ["slow", "x", "y"])
+    scheduler.terminate()
+    event.set()
+    assert list(results) == []
+    scheduler.join()
+    assert "HostScheduler" in repr(scheduler)
+
+
+def test_search_bibs_limits():
+    """
+    Checks that `search_bibs` groups the libraries by the host of the `search_url`.
+    """
+    bibs = [mock.Mock(search_url="https://www2.onleihe.de/{}/frontend".format(i), url=None)
+            for i in range(4)]
+    bibs.append(mock.Mock(search_url=None, url="https://bib.example.org/"))
+    for i, bib in enumerate(bibs):
+        bib.search.return_value = i
+    limits = HostLimits(concurrency=1)
+    with mock.patch('PyLeihe.simple_functions.HostScheduler', wraps=HostScheduler) as scheduler:
+        results = search_bibs(bibs, "word", threads=3, limits=limits)
+        assert results == [(bib, i) for i, bib in enumerate(bibs)]
+        scheduler.assert_called_once_with(3, limits, key=mock.ANY)
+        assert sorted(search_bibs(bibs, "word", threads=3, limits=limits, as_completed=True),
+                      key=lambda r: r[1]) == results
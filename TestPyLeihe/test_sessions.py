@@ -0,0 +1,118 @@
+"""
+Testfunctions for `SessionPool` from `sessions.py`
+"""
+# pylint: disable=protected-access
+from multiprocessing.dummy import Pool
+from unittest import mock
+import requests
+import _paths  # pylint: disable=unused-import
+from PyLeihe.sessions import SessionPool
+from PyLeihe.basic import PyLeiheWeb
+
+
+def test_hostKey():
+    """
+    Test for `SessionPool.hostKey`
+    """
+    assert SessionPool.hostKey("https://www2.onleihe.de/a/frontend") == \
+        SessionPool.hostKey("HTTPS://WWW2.onleihe.de/b/")
+    assert SessionPool.hostKey("https://www2.onleihe.de/") != \
+        SessionPool.hostKey("http://www2.onleihe.de/")
+    assert SessionPool.hostKey("https://a.onleihe.de/") != \
+        SessionPool.hostKey("https://b.onleihe.de/")
+
+
+def test_libraryKey():
+    """
+    Test for `SessionPool.libraryKey`
+    """
+    assert SessionPool.libraryKey("https://www2.onleihe.de/lib1/frontend/search") == \
+        ("https", "www2.onleihe.de", "lib1")
+    assert SessionPool.libraryKey("https://www2.onleihe.de/lib1") == \
+        SessionPool.libraryKey("HTTPS://WWW2.onleihe.de/lib1/frontend")
+    assert SessionPool.libraryKey("https://www.onleihe.net/") == \
+        ("https", "www.onleihe.net", "")
+
+
+def test_getSession():
+    """
+    Checks that one session per library and one adapter per host is created
+    and the hits and misses are counted.
+    """
+    pool = SessionPool(pool_maxsize=3)
+    s1 = pool.getSession("https://www2.onleihe.de/lib1/frontend")
+    s2 = pool.getSession("https://www2.onleihe.de/lib2/frontend")
+    s3 = pool.getSession("https://biblio24.onleihe.de/lib3/frontend")
+    assert isinstance(s1, requests.Session)
+    assert s1 is pool.getSession("https://www2.onleihe.de/lib1/frontend/search")
+    assert s1 is not s2
+    assert s1.cookies is not s2.cookies
+    assert s1.get_adapter("https://www2.onleihe.de") is s2.get_adapter("https://www2.onleihe.de")
+    assert s1.get_adapter("https://www2.onleihe.de") is not \
+        s3.get_adapter("https://biblio24.onleihe.de")
+    assert s1.get_adapter("https://www2.onleihe.de")._pool_maxsize == 3
+    stats = pool.stats()
+    assert stats["hosts"] == 2
+    assert stats["libraries"] == 3
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["connections"] == 0
+    assert "hosts=2" in repr(pool)
+    pool.close()
+    assert pool.stats()["hosts"] == 0
+
+
+def test_getSession_threads():
+    """
+    Checks that parallel lookups create only one session per library
+    and one adapter per host.
+    """
+    pool = SessionPool()
+    urls = ["https://host{}.test/lib{}/x".format(i % 3, i % 6) for i in range(60)]
+    with Pool(8) as workpool:
+        sessions = workpool.map(pool.getSession, urls)
+    assert len(set(map(id, sessions))) == 6
+    assert len(set(id(s.get_adapter("https://x")) for s in sessions)) == 3
+    assert pool.misses == 6
+    assert pool.hits == 54
+
+
+def test_request_methods():
+    """
+    Checks that the requests are forwarded to the host session.
+    """
+    pool = SessionPool()
+    with mock.patch.object(pool, "getSession") as mock_getSession:
+        sess = mock_getSession.return_value
+        assert pool.get("https://a.test/x", timeout=1) == sess.request.return_value
+        sess.request.assert_called_with("GET", "https://a.test/x", timeout=1)
+        pool.post("https://a.test/y", data={"d": 1})
+        sess.request.assert_called_with("POST", "https://a.test/y", data={"d": 1})
+        mock_getSession.assert_called_with("https://a.test/y")
+
+
+def test_injection():
+    """
+    Checks that the pool can be used as `sess` of `PyLeiheWeb`.
+    """
+    pool = SessionPool()
+    plw = PyLeiheWeb(sess=pool)
+    assert plw.Session is pool
+    with mock.patch.object(pool, "request") as mock_request:
+        assert plw.simpleGET("https://a.test/x") == mock_request.return_value
+        mock_request.assert_called_once_with("GET", "https://a.test/x",
+                                             timeout=PyLeiheWeb.TIMEOUT)
+
+
+def test_cookies():
+    """
+    Checks that the cookies of a library are not sent to another library on the same host.
+    """
+    pool = SessionPool()
+    s1 = pool.getSession("https://www2.onleihe.de/lib1/frontend")
+    s1.cookies.set("JSESSIONID", "lib1", domain="www2.onleihe.de", path="/")
+    s2 = pool.getSession("https://www2.onleihe.de/lib2/frontend")
+    prepared = s2.prepare_request(requests.Request("GET", "https://www2.onleihe.de/lib2/x"))
+    assert "Cookie" not in prepared.headers
+    prepared = s1.prepare_request(requests.Request("GET", "https://www2.onleihe.de/lib1/x"))
+    assert prepared.headers["Cookie"] == "JSESSIONID=lib1"
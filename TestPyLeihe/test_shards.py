@@ -0,0 +1,127 @@
+"""
+Testfunctions for the sharded catalog from `shards.py`
+"""
+import os
+from unittest import mock
+import pytest
+import _paths  # pylint: disable=unused-import
+from PyLeihe import PyLeiheNet, LocalGroup, Bibliography
+from PyLeihe.shards import shardPath, isCurrent, readManifest, MANIFEST
+from PyLeihe.simple_functions import load_bibs
+
+
+def make_net():
+    """
+    Creates a small catalog with three states.
+    """
+    pln = PyLeiheNet()
+    bib1 = Bibliography("https://www.bib1.de", ["Münster", "Köln"])
+    bib1.search_url = "https://www2.onleihe.de/bib1/frontend/search"
+    pln.Laender = [LocalGroup(1, "Nordrheinwestfalen",
+                              bibs=[bib1, Bibliography("https://www.bib2.de", ["Köln"])]),
+                   LocalGroup(2, "Leer"),
+                   LocalGroup(3, "Bayern", bibs=[Bibliography("https://www.onleihe.de/bayern")])]
+    return pln
+
+
+def test_shardPath():
+    """
+    Checks the directory next to the JSON catalog.
+    """
+    assert shardPath() == "PyLeiheNet.shards"
+    assert shardPath("data/bibs") == "data/bibs.shards"
+
+
+def test_roundtrip(tmp_path):
+    """
+    Checks the files of the shards and the complete catalog loaded from them.
+    """
+    filename = str(tmp_path / "bibs")
+    pln = make_net()
+    pln.toShards(filename)
+    assert sorted(os.listdir(shardPath(filename))) == ["1.json", "2.json", "3.json", MANIFEST]
+    assert readManifest(shardPath(filename))[0] == {
+        "id": 1, "name": "Nordrheinwestfalen", "file": "1.json", "titles": ["bib1", "bib2"]}
+    session = mock.Mock()
+    loaded = PyLeiheNet.loadFromShards(filename, sess=session)
+    assert loaded.reprJSON() == pln.reprJSON()
+    assert loaded.getBib("bayern").Session is session
+    assert loaded.findCity("koeln")[0][1] is loaded.getBib("bib1")
+
+
+def test_lazy(tmp_path):
+    """
+    Checks that a state is loaded on the first access of its libraries only.
+    """
+    filename = str(tmp_path / "bibs")
+    make_net().toShards(filename)
+    loaded = PyLeiheNet.loadFromShards(filename)
+    assert [(l.lid, l.name, l.loaded) for l in loaded.Laender] == \
+        [(1, "Nordrheinwestfalen", False), (2, "Leer", False), (3, "Bayern", False)]
+    assert loaded["bayern"].lid == 3
+    assert not loaded["bayern"].loaded
+    assert loaded.getBib("BIB2").url_up == "https://www.bib2.de"
+    assert [l.loaded for l in loaded.Laender] == [True, False, False]
+    assert loaded.getBib("unknown") is None
+    assert [l.loaded for l in loaded.Laender] == [True, False, False]
+    assert len(loaded["bayern"].Bibliotheken) == 1
+    assert [l.loaded for l in loaded.Laender] == [True, False, True]
+
+
+def test_broken(tmp_path):
+    """
+    Checks the errors of a missing or foreign manifest.
+    """
+    filename = str(tmp_path / "bibs")
+    with pytest.raises(OSError):
+        PyLeiheNet.loadFromShards(filename)
+    os.makedirs(shardPath(filename))
+    (tmp_path / "bibs.shards" / MANIFEST).write_text('{"version": 0}')
+    with pytest.raises(ValueError):
+        PyLeiheNet.loadFromShards(filename)
+
+
+def test_isCurrent(tmp_path):
+    """
+    Checks the age of the manifest against the json file.
+    """
+    filename = str(tmp_path / "bibs")
+    assert not isCurrent(filename)
+    make_net().toShards(filename)
+    assert isCurrent(filename), "no json file"
+    manifest = os.path.join(shardPath(filename), MANIFEST)
+    os.utime(manifest, (0, 0))
+    (tmp_path / "bibs.json").write_text("{}")
+    assert not isCurrent(filename)
+    os.utime(manifest)
+    assert isCurrent(filename)
+
+
+def test_load_bibs_state(tmp_path, caplog):
+    """
+    Checks that `load_bibs` with a state reads only its shard (and falls back to the json).
+    """
+    filename = str(tmp_path / "bibs")
+    pln = make_net()
+    pln.toJSONFile(filename)
+    with mock.patch.object(PyLeiheNet, "loadFromJSON", wraps=PyLeiheNet.loadFromJSON) as load:
+        assert [b.title for b in load_bibs(True, filename, state="Bayern")] == ["bayern"]
+        assert load.called
+        pln.toShards(filename)
+        load.reset_mock()
+        assert [b.title for b in load_bibs(True, filename, state="Bayern")] == ["bayern"]
+        assert [b.title for b in load_bibs(True, filename)] == ["bib1", "bib2", "bayern"]
+        assert load.call_count == 1
+    assert load_bibs(True, filename, state="Atlantis") == []
+    assert "The state 'Atlantis' does not exist." in caplog.text
+    for content in (None, "{", "{}"):
+        shard = os.path.join(shardPath(filename), "3.json")
+        if content is None:
+            os.remove(shard)
+        else:
+            with open(shard, "w") as f:
+                f.write(content)
+            os.utime(os.path.join(shardPath(filename), MANIFEST))
+        caplog.clear()
+        assert [b.title for b in load_bibs(True, filename, state="Bayern")] == ["bayern"]
+        assert "Shard of the state 'Bayern' could not be loaded" in caplog.text
@@ -2,11 +2,16 @@
 Testfunctions for `Pyleihe.simple_functions`
 """
 # pylint: disable=wrong-import-position,wildcard-import,unused-argument,no-self-use
+import asyncio
 import logging
+import os
+import sys
+import time
 from unittest import mock
 import pytest
 import _paths  # pylint: disable=unused-import
 from PyLeihe.simple_functions import *
+from PyLeihe.scheduler import HostLimits
 
 
 @mock.patch('PyLeihe.simple_functions.correct_searchurls_land')
@@ -105,6 +110,7 @@ class TestMakejson:
         # setup
         pln = mock_PyLeiheNet.return_value
         pln.Laender = [mock.MagicMock(name="Land1"), mock.MagicMock(name="Land2")]
+        pln.LoadErrors = {}
         manager = mock.Mock()
         manager.attach_mock(pln.getBundesLaender, 'the_getBundesLaender')
         manager.attach_mock(pln.loadallBundesLaender, 'the_loadallBundesLaender')
@@ -121,12 +127,27 @@ class TestMakejson:
         ]
         assert manager.mock_calls == expected_calls
         pln.toJSONFile.assert_called_once_with("to_filename.test")
-        for l in pln.Laender:
-            l.loadsearchURLs.assert_called_once()
-            l.groupbytitle.assert_called_once()
+        pln.loadsearchURLs.assert_called_once_with(newtitle=True, threads=4,
+                                                   progress=print_progress)
+        pln.groupbytitle.assert_called_once_with()
         # ignore prints
         capsys.readouterr()
 
+    def test_reload_failed_state(self, mock_PyLeiheNet, mock_correct_search_urls, capsys,
+                                 caplog):
+        """
+        Checks that `makejson(reload_data=True)` saves nothing if a state failed.
+        """
+        pln = mock_PyLeiheNet.return_value
+        pln.LoadErrors = {"Bayern": ValueError("broken page")}
+        assert makejson(reload_data=True, to_filename="to_filename.test") is None
+        assert "states could not be loaded: Bayern" in caplog.text
+        pln.loadsearchURLs.assert_not_called()
+        pln.toJSONFile.assert_not_called()
+        pln.toSnapshotFile.assert_not_called()
+        pln.toShards.assert_not_called()
+        capsys.readouterr()
+
     def test_reload_false(self, mock_PyLeiheNet, mock_correct_search_urls, capsys):
         """
         Checks the call behaviour of `makejson(reload_data=False)`
@@ -140,11 +161,11 @@ class TestMakejson:
                                filename="filename.text",
                                to_filename="to_filename.test")
         # check results
-        mock_loadFromJSON.assert_called_once_with(filename="filename.text")
+        mock_loadFromJSON.assert_called_once_with(filename="filename.text", sess=mock.ANY)
         pln.toJSONFile.assert_called_once_with("to_filename.test")
-        for l in pln.Laender:
-            l.loadsearchURLs.assert_called_once()
-            l.groupbytitle.assert_called_once()
+        pln.loadsearchURLs.assert_called_once_with(newtitle=True, threads=4,
+                                                   progress=print_progress)
+        pln.groupbytitle.assert_called_once_with()
         # ignore prints
         capsys.readouterr()
 
@@ -161,13 +182,26 @@ class TestMakejson:
                         filename="filename.text",
                         to_filename="to_filename.test") is None
         # check results
-        mock_loadFromJSON.assert_called_once_with(filename="filename.text")
+        mock_loadFromJSON.assert_called_once_with(filename="filename.text", sess=mock.ANY)
         pln.toJSONFile.assert_not_called()
         # ignore prints
         capsys.readouterr()
         caplog.clear()
 
 
+def test_print_progress(capsys):
+    """
+    Checks the progress output on a terminal and in a file.
+    """
+    with mock.patch('PyLeihe.simple_functions.sys.stdout.isatty', return_value=True):
+        print_progress(1, 2)
+        print_progress(2, 2)
+    assert capsys.readouterr().out == "\r1/2\r2/2\n"
+    print_progress(1, 2)
+    print_progress(2, 2)
+    assert capsys.readouterr().out == "2/2\n"
+
+
 @mock.patch('PyLeihe.simple_functions.search_list')
 def test_search_print(mock_search_list, capsys):
     """
@@ -191,7 +225,7 @@ def test_search_print(mock_search_list, capsys):
     max_count = 3
     search_print(max_count, 5, test=21)
     # checks
-    mock_search_list.assert_called_once_with(5, test=21)
+    mock_search_list.assert_called_once_with(5, as_completed=True, test=21)
     # check prints
     printed = capsys.readouterr()
     ascii_table = printed.out.split("\n")
@@ -221,7 +255,7 @@ def test_search_list_single_thread(mock_PyLeiheNet, mock_Pool, caplog):
                          jsonfile="json.file.test",
                          threads=0)
     # check subcalls
-    mock_loadFromJSON.assert_called_once_with(filename="json.file.test")
+    mock_loadFromJSON.assert_called_once_with(filename="json.file.test", sess=mock.ANY)
     mock_Laender.assert_called_once_with()
 
 
@@ -267,3 +301,372 @@ def test_parallel_search_helper():
     assert len(result) >= 2
     assert result[0] == bib
     assert result[1] == bib.search.return_value
+
+
+@mock.patch('PyLeihe.simple_functions.async_search_helper')
+@mock.patch('PyLeihe.simple_functions.Pool')
+def test_search_bibs_async(mock_Pool, mock_async_search_helper):
+    """
+    Checks that the engine `async` runs `async_search_helper` instead of the thread pool.
+    """
+    pytest.importorskip("aiohttp")
+    bibs = [mock.Mock(), mock.Mock()]
+
+    async def fake_helper(*args):
+        return [(b, 1) for b in args[0]]
+    mock_async_search_helper.side_effect = fake_helper
+    result = search_bibs(bibs, "searchword", "category", engine="async", concurrency=7)
+    mock_async_search_helper.assert_called_once_with(bibs, "searchword", "category", 7, None)
+    mock_Pool.assert_not_called()
+    assert result == [(bibs[0], 1), (bibs[1], 1)]
+    with pytest.raises(ValueError):
+        search_bibs(bibs, engine="unknown")
+
+
+def test_async_search_helper():
+    """
+    Checks that `async_search_helper` keeps the order of the libraries.
+    """
+    pytest.importorskip("aiohttp")
+    bibs = [mock.Mock(), mock.Mock(), mock.Mock()]
+    for i, bib in enumerate(bibs):
+        async def asearch(search, category, session=None, i=i):
+            await asyncio.sleep(0.01 * (3 - i))
+            return i
+        bib.asearch.side_effect = asearch
+    loop = asyncio.new_event_loop()
+    try:
+        result = loop.run_until_complete(async_search_helper(bibs, "word", None, 2))
+    finally:
+        loop.close()
+    assert result == [(bibs[0], 0), (bibs[1], 1), (bibs[2], 2)]
+
+
+@pytest.mark.parametrize("iterate", [False, True])
+def test_async_search_helper_throttle(iterate):
+    """
+    Checks that the searches waiting for the rate limit of a host
+    do not hold the slots of the other hosts.
+    """
+    pytest.importorskip("aiohttp")
+    bibs = [mock.Mock(search_url="https://www2.onleihe.de/{}/".format(i)) for i in range(4)]
+    bibs.append(mock.Mock(search_url="https://other.test/"))
+    started = {}
+    start = time.monotonic()
+    for i, bib in enumerate(bibs):
+        async def asearch(search, category, session=None, i=i):
+            started[i] = time.monotonic() - start
+            return i
+        bib.asearch.side_effect = asearch
+
+    async def collect():
+        limits = HostLimits(rate=5, burst=1)
+        if not iterate:
+            return await async_search_helper(bibs, "word", None, 1, limits)
+        return [r async for r in async_iter_helper(bibs, "word", None, 1, limits)]
+    loop = asyncio.new_event_loop()
+    try:
+        result = loop.run_until_complete(collect())
+    finally:
+        loop.close()
+    assert sorted(r for _bib, r in result) == [0, 1, 2, 3, 4]
+    assert started[4] < 0.15, "the other host is not throttled"
+    assert started[3] >= 0.55, "three searches wait for the rate limit"
+
+
+@mock.patch('PyLeihe.simple_functions.load_bibs')
+def test_search_batch(mock_load_bibs):
+    """
+    Checks that `search_batch` resolves each search url once and
+    searches every keyword in every library.
+    """
+    bibs = [mock.Mock(search_url="url1"), mock.Mock(search_url=None), mock.Mock(search_url=None)]
+
+    def resolve(bib, url):
+        def grep():
+            bib.search_url = url
+            return url is not None
+        return grep
+    bibs[1].grepSearchURL.side_effect = resolve(bibs[1], "url2")
+    bibs[2].grepSearchURL.side_effect = resolve(bibs[2], None)
+    for i, bib in enumerate(bibs):
+        bib.search.side_effect = lambda search, category, i=i, **kw: len(search) * 10 + i
+    mock_load_bibs.return_value = bibs
+    for threads in (0, 2):
+        result = search_batch(["a", "bb", "a"], "category", jsonfile="file", threads=threads,
+                              stream=True)
+        mock_load_bibs.assert_called_with(True, "file", mock.ANY, None)
+        assert list(result) == ["a", "bb"], "duplicates are searched once"
+        assert result["a"] == [(bibs[0], 10), (bibs[1], 11), (bibs[2], -3)]
+        assert result["bb"] == [(bibs[0], 20), (bibs[1], 21), (bibs[2], -3)]
+    bibs[0].grepSearchURL.assert_not_called()
+    assert bibs[1].grepSearchURL.call_count == 1
+    assert bibs[2].grepSearchURL.call_count == 2
+    bibs[2].search.assert_not_called()
+    bibs[0].search.assert_called_with("bb", "category", stream=True)
+
+
+def test_search_batch_async():
+    """
+    Checks the engine `async` for `search_batch`.
+    """
+    pytest.importorskip("aiohttp")
+    bibs = [mock.Mock(search_url="url1"), mock.Mock(search_url="url2")]
+    for i, bib in enumerate(bibs):
+        async def asearch(search, category, session=None, i=i):
+            await asyncio.sleep(0.01 * (2 - i))
+            return len(search) * 10 + i
+        bib.asearch.side_effect = asearch
+    with mock.patch('PyLeihe.simple_functions.load_bibs', return_value=bibs):
+        result = search_batch(["a", "bb"], engine="async", concurrency=3)
+    assert result == {"a": [(bibs[0], 10), (bibs[1], 11)],
+                      "bb": [(bibs[0], 20), (bibs[1], 21)]}
+
+
+def test_read_search_file(tmp_path):
+    """
+    Checks reading the keywords for a batch search.
+    """
+    path = tmp_path / "searches.txt"
+    path.write_text("# reading list\nHarry Potter\n\n  Die Welle  \n", encoding="utf-8")
+    assert read_search_file(str(path)) == ["Harry Potter", "Die Welle"]
+
+
+@mock.patch('PyLeihe.simple_functions.search_batch')
+def test_search_batch_print(mock_search_batch, capsys):
+    """
+    Checks the output of `search_batch_print`.
+    """
+    mock_search_batch.return_value = {
+        "a": [(mock.Mock(title="1R", cities=["c1"]), 1), (mock.Mock(title="5R", cities=["c2"]), 5)],
+        "b": [(mock.Mock(title="3R", cities=["c3"]), 3)],
+    }
+    search_batch_print(1, searches=["a", "b"])
+    mock_search_batch.assert_called_once_with(searches=["a", "b"])
+    lines = [r for r in capsys.readouterr().out.split("\n") if r]
+    assert lines[0] == "== a =="
+    assert "5R" in lines[1]
+    assert lines[2] == "== b =="
+    assert "3R" in lines[3]
+    assert len(lines) == 4
+
+
+def test_TopResults():
+    """
+    Checks the bounded collection of the best results.
+    """
+    best = TopResults(3)
+    assert best.add("b1", 1)
+    assert best.add("b5", 5)
+    assert best.add("b2", 2)
+    assert not best.add("b0", 0)
+    assert best.add("b7", 7)
+    assert not best.add("b2x", 2), "same hits - the first result stays"
+    assert len(best) == 3
+    assert best.results() == [("b7", 7), ("b5", 5), ("b2", 2)]
+    unlimited = TopResults(0)
+    for i in range(20):
+        assert unlimited.add(i, i % 4)
+    assert len(unlimited) == 20
+    assert [c for _b, c in unlimited.results()] == sorted((i % 4 for i in range(20)), reverse=True)
+
+
+@pytest.mark.parametrize("threads", [0, 3])
+def test_search_bibs_as_completed(threads):
+    """
+    Checks that `search_bibs` yields the results as soon as they are available.
+    """
+    bibs = [mock.Mock(), mock.Mock(), mock.Mock()]
+    for i, bib in enumerate(bibs):
+        bib.search.side_effect = lambda search, category, i=i: time.sleep(0.05 * (2 - i)) or i
+    results = search_bibs(bibs, "word", threads=threads, as_completed=True)
+    assert not isinstance(results, list)
+    results = list(results)
+    if threads:
+        assert results == [(bibs[2], 2), (bibs[1], 1), (bibs[0], 0)]
+    else:
+        assert results == [(bibs[0], 0), (bibs[1], 1), (bibs[2], 2)]
+    with pytest.raises(ValueError):
+        search_bibs(bibs, engine="unknown", as_completed=True)
+
+
+def test_search_bibs_as_completed_async():
+    """
+    Checks the engine `async` with `as_completed` and stopping early.
+    """
+    pytest.importorskip("aiohttp")
+    bibs = [mock.Mock(), mock.Mock(), mock.Mock()]
+    for i, bib in enumerate(bibs):
+        async def asearch(search, category, session=None, i=i):
+            await asyncio.sleep(0.02 * (2 - i))
+            return i
+        bib.asearch.side_effect = asearch
+    results = list(search_bibs(bibs, "word", engine="async", as_completed=True))
+    assert results == [(bibs[2], 2), (bibs[1], 1), (bibs[0], 0)]
+    iterator = search_bibs(bibs, "word", engine="async", as_completed=True)
+    assert next(iterator) == (bibs[2], 2)
+    iterator.close()
+
+
+@mock.patch('PyLeihe.simple_functions.search_list')
+def test_search_print_live(mock_search_list, capsys):
+    """
+    Checks the refreshed result table on a terminal.
+    """
+    mock_search_list.return_value = iter([
+        (mock.Mock(title="1R", cities=["c1"]), 1),
+        (mock.Mock(title="9R", cities=["c2"]), 9),
+    ])
+    with mock.patch('PyLeihe.simple_functions.REFRESH_INTERVAL', 0), \
+            mock.patch.object(sys.stdout, "isatty", return_value=True):
+        search_print(2)
+    out = capsys.readouterr().out
+    assert out.count("\x1b[J") == 2, "refreshed once and cleared before the final table"
+    final = out.split("\x1b[J")[-1].split("\n")
+    assert "9R" in final[0]
+    assert "1R" in final[1]
+
+
+@mock.patch('PyLeihe.simple_functions.search_list')
+def test_search_print_live_terminal_size(mock_search_list, capsys):
+    """
+    Checks that the table is only refreshed if it fits on the terminal
+    and that the refreshed lines are cut to its width.
+    """
+    def results():
+        return iter([(mock.Mock(title="L" * 40, cities=["c1"]), 1),
+                     (mock.Mock(title="9R", cities=["c2"]), 9)])
+    with mock.patch('PyLeihe.simple_functions.REFRESH_INTERVAL', 0), \
+            mock.patch.object(sys.stdout, "isatty", return_value=True), \
+            mock.patch('shutil.get_terminal_size', return_value=os.terminal_size((20, 3))):
+        for top in (-1, 3):
+            mock_search_list.return_value = results()
+            search_print(top)
+            assert "\x1b[J" not in capsys.readouterr().out
+        mock_search_list.return_value = results()
+        search_print(2)
+    refreshed = capsys.readouterr().out.split("\x1b[J")[0].split("\n")
+    assert refreshed[0] == " 1 " + "L" * 16
+
+
+def slow_bibs(delays):
+    """
+    Creates libraries whose searches take the given time (blocking and asynchronous).
+    """
+    bibs = []
+    for i, delay in enumerate(delays):
+        bib = mock.Mock(search_url="https://host{}.test/".format(i))
+        bib.search.side_effect = lambda search, category, d=delay, i=i: time.sleep(d) or i
+
+        async def asearch(search, category, session=None, d=delay, i=i):
+            await asyncio.sleep(d)
+            return i
+        bib.asearch.side_effect = asearch
+        bibs.append(bib)
+    return bibs
+
+
+@pytest.mark.parametrize("engine, threads", [("threads", 0), ("threads", 3), ("async", 3)])
+def test_search_bibs_deadline(engine, threads):
+    """
+    Checks that `search_bibs` returns the finished results at the deadline
+    and marks the other libraries with `-6`.
+    """
+    if engine == "async":
+        pytest.importorskip("aiohttp")
+    # sequential: the running second search doesn't delay the deadline,
+    # the third library is not started
+    bibs = slow_bibs([0, 2, 0] if threads == 0 else [0, 0.01, 2])
+    start = time.monotonic()
+    results = search_bibs(bibs, "word", threads=threads, engine=engine, deadline=0.1)
+    assert time.monotonic() - start < 1
+    if threads == 0:
+        assert results == [(bibs[0], 0), (bibs[1], -6), (bibs[2], -6)]
+    else:
+        assert results == [(bibs[0], 0), (bibs[1], 1), (bibs[2], -6)]
+    results = list(search_bibs(bibs, "word", threads=threads, engine=engine, deadline=0.1,
+                               as_completed=True))
+    assert results[-1] == (bibs[2], -6)
+
+
+@mock.patch('PyLeihe.simple_functions.load_bibs')
+def test_search_batch_deadline(mock_load_bibs):
+    """
+    Checks the deadline of `search_batch`.
+    """
+    bibs = slow_bibs([0, 2])
+    mock_load_bibs.return_value = bibs
+    start = time.monotonic()
+    result = search_batch(["a", "b"], threads=2, deadline=0.2)
+    assert time.monotonic() - start < 1.5
+    assert result["a"][0] == (bibs[0], 0)
+    assert result["b"][0] == (bibs[0], 0)
+    assert result["a"][1] == (bibs[1], -6)
+
+
+@mock.patch('PyLeihe.simple_functions.load_bibs')
+def test_search_batch_deadline_resolution(mock_load_bibs):
+    """
+    Checks that `search_batch` reports `-3` for libraries without search url
+    and `-6` only for the libraries not resolved before the deadline.
+    """
+    bibs = slow_bibs([0, 0, 0])
+    for bib, delay in zip(bibs, [0, 0, 2]):
+        bib.search_url = None
+        bib.grepSearchURL.side_effect = lambda d=delay: time.sleep(d)
+    bibs[0].grepSearchURL.side_effect = lambda: setattr(bibs[0], "search_url", "url0")
+    mock_load_bibs.return_value = bibs
+    start = time.monotonic()
+    result = search_batch(["a"], threads=0, deadline=0.3)
+    assert time.monotonic() - start < 1.5
+    # the resolution of the third library used up the deadline, so nothing was searched
+    assert [r for _bib, r in result["a"]] == [-6, -3, -6]
+
+
+def test_group_endpoints():
+    """
+    Checks the grouping of libraries with the same normalized search url.
+    """
+    bibs = [mock.Mock(search_url="https://www4.onleihe.de/libell-e/frontend/search/"),
+            mock.Mock(search_url="https://WWW4.onleihe.de/libell-e/frontend/search"),
+            mock.Mock(search_url=None),
+            mock.Mock(search_url=None),
+            mock.Mock(search_url="https://www4.onleihe.de/bibo-on/frontend/search")]
+    unique, owners = group_endpoints(bibs)
+    assert unique == [bibs[0], bibs[2], bibs[3], bibs[4]]
+    assert owners[id(bibs[0])] == [bibs[0], bibs[1]]
+    assert owners[id(bibs[2])] == [bibs[2]]
+
+
+@pytest.mark.parametrize("as_completed", [False, True])
+@mock.patch('PyLeihe.simple_functions.load_bibs')
+def test_search_list_dedup(mock_load_bibs, as_completed):
+    """
+    Checks that `search_list` queries a shared endpoint once and
+    fans the result out to all libraries.
+    """
+    bibs = [mock.Mock(search_url="url1"), mock.Mock(search_url="url2"),
+            mock.Mock(search_url="url1")]
+    for i, bib in enumerate(bibs):
+        bib.search.return_value = i + 1
+    mock_load_bibs.return_value = bibs
+    result = search_list("word", threads=2, as_completed=as_completed)
+    expected = [(bibs[0], 1), (bibs[1], 2), (bibs[2], 1)]
+    if as_completed:
+        result = sorted(result, key=lambda r: bibs.index(r[0]))
+    assert result == expected
+    bibs[2].search.assert_not_called()
+
+
+@mock.patch('PyLeihe.simple_functions.load_bibs')
+def test_search_batch_dedup(mock_load_bibs):
+    """
+    Checks that `search_batch` queries a shared endpoint once per keyword.
+    """
+    bibs = [mock.Mock(search_url="url1"), mock.Mock(search_url="url1")]
+    bibs[0].search.side_effect = lambda search, category, **kw: len(search)
+    mock_load_bibs.return_value = bibs
+    result = search_batch(["a", "bb"], threads=2)
+    assert result == {"a": [(bibs[0], 1), (bibs[1], 1)], "bb": [(bibs[0], 2), (bibs[1], 2)]}
+    assert bibs[0].search.call_count == 2
+    bibs[1].search.assert_not_called()
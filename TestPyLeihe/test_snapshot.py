@@ -0,0 +1,104 @@
+"""
+Testfunctions for the binary catalog snapshot from `snapshot.py`
+"""
+# pylint: disable=protected-access
+import gc
+import os
+from unittest import mock
+import pytest
+import _paths  # pylint: disable=unused-import
+from PyLeihe import PyLeiheNet, LocalGroup, Bibliography
+from PyLeihe.snapshot import snapshotPath, isCurrent, readSnapshot, SnapshotError
+from PyLeihe.simple_functions import load_net
+
+
+def make_net():
+    """
+    Creates a small catalog with umlauts, shared strings and a missing search url.
+    """
+    pln = PyLeiheNet()
+    bib1 = Bibliography("https://www.bib1.de", ["Münster", "Köln"])
+    bib1.search_url = "https://www2.onleihe.de/bib1/frontend/search"
+    bib2 = Bibliography("https://www.bib2.de", ["Köln"])
+    pln.Laender = [LocalGroup(1, "Nordrheinwestfalen", bibs=[bib1, bib2]),
+                   LocalGroup(2, "Leer"),
+                   LocalGroup(3, "Bayern", bibs=[Bibliography("https://www.onleihe.de/bayern")])]
+    return pln
+
+
+def test_snapshotPath():
+    """
+    Checks the path next to the JSON catalog.
+    """
+    assert snapshotPath() == "PyLeiheNet.snapshot"
+    assert snapshotPath("data/bibs") == "data/bibs.snapshot"
+
+
+def test_roundtrip(tmp_path):
+    """
+    Checks that the snapshot contains the same catalog as the json representation.
+    """
+    filename = str(tmp_path / "bibs")
+    pln = make_net()
+    pln.toSnapshotFile(filename)
+    session = mock.Mock()
+    loaded = PyLeiheNet.loadFromSnapshot(filename, sess=session)
+    assert loaded.reprJSON() == pln.reprJSON()
+    assert [l.lid for l in loaded.Laender] == [1, 2, 3]
+    bib = loaded["nordrheinwestfalen"]["bib1"]
+    assert bib.Session is session
+    assert bib.url.netloc == "www.bib1.de"
+    assert loaded.findCity("koeln") == [("Köln", bib), ("Köln", loaded.getBib("bib2"))]
+    states, entries = readSnapshot(snapshotPath(filename))
+    assert states[1] == (2, "Leer", [])
+    assert entries == loaded.buildCityIndex().entries()
+    assert gc.isenabled()
+
+
+def test_broken(tmp_path):
+    """
+    Checks the errors for files which are no valid snapshots.
+    """
+    path = tmp_path / "bibs.snapshot"
+    make_net().toSnapshotFile(str(tmp_path / "bibs"))
+    valid = path.read_bytes()
+    for content in [b"", b"PYLS", b"XXXX" + valid[4:], valid[:-3], valid[:40],
+                    valid.replace(b"Bayern", b"B\0yern"), valid.replace(b"Bayern", b"B\xffyern")]:
+        path.write_bytes(content)
+        with pytest.raises(SnapshotError):
+            readSnapshot(str(path))
+    pln = make_net()
+    pln["bayern"][0].cities.append("a\0b")
+    with pytest.raises(ValueError):
+        pln.toSnapshotFile(str(tmp_path / "bibs"))
+
+
+def test_isCurrent(tmp_path):
+    """
+    Checks the age of the snapshot against the json file.
+    """
+    filename = str(tmp_path / "bibs")
+    assert not isCurrent(filename)
+    make_net().toSnapshotFile(filename)
+    assert isCurrent(filename), "no json file"
+    make_net().toJSONFile(filename)
+    os.utime(filename + ".snapshot", (0, 0))
+    assert not isCurrent(filename)
+    os.utime(filename + ".json", (0, 0))
+    assert isCurrent(filename)
+
+
+def test_load_net(tmp_path, caplog):
+    """
+    Checks that `load_net` prefers a current snapshot and falls back to the json file.
+    """
+    filename = str(tmp_path / "bibs")
+    pln = make_net()
+    pln.toJSONFile(filename)
+    pln.toSnapshotFile(filename)
+    with mock.patch.object(PyLeiheNet, "loadFromJSON") as mock_json:
+        assert load_net(True, filename).reprJSON() == pln.reprJSON()
+        mock_json.assert_not_called()
+    (tmp_path / "bibs.snapshot").write_bytes(b"broken")
+    assert load_net(True, filename).reprJSON() == pln.reprJSON()
+    assert "could not be loaded" in caplog.text
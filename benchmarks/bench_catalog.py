@@ -0,0 +1,64 @@
+"""
+Measures the time and the memory to load a synthetic catalog with
+`PyLeihe.bibindex.PyLeiheNet.loadFromJSON`.
+
+Usage:
+    ```
+    python3 benchmarks/bench_catalog.py --libraries 10000
+    ```
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from PyLeihe import PyLeiheNet  # noqa: E402 pylint: disable=wrong-import-position
+
+STATES = 16
+
+
+def make_catalog(amount, cities=3):
+    """
+    Creates the json representation of a catalog with `amount` libraries in `STATES` states.
+    """
+    catalog = {}
+    for lid in range(STATES):
+        name = "Land{}".format(lid)
+        bibs = {}
+        for i in range(lid, amount, STATES):
+            title = "bib{}".format(i)
+            bibs[title] = {"name": title,
+                           "url": "https://www.bib{}.de/onleihe".format(i),
+                           "search_url": "https://www{}.onleihe.de/{}/frontend/search,"
+                                         "0-0-0-0-0-0-0-0-0-0-0.html".format(i % 4, title),
+                           "cities": ["Stadt {} {}".format(i, c) for c in range(cities)]}
+        catalog[name] = {"name": name, "id": lid, "bibliotheken": bibs}
+    return catalog
+
+
+def main():
+    """
+    Parses the arguments and prints the timings.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--libraries", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    catalog = make_catalog(args.libraries)
+    timings = []
+    for _i in range(args.repeat):
+        start = time.perf_counter()
+        PyLeiheNet.loadFromJSON(data=catalog)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    pln = PyLeiheNet.loadFromJSON(data=catalog)
+    memory, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{} libraries: load {:.3f}s (best of {}), {:.1f} MB".format(
+        sum(len(l.Bibliotheken) for l in pln.Laender), min(timings), args.repeat,
+        memory / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
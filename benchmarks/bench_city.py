@@ -0,0 +1,67 @@
+"""
+Compares the city lookup of `PyLeihe.cityindex.CityIndex` with a full scan
+over all libraries of a synthetic catalog.
+
+Usage:
+    ```
+    python3 benchmarks/bench_city.py --libraries 10000 --cities 5
+    ```
+"""
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from PyLeihe import Bibliography  # noqa: E402 pylint: disable=wrong-import-position
+from PyLeihe.cityindex import CityIndex, normalizeCity  # noqa: E402 pylint: disable=wrong-import-position
+
+
+def make_bibs(amount, cities):
+    """
+    Creates `amount` libraries with `cities` member towns each.
+    """
+    return [Bibliography("https://www.onleihe.de/lib{}".format(i),
+                         ["Stadt {} {}".format(i, c) for c in range(cities)])
+            for i in range(amount)]
+
+
+def scan(bibs, city):
+    """
+    Finds the libraries of a city with a full scan.
+    """
+    key = normalizeCity(city)
+    return [(c, b) for b in bibs for c in b.cities if normalizeCity(c) == key]
+
+
+def main():
+    """
+    Parses the arguments and prints the timings.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--libraries", type=int, default=10000)
+    parser.add_argument("--cities", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+    bibs = make_bibs(args.libraries, args.cities)
+    queries = ["stadt {} {}".format(random.randrange(args.libraries),  # nosec
+                                    random.randrange(args.cities))  # nosec
+               for _i in range(args.queries)]
+
+    start = time.perf_counter()
+    index = CityIndex(bibs)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for city in queries:
+        index.find(city)
+    lookup = (time.perf_counter() - start) / len(queries)
+    start = time.perf_counter()
+    for city in queries[:10]:
+        scan(bibs, city)
+    linear = (time.perf_counter() - start) / 10
+    print("{}: build {:.3f}s, lookup {:.1f}us, full scan {:.1f}ms".format(
+        index, build, lookup * 1e6, linear * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares the sequential and the concurrent discovery of the search urls
+(`PyLeihe.bibindex.PyLeiheNet.loadsearchURLs`) against a local stub server.
+
+Usage:
+    ```
+    python3 benchmarks/bench_discovery.py --states 16 --libraries 10 --delay 0.05
+    ```
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from stubserver import start_stub  # noqa: E402 pylint: disable=wrong-import-position
+from PyLeihe import PyLeiheNet, LocalGroup, Bibliography  # noqa: E402 pylint: disable=wrong-import-position
+
+START_PAGE = ('<html><body><form action="/frontend/search" method="post">'
+              '<input id="searchtext" name="searchtext"/></form></body></html>\n').encode("utf-8")
+
+
+def make_net(base_url, states, libraries):
+    """
+    Creates a catalog with `states` states of `libraries` libraries on the stub server.
+    """
+    pln = PyLeiheNet()
+    pln.Laender = [LocalGroup(s, "Land{}".format(s), sess=pln.Session, bibs=[
+        Bibliography("{}/lib{}-{}".format(base_url, s, i), ["Stadt"], session=pln.Session)
+        for i in range(libraries)]) for s in range(states)]
+    return pln
+
+
+def main():
+    """
+    Parses the arguments and prints the timings.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--states", type=int, default=16)
+    parser.add_argument("--libraries", type=int, default=10, help="libraries per state")
+    parser.add_argument("--delay", type=float, default=0.05, help="server latency in seconds")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+    server, base_url = start_stub(args.delay, page=START_PAGE)
+    try:
+        for threads in args.threads:
+            pln = make_net(base_url, args.states, args.libraries)
+            start = time.perf_counter()
+            pln.loadsearchURLs(threads=threads)
+            elapsed = time.perf_counter() - start
+            found = sum(b.search_url is not None for l in pln.Laender for b in l.Bibliotheken)
+            print("threads {:3}: {:6.2f}s for {} libraries ({} search urls)".format(
+                threads, elapsed, args.states * args.libraries, found))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
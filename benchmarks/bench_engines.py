@@ -0,0 +1,65 @@
+"""
+Compares the wall-clock time of the search engines `threads` and `async`
+from `PyLeihe.simple_functions.search_bibs` against a local stub server.
+
+Usage:
+    ```
+    python3 benchmarks/bench_engines.py --libraries 300 --delay 0.2
+    ```
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from stubserver import start_stub  # noqa: E402 pylint: disable=wrong-import-position
+from PyLeihe import Bibliography  # noqa: E402 pylint: disable=wrong-import-position
+from PyLeihe.simple_functions import search_bibs  # noqa: E402 pylint: disable=wrong-import-position
+
+
+def make_bibs(base_url, amount):
+    """
+    Creates `amount` libraries whose search url points to the stub server.
+    """
+    bibs = []
+    for i in range(amount):
+        bib = Bibliography("{}/lib{}/frontend/welcome.html".format(base_url, i))
+        bib.search_url = "{}/lib{}/frontend/search.html".format(base_url, i)
+        bibs.append(bib)
+    return bibs
+
+
+def bench(engine, bibs, **kwargs):
+    """
+    Runs one search over all libraries and returns the elapsed seconds.
+    """
+    start = time.perf_counter()
+    results = search_bibs(bibs, "Suchbegriff", engine=engine, **kwargs)
+    elapsed = time.perf_counter() - start
+    assert all(r[1] == 42 for r in results), "unexpected search result"
+    return elapsed
+
+
+def main():
+    """
+    Parses the arguments and prints the timings.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--libraries", type=int, default=300)
+    parser.add_argument("--delay", type=float, default=0.2, help="server latency in seconds")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    _server, base_url = start_stub(delay=args.delay)
+    bibs = make_bibs(base_url, args.libraries)
+    print("{} libraries, {:.0f} ms server latency".format(args.libraries, args.delay * 1000))
+    t_threads = bench("threads", bibs, threads=args.threads)
+    print("threads ({:3d} threads):     {:7.2f} s".format(args.threads, t_threads))
+    t_async = bench("async", bibs, concurrency=args.concurrency)
+    print("async   ({:3d} in flight):   {:7.2f} s".format(args.concurrency, t_async))
+    print("speedup: {:.1f}x".format(t_threads / t_async))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measures the startup of the command line interface with `python3 -X importtime`
+and fails if it exceeds a threshold or imports a deferred package.
+
+Usage:
+    ```
+    python3 benchmarks/bench_import.py --repeat 5 --threshold 150
+    ```
+The exit status is `1` on a regression, so the script can run in CI.
+"""
+import argparse
+import os
+import subprocess  # nosec
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+MODULE = "PyLeihe.__main__"
+# packages which are only imported on their first use
+DEFERRED = ("requests", "bs4", "aiohttp", "asyncio", "multiprocessing.dummy", "orjson")
+
+
+def importtime():
+    """
+    Imports the command line interface in a fresh interpreter.
+
+    Returns:
+        dict with the module name as key and a tuple of its own and its
+        cumulative import time in microseconds as value
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c",  # nosec
+                          "import {}".format(MODULE)], cwd=ROOT, check=True,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                         universal_newlines=True).stderr
+    times = {}
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def startup(args):
+    """
+    Returns the wall time of `python3 -m PyLeihe` with the arguments in seconds.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "PyLeihe"] + args, cwd=ROOT, check=True,  # nosec
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    """
+    Parses the arguments, prints the timings and returns the exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=150,
+                        help="maximum import time of {} in ms".format(MODULE))
+    parser.add_argument("--top", type=int, default=10, help="number of modules shown")
+    args = parser.parse_args()
+    runs = [importtime() for _i in range(args.repeat)]
+    best = min(runs, key=lambda times: times[MODULE][1])
+    total = best[MODULE][1] / 1000
+    print("import {}: {:.1f} ms (best of {})".format(MODULE, total, args.repeat))
+    for name, (own, cumulative) in sorted(best.items(), key=lambda item: -item[1][0])[:args.top]:
+        print("  {:35} {:7.1f} ms {:7.1f} ms cumulative".format(
+            name, own / 1000, cumulative / 1000))
+    for cli in (["--version"], ["-h"]):
+        print("python3 -m PyLeihe {}: {:.1f} ms".format(
+            " ".join(cli), min(startup(cli) for _i in range(args.repeat)) * 1000))
+    imported = [name for name in DEFERRED if name in best]
+    if imported:
+        print("REGRESSION: imported at startup: {}".format(", ".join(imported)))
+    if total > args.threshold:
+        print("REGRESSION: {:.1f} ms > {:.1f} ms".format(total, args.threshold))
+    return 1 if imported or total > args.threshold else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
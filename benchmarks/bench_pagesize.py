@@ -0,0 +1,65 @@
+"""
+Measures the transferred bytes and the latency per library for a search
+with the smallest result page (count only) and with the full result page.
+
+The libraries are taken from the json file created with `--makejson`,
+so the measurement runs against the real onleihe servers.
+
+Usage:
+    ```
+    python3 benchmarks/bench_pagesize.py -j PyLeiheNet --libraries 20 -s "Harry Potter"
+    ```
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from PyLeihe import PyLeiheNet, MediaType  # noqa: E402 pylint: disable=wrong-import-position
+
+
+def measure(bib, text, full_page):
+    """
+    Sends one search request and returns the body size in bytes and the latency in seconds.
+    """
+    # pylint: disable=protected-access
+    data = bib._searchData(703, text, MediaType.alleMedien, full_page)
+    start = time.perf_counter()
+    resp = bib.simpleSession(bib.search_url, data=data)
+    elapsed = time.perf_counter() - start
+    if resp is None:
+        return None, elapsed
+    return len(resp.content), elapsed
+
+
+def main():
+    """
+    Parses the arguments and prints one line per library and the totals.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("-j", "--jsonfile", default="", help="path to the json file")
+    parser.add_argument("-s", "--search", default="Krimi")
+    parser.add_argument("--libraries", type=int, default=20)
+    args = parser.parse_args()
+
+    pln = PyLeiheNet.loadFromJSON(filename=args.jsonfile)
+    bibs = [b for l in pln.Laender for b in l.Bibliotheken if b.search_url][:args.libraries]
+    totals = {False: [0, 0.0], True: [0, 0.0]}
+    print("{:25s} {:>10s} {:>8s} {:>10s} {:>8s}".format(
+        "library", "count B", "ms", "full B", "ms"))
+    for bib in bibs:
+        row = []
+        for full_page in (False, True):
+            size, elapsed = measure(bib, args.search, full_page)
+            row.extend([size if size is not None else -1, elapsed * 1000])
+            if size is not None:
+                totals[full_page][0] += size
+                totals[full_page][1] += elapsed
+        print("{:25s} {:10d} {:8.0f} {:10d} {:8.0f}".format(bib.title[:25], *row))
+    print("{:25s} {:10d} {:8.0f} {:10d} {:8.0f}".format(
+        "total", totals[False][0], totals[False][1] * 1000,
+        totals[True][0], totals[True][1] * 1000))
+
+
+if __name__ == "__main__":
+    main()
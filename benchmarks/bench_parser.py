@@ -0,0 +1,139 @@
+"""
+Compares the parse time, the time of the lookups used by the package and
+the peak memory of the html parser backends from `PyLeihe.htmlparser`
+over saved onleihe pages.
+
+The lookups are the search form (`getPostFormURL`), all links (`find_all('a')`),
+the library links of a state page (`LocalGroup.loadBibURLs`) and the regex
+search for an onleihe link (`Bibliography.grepSearchURL`).
+
+Every backend runs in its own process, so the peak memory (maximum resident
+set size) of one backend does not influence the others.
+
+Usage:
+    ```
+    python3 benchmarks/bench_parser.py --pages path/to/saved/pages
+    ```
+    Without `--pages` synthetic pages in the style of an onleihe result page are used.
+    Result pages can be saved with `Bibliography.search(..., savefile=True)`.
+"""
+import argparse
+import glob
+import os
+import re
+import resource
+import subprocess  # nosec
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from PyLeihe import htmlparser  # noqa: E402 pylint: disable=wrong-import-position
+from PyLeihe.basic import PyLeiheWeb  # noqa: E402 pylint: disable=wrong-import-position
+
+MEDIA_ITEM = """
+<div class="item-{0} media">
+  <a class="cover" href="/lib/frontend/mediaInfo,0-0-{0}-0-0-0-0-0-0-0-0.html" title="Titel {0}">
+    <img src="https://img.onleihe.de/cover/{0}.jpg" alt="Titel {0}"></a>
+  <div class="item-info"><h3 class="title">Titel {0}</h3>
+    <p class="author">Autor {0}</p><p class="format">eBook</p>
+    <a href="/lib/frontend/mediaInfo,0-0-{0}.html" target="_blank">Details</a></div>
+</div>"""
+
+SYNTHETIC_PAGE = """<html><head><title>Onleihe</title></head><body>
+<form method="post" action="/lib/frontend/search,0-0-0-0-0-0-0-0-0-0-0.html">
+<input id="searchtext" name="pText"><select id="elementsPerPage"></select></form>
+<h2>Suchergebnis f&uuml;r Suchbegriff: 1.234 Treffer</h2>
+{0}
+<table class="contenttable">{1}</table>
+<a href="https://www2.onleihe.de/lib/frontend">Onleihe</a>
+</body></html>"""
+
+LIBRARY_ROW = """
+<tr><td><a href="https://www.onleihe.de/lib{0}/" target="_blank">Stadt{0}</a></td></tr>"""
+
+ONLEIHE_LINK = re.compile(r'.*onleihe[^\/]*\.de.*')
+
+LOOKUPS = [
+    ("form", lambda doc: PyLeiheWeb.getPostFormURL(doc, ContNode="input",
+                                                   ContNodeData={"id": "searchtext"})),
+    ("find_all(a)", lambda doc: doc.find_all("a")),
+    ("loadBibURLs", lambda doc: doc.find("table", {"class": "contenttable"}).find_all(
+        "a", attrs={"target": "_blank"})),
+    ("grepSearchURL", lambda doc: PyLeiheWeb.searchNodeMultipleContain(
+        doc, "a", {"href": ONLEIHE_LINK})),
+]
+
+
+def synthetic_pages(amount=20, items=100, libraries=100):
+    """
+    Returns onleihe like result pages with `items` media entries
+    and a table with `libraries` library links.
+    """
+    page = SYNTHETIC_PAGE.format("".join(MEDIA_ITEM.format(i) for i in range(items)),
+                                 "".join(LIBRARY_ROW.format(i) for i in range(libraries)))
+    return [page.encode("utf-8")] * amount
+
+
+def load_pages(directory):
+    """
+    Loads all `*.html` files of the directory.
+    """
+    pages = []
+    for name in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(name, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+def worker(backend, pages, repeat):
+    """
+    Parses all pages `repeat` times with one backend and prints the time
+    per page of the parsing and of every lookup and the peak memory increase.
+    """
+    htmlparser.setParser(backend)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = dict.fromkeys(["parse"] + [name for name, _ in LOOKUPS], 0.0)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        documents = [htmlparser.parse(p) for p in pages]
+        timings["parse"] += time.perf_counter() - start
+        for name, lookup in LOOKUPS:
+            start = time.perf_counter()
+            for doc in documents:
+                lookup(doc)
+            timings[name] += time.perf_counter() - start
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("{:12s} {} {:9.1f} MiB peak".format(
+        backend, " ".join("{:>13.2f}".format(t * 1000 / (repeat * len(pages)))
+                          for t in timings.values()),
+        (rss_peak - rss_before) / 1024))
+
+
+def main():
+    """
+    Parses the arguments and starts one process per backend.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--pages", help="directory with saved html pages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages) if args.pages else synthetic_pages()
+    if not pages:
+        parser.error("no html pages found in {}".format(args.pages))
+    if args.worker:
+        worker(args.worker, pages, args.repeat)
+        return
+    print("{} pages, {:.0f} KiB on average, ms/page".format(
+        len(pages), sum(map(len, pages)) / len(pages) / 1024))
+    print("{:12s} {}".format("", " ".join("{:>13s}".format(name) for name in
+                                          ["parse"] + [name for name, _ in LOOKUPS])))
+    for backend in htmlparser.availableParsers():
+        cmd = [sys.executable, __file__, "--worker", backend, "--repeat", str(args.repeat)]
+        if args.pages:
+            cmd += ["--pages", args.pages]
+        subprocess.run(cmd, check=True)  # nosec
+
+
+if __name__ == "__main__":
+    main()
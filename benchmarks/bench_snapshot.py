@@ -0,0 +1,104 @@
+"""
+Compares the load time and the memory (RSS) of the catalog formats:
+JSON with the `json` module, JSON with `orjson`, the binary snapshot
+(`PyLeihe.snapshot`) and one state of the shards (`PyLeihe.shards`),
+each in a fresh process.
+
+Usage:
+    ```
+    python3 benchmarks/bench_snapshot.py --libraries 250 --scales 1 100
+    ```
+"""
+import argparse
+import os
+import resource
+import subprocess  # nosec
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from bench_catalog import make_catalog  # noqa: E402 pylint: disable=wrong-import-position
+from PyLeihe import PyLeiheNet  # noqa: E402 pylint: disable=wrong-import-position
+from PyLeihe import basic  # noqa: E402 pylint: disable=wrong-import-position
+
+METHODS = ("json", "orjson", "snapshot", "shard")
+
+
+def rss():
+    """
+    Returns the current RSS in KB (`/proc`, elsewhere the peak RSS).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(method, filename):
+    """
+    Loads the catalog once and prints the seconds and the additional RSS in KB.
+    """
+    if method == "json":
+        basic.optionalModule = lambda name: None
+    elif basic.optionalModule("orjson") is None:
+        print("nan nan")
+        return
+    before = rss()
+    start = time.perf_counter()
+    if method == "snapshot":
+        pln = PyLeiheNet.loadFromSnapshot(filename)
+    elif method == "shard":
+        pln = PyLeiheNet.loadFromShards(filename)
+        pln.Laender[0].Bibliotheken.lookup("title", "")
+    else:
+        pln = PyLeiheNet.loadFromJSON(filename=filename)
+    elapsed = time.perf_counter() - start
+    print(elapsed, rss() - before)
+    del pln
+
+
+def measure(method, filename, repeat):
+    """
+    Returns the best time and the RSS of `repeat` fresh processes.
+    """
+    results = []
+    for _i in range(repeat):
+        out = subprocess.run([sys.executable, __file__, "--child", method, filename],  # nosec
+                             check=True, stdout=subprocess.PIPE,
+                             universal_newlines=True).stdout.split()
+        results.append((float(out[0]), float(out[1])))
+    return min(results)
+
+
+def main():
+    """
+    Parses the arguments and prints the timings.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--libraries", type=int, default=250, help="libraries at scale 1")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            filename = os.path.join(tmp, "catalog{}".format(scale))
+            pln = PyLeiheNet.loadFromJSON(data=make_catalog(args.libraries * scale))
+            pln.toJSONFile(filename)
+            pln.toSnapshotFile(filename)
+            pln.toShards(filename)
+            sizes = {"json": os.path.getsize(filename + ".json"),
+                     "snapshot": os.path.getsize(filename + ".snapshot")}
+            print("{}x ({} libraries, json {:.1f} KB, snapshot {:.1f} KB)".format(
+                scale, args.libraries * scale, sizes["json"] / 1024, sizes["snapshot"] / 1024))
+            for method in METHODS:
+                seconds, rss = measure(method, filename, args.repeat)
+                print("  {:8} {:8.1f} ms {:8.0f} KB RSS".format(method, seconds * 1000, rss))
+
+
+if __name__ == "__main__":
+    main()
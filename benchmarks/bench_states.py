@@ -0,0 +1,58 @@
+"""
+Compares the sequential and the concurrent loading of the federal states
+(`PyLeihe.bibindex.PyLeiheNet.loadallBundesLaender`) against a local stub server.
+
+Usage:
+    ```
+    python3 benchmarks/bench_states.py --states 16 --libraries 50 --delay 0.2
+    ```
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from stubserver import start_stub  # noqa: E402 pylint: disable=wrong-import-position
+from PyLeihe.bibindex import PyLeiheNet  # noqa: E402 pylint: disable=wrong-import-position
+from PyLeihe.localgroup import LocalGroup  # noqa: E402 pylint: disable=wrong-import-position
+
+
+def state_page(libraries):
+    """
+    Returns the page of a state with `libraries` links as on onleihe.net.
+    """
+    rows = "".join('<tr><td><a href="https://www.onleihe.de/lib{0}/" target="_blank">'
+                   'Stadt{0}</a></td></tr>'.format(i) for i in range(libraries))
+    return ('<html><body><table class="contenttable">{}</table></body></html>\n'
+            .format(rows)).encode("utf-8")
+
+
+def main():
+    """
+    Parses the arguments and prints the timings.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--states", type=int, default=16)
+    parser.add_argument("--libraries", type=int, default=50, help="libraries per state")
+    parser.add_argument("--delay", type=float, default=0.2, help="server latency in seconds")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+    server, base_url = start_stub(args.delay, page=state_page(args.libraries))
+    LocalGroup.SCHEME, LocalGroup.DOMAIN = base_url.split("://")
+    try:
+        for threads in args.threads:
+            pln = PyLeiheNet()
+            pln.Laender = [LocalGroup(s, "Land{}".format(s), sess=pln.Session)
+                           for s in range(args.states)]
+            start = time.perf_counter()
+            pln.loadallBundesLaender(threads=threads)
+            elapsed = time.perf_counter() - start
+            found = sum(len(l.Bibliotheken) for l in pln.Laender)
+            print("threads {:3}: {:6.2f}s for {} states ({} libraries, slowest state {:.2f}s)"
+                  .format(threads, elapsed, args.states, found, max(pln.LoadTimes.values())))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Local stub of the onleihe search endpoint for benchmarks.
+
+Every POST is answered after a fixed delay with a small result page
+that contains the typical "Suchergebnis ... Treffer" line.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+RESULT_PAGE = ("<html><body><h2>Suchergebnis f&uuml;r Suchbegriff: 42 Treffer</h2>"
+               "</body></html>\n").encode("utf-8")
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # clients may close the connection early (e.g. streamed searches)
+        pass
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request with `RESULT_PAGE` after `server.delay` seconds.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def _answer(self, body):
+        time.sleep(self.server.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        Reads the form data and answers with the result page.
+        """
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self._answer(self.server.page)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Answers with the result page.
+        """
+        self._answer(self.server.page)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def start_stub(delay=0.05, page=RESULT_PAGE, port=0):
+    """
+    Starts the stub server in a background thread.
+
+    Arguments:
+        delay (float): answer delay in seconds (simulated server latency)
+        page (bytes): body of every answer
+        port (int): port to listen on, `0` for a free port
+
+    Returns:
+        tuple with the server instance and its base url
+    """
+    server = _ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.delay = delay
+    server.page = page
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, "http://127.0.0.1:{}".format(server.server_address[1])